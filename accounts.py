@@ -0,0 +1,140 @@
+"""
+多帳號設定檔讀取與每日/每次執行額度、冷卻時間管理。
+"""
+import time
+import json
+import threading
+from typing import Dict, List, Set, Optional, Tuple
+
+from ledger import DownloadLedger
+
+
+def load_accounts(accounts_file: str) -> List[dict]:
+    """
+    讀取多帳號設定檔 (JSON 陣列)，每個帳號例如:
+    {"name": "a1", "profile_dir": "chrome_profile_a1", "daily_quota": 150, "session_quota": 80, "cooldown_minutes": 60}
+    帳號密碼不寫在設定檔中；第一次使用時在該帳號的瀏覽器視窗手動登入，登入狀態保存在其設定檔資料夾。
+    """
+    with open(accounts_file, encoding='utf-8') as f:
+        accounts = json.load(f)
+    names = [account.get("name") for account in accounts]
+    if not accounts or not all(names) or len(set(names)) != len(names):
+        raise ValueError(f"帳號設定檔 {accounts_file} 必須是非空陣列，且每個帳號都有不重複的 name")
+    return accounts
+
+
+class AccountPool:
+    """
+    多帳號的下載額度管理。每個帳號有自己的瀏覽器設定檔、每日與每次執行的額度以及冷卻時間。
+    派送工作時選擇剩餘額度 (扣除已排隊的工作) 最多的帳號；帳號連續出現警告視窗或逾時時進入冷卻，
+    工作自動轉給其他帳號。每日用量與冷卻狀態存在帳本中，跨執行保留。所有 worker 共用同一個實例。
+    """
+    # 視為帳號可能被限制的異常訊號；驗證碼被拒多半是辨識問題，不計入
+    TROUBLE_KINDS = ("alert", "timeout")
+
+    def __init__(self, accounts: List[dict], ledger: DownloadLedger, trouble_threshold: int = 3):
+        self.ledger = ledger
+        self.trouble_threshold = trouble_threshold
+        self.accounts: Dict[str, dict] = {}
+        for account in accounts:
+            name = account["name"]
+            self.accounts[name] = {
+                "profile_dir": account.get("profile_dir") or f"chrome_profile_{name}",
+                "daily_quota": int(account.get("daily_quota", 100)),
+                "session_quota": int(account["session_quota"]) if account.get("session_quota") else None,
+                "cooldown": float(account.get("cooldown_minutes", 60)) * 60,
+            }
+        self._session = {name: 0 for name in self.accounts}
+        self._queued = {name: 0 for name in self.accounts}
+        self._troubles = {name: 0 for name in self.accounts}
+        self._disabled: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _today() -> str:
+        return time.strftime('%Y-%m-%d')
+
+    def remaining(self, name: str) -> int:
+        """帳號今天還能下載的篇數 (同時受每日與本次執行的額度限制)。"""
+        account = self.accounts[name]
+        remaining = account["daily_quota"] - self.ledger.account_downloads(name, self._today())
+        if account["session_quota"] is not None:
+            remaining = min(remaining, account["session_quota"] - self._session[name])
+        return max(0, remaining)
+
+    def cooling_until(self, name: str) -> float:
+        return self.ledger.get_account_cooldown(name)
+
+    def available(self, name: str) -> bool:
+        return name not in self._disabled and self.cooling_until(name) <= time.time() and self.remaining(name) > 0
+
+    def pick(self, exclude: Optional[Set[str]] = None, max_queued: int = 2) -> Optional[str]:
+        """選出可用且排隊未滿的帳號中，剩餘額度扣除排隊數後最多的一個，並為它預留一個排隊名額。"""
+        with self._lock:
+            candidates = [(self.remaining(name) - self._queued[name], name) for name in self.accounts
+                          if name not in (exclude or set()) and self._queued[name] < max_queued
+                          and self.available(name)]
+            candidates = [(budget, name) for budget, name in candidates if budget > 0]
+            if not candidates:
+                return None
+            _, name = max(candidates)
+            self._queued[name] += 1
+            return name
+
+    def task_done(self, name: str):
+        with self._lock:
+            self._queued[name] = max(0, self._queued[name] - 1)
+
+    def disable(self, name: str):
+        """帳號的瀏覽器無法啟動或無法登入時，本次執行不再派送工作給它。"""
+        with self._lock:
+            self._disabled.add(name)
+
+    def exhausted(self) -> bool:
+        """所有帳號都已用完額度 (或被停用)；只是在冷卻中的帳號稍後仍可使用，不算用完。"""
+        return all(name in self._disabled or self.remaining(name) <= 0 for name in self.accounts)
+
+    def record_download(self, name: str):
+        with self._lock:
+            self._session[name] += 1
+            self._troubles[name] = 0
+        self.ledger.add_account_usage(name, self._today(), downloads=1)
+
+    def record_success(self, name: str):
+        with self._lock:
+            self._troubles[name] = 0
+
+    def record_trouble(self, name: str, kind: str):
+        if kind not in self.TROUBLE_KINDS:
+            return
+        with self._lock:
+            self._troubles[name] += 1
+            troubles = self._troubles[name]
+            if troubles >= self.trouble_threshold:
+                self._troubles[name] = 0
+        self.ledger.add_account_usage(name, self._today(), troubles=1)
+        if troubles >= self.trouble_threshold:
+            until = time.time() + self.accounts[name]["cooldown"]
+            self.ledger.set_account_cooldown(name, until)
+            print(f"      - [帳號] {name} 連續 {troubles} 次異常 ({kind})，冷卻到 "
+                  f"{time.strftime('%H:%M', time.localtime(until))}，工作轉給其他帳號。")
+
+    def status_rows(self) -> List[Tuple[str, int, int, int, int, float, bool]]:
+        """每個帳號的 (名稱, 今日下載, 每日額度, 本次下載, 剩餘額度, 冷卻到期時間, 是否停用)。"""
+        today = self._today()
+        return [(name, self.ledger.account_downloads(name, today), account["daily_quota"], self._session[name],
+                 self.remaining(name), self.cooling_until(name), name in self._disabled)
+                for name, account in self.accounts.items()]
+
+
+def print_account_status(pool: AccountPool):
+    print("\n[*] 帳號額度狀態:")
+    print(f"    {'帳號':<14}{'今日/每日':>9}{'本次':>6}{'剩餘':>6}  狀態")
+    for name, today, daily, session, remaining, cooling_until, disabled in pool.status_rows():
+        if disabled:
+            state = "停用"
+        elif cooling_until > time.time():
+            state = f"冷卻到 {time.strftime('%H:%M', time.localtime(cooling_until))}"
+        else:
+            state = "可用" if remaining else "額度用完"
+        print(f"    {name:<16}{f'{today}/{daily}':>13}{session:>8}{remaining:>8}  {state}")
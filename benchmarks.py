@@ -0,0 +1,183 @@
+"""
+列表解析器、全文索引與端對端下載流程的效能評測。
+"""
+import os
+import time
+import json
+import tempfile
+import threading
+from typing import List, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+
+from download import DownloaderConfig, ThesisDownloaderWithReadme
+from fulltext_index import FullTextIndex, list_pdf_files
+from ledger import DownloadLedger
+from mock_server import MockNdltdServer
+from parsers import parse_listing_html, parse_listing_webdriver
+
+
+def benchmark_listing_parsers(page_files: List[str], repeat: int = 5):
+    """
+    在無頭 Chrome 中開啟儲存的搜尋結果頁，比較兩種列表解析器的耗時，並確認輸出一致。
+    (可用 listing_snapshot_dir 參數在正常執行時保存搜尋結果頁。)
+    """
+    options = Options()
+    options.add_argument("--headless=new")
+    driver = webdriver.Chrome(
+        service=Service(ChromeDriverManager().install()), options=options)
+    try:
+        print(f"{'頁面':<40}{'筆數':>6}{'WebDriver(ms)':>16}{'快速解析(ms)':>14}{'加速':>8}{'一致':>6}")
+        for page_file in page_files:
+            driver.get("file://" + os.path.abspath(page_file))
+            timings = {}
+            outputs = {}
+            for name, parse in (("webdriver", lambda: parse_listing_webdriver(driver)),
+                                ("snapshot", lambda: parse_listing_html(driver.page_source, driver.current_url))):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    outputs[name] = parse()
+                timings[name] = (time.perf_counter() - started) * 1000 / repeat
+            same = outputs["webdriver"] == outputs["snapshot"]
+            print(f"{os.path.basename(page_file)[:38]:<40}{len(outputs['snapshot']):>6}"
+                  f"{timings['webdriver']:>16.1f}{timings['snapshot']:>14.1f}"
+                  f"{timings['webdriver'] / max(timings['snapshot'], 1e-6):>7.1f}x{'是' if same else '否':>6}")
+    finally:
+        driver.quit()
+
+
+def benchmark_fulltext_index(download_dir: str, worker_counts: List[int]):
+    """以現有的 PDF 從頭建立索引，比較不同子行程數的索引吞吐量。"""
+    pdf_files = list_pdf_files(download_dir)
+    total_mb = sum(os.path.getsize(path) for path in pdf_files) / 1024 / 1024
+    print(f"[*] 共 {len(pdf_files)} 個 PDF ({total_mb:.1f} MB)")
+    print(f"{'行程數':>6}{'秒數':>10}{'檔案/秒':>10}{'MB/秒':>10}{'加速':>8}")
+    baseline = None
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            index = FullTextIndex(os.path.join(temp_dir, "bench.sqlite3"))
+            try:
+                stats = index.update(pdf_files, lambda path: (os.path.basename(path), None, None), workers)
+            finally:
+                index.close()
+        seconds = max(stats["seconds"], 1e-6)
+        baseline = baseline or seconds
+        print(f"{workers:>9}{seconds:>12.2f}{stats['indexed'] / seconds:>13.2f}"
+              f"{total_mb / seconds:>11.2f}{baseline / seconds:>9.2f}x")
+
+
+def _process_tree_rss_mb() -> Optional[float]:
+    """本行程與所有子行程 (chromedriver、Chrome) 的常駐記憶體總和 (MB)；需要 psutil。"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    root = psutil.Process()
+    total = 0
+    for process in [root] + root.children(recursive=True):
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+
+def benchmark_end_to_end(records: int = 50, server_options: Optional[dict] = None,
+                         downloader_options: Optional[dict] = None, report_file: Optional[str] = None,
+                         baseline_file: Optional[str] = None) -> dict:
+    """
+    啟動 MockNdltdServer，讓 ThesisDownloaderWithReadme 以 headless Chrome 對其完整執行一次
+    (登入、搜尋、翻頁、驗證碼、下載、後處理)，回報每小時處理篇數、各階段延遲與記憶體峰值。
+    所有檔案寫在暫存資料夾，不影響正式的帳本與下載資料夾。
+    """
+    server = MockNdltdServer(records=records, **(server_options or {})).start()
+    work_dir = tempfile.mkdtemp(prefix="ndltd_benchmark_")
+    print(f"[*] 模擬伺服器: {server.url}，{records} 篇論文；工作資料夾: {work_dir}")
+    options = dict(
+        download_dir=os.path.join(work_dir, "downloads"),
+        log_file=os.path.join(work_dir, "download_log.txt"),
+        page_progress_file=os.path.join(work_dir, "page_progress.txt"),
+        ledger_file=os.path.join(work_dir, "ledger.sqlite3"), metrics_dir=os.path.join(work_dir, "metrics"),
+        catalog_output_dir=os.path.join(work_dir, "catalog"),
+        max_downloads_per_session=records, inter_article_sleep_range=(0.0, 0.0),
+        inter_page_sleep_range=(0.0, 0.0), captcha_corpus_dir=None, chrome_profile_dir=None,
+        site_root=server.url, headless=True)
+    options.update(downloader_options or {})
+    peak = {"rss_mb": _process_tree_rss_mb() or 0.0}
+    finished = threading.Event()
+
+    def sample_memory():
+        while not finished.wait(1.0):
+            rss_mb = _process_tree_rss_mb()
+            if rss_mb:
+                peak["rss_mb"] = max(peak["rss_mb"], rss_mb)
+
+    sampler = threading.Thread(target=sample_memory, name="benchmark-rss", daemon=True)
+    sampler.start()
+    started = time.monotonic()
+    try:
+        downloader = ThesisDownloaderWithReadme("評測", DownloaderConfig(**options))
+        downloader.run()
+    finally:
+        elapsed = time.monotonic() - started
+        finished.set()
+        sampler.join()
+        server.stop()
+    ledger = DownloadLedger(options["ledger_file"])
+    downloaded, skipped, failed = ledger.count("downloaded"), ledger.count("skipped"), ledger.count("failed")
+    ledger.close()
+    processed = downloaded + skipped + failed
+    report = {
+        "records": records, "elapsed_seconds": round(elapsed, 2),
+        "downloaded": downloaded, "skipped": skipped, "failed": failed,
+        "records_per_hour": round(processed / elapsed * 3600, 1) if elapsed else 0.0,
+        "downloads_per_hour": round(downloaded / elapsed * 3600, 1) if elapsed else 0.0,
+        "peak_rss_mb": round(peak["rss_mb"], 1) if peak["rss_mb"] else None,
+        "server_requests": dict(sorted(server.requests.items())),
+        "stages": {stage: {"count": count, "mean": round(mean, 4), "p50": round(p50, 4), "p95": round(p95, 4)}
+                   for stage, count, _, mean, p50, p95 in downloader.metrics.summary_rows()},
+        "server_options": server_options or {},
+        "downloader_options": {key: value for key, value in (downloader_options or {}).items()},
+    }
+    print_end_to_end_report(report, baseline_file)
+    if report_file:
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"[*] 評測結果已寫入 {report_file}")
+    return report
+
+
+def print_end_to_end_report(report: dict, baseline_file: Optional[str] = None):
+    """列出端對端評測結果；提供先前的結果檔時，一併列出與基準的差異。"""
+    baseline = None
+    if baseline_file and os.path.exists(baseline_file):
+        with open(baseline_file, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    def delta(value, key_path):
+        if baseline is None or value is None:
+            return ""
+        base = baseline
+        for key in key_path:
+            base = base.get(key) if isinstance(base, dict) else None
+        if not base:
+            return ""
+        return f"  ({(value - base) / base * 100:+.1f}%)"
+
+    print("\n[*] 端對端評測結果:")
+    print(f"    耗時 {report['elapsed_seconds']:.1f} 秒：下載 {report['downloaded']}、"
+          f"跳過 {report['skipped']}、失敗 {report['failed']}")
+    print(f"    每小時處理篇數: {report['records_per_hour']:.1f}{delta(report['records_per_hour'], ['records_per_hour'])}")
+    print(f"    每小時下載篇數: {report['downloads_per_hour']:.1f}"
+          f"{delta(report['downloads_per_hour'], ['downloads_per_hour'])}")
+    if report["peak_rss_mb"] is not None:
+        print(f"    記憶體峰值 (含 Chrome): {report['peak_rss_mb']:.0f} MB{delta(report['peak_rss_mb'], ['peak_rss_mb'])}")
+    else:
+        print("    記憶體峰值: 未安裝 psutil，無法量測")
+    print(f"    {'階段':<18}{'次數':>4}{'平均':>7}{'p50':>9}{'p95':>9}")
+    for stage, values in sorted(report["stages"].items(), key=lambda item: -item[1]["count"] * item[1]["mean"]):
+        print(f"    {stage:<20}{values['count']:>6}{values['mean']:>9.2f}{values['p50']:>9.2f}{values['p95']:>9.2f}"
+              f"{delta(values['p50'], ['stages', stage, 'p50'])}")
@@ -0,0 +1,343 @@
+"""
+驗證碼辨識器、樣本庫與前處理設定評測。
+"""
+import os
+import time
+import json
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import ddddocr
+import numpy as np
+from PIL import Image
+from io import BytesIO
+
+from metrics import percentile
+
+
+class CaptchaSolver:
+    """
+    批次、非同步的驗證碼辨識器。
+    同一張驗證碼會以多種前處理版本 (不同二值化門檻) 同時送進 ddddocr，
+    推論在專用的執行緒池中進行，不佔用 driver 所在的執行緒；
+    最後依各版本結果的一致性與模型機率挑出最佳答案並附上信心分數。
+    submit() 與各版本推論使用不同的執行緒池：solve() 會等待版本推論，若共用同一個池，
+    多個 worker 同時送出時 solve() 會佔滿所有執行緒而互相等待。
+    """
+    # None 表示只轉灰階、不做二值化；"otsu" 表示依影像自動計算門檻
+    DEFAULT_THRESHOLDS: Tuple[Union[int, str, None], ...] = (128, None, 100, 160, "otsu")
+    # 單色影像等無法計算 Otsu 門檻時改用的固定門檻
+    FALLBACK_THRESHOLD = 128
+    # 等待一張驗證碼所有版本推論完成的秒數
+    SOLVE_TIMEOUT = 30
+
+    # 清理規則：辨識結果中要保留哪些字元
+    CLEANUP_RULES = {
+        "alnum": str.isalnum,
+        "digits": str.isdigit,
+        "alpha": str.isalpha,
+    }
+
+    def __init__(self, ocr: "ddddocr.DdddOcr",
+                 thresholds: Tuple[Union[int, str, None], ...] = DEFAULT_THRESHOLDS,
+                 min_length: int = 4, max_length: int = 6, max_workers: int = 2,
+                 cleanup: str = "alnum", name: str = "vote-alnum"):
+        self.ocr = ocr
+        self.name = name  # 設定名稱，記入樣本庫以便評測時排除此設定自己產生的標籤
+        self.thresholds = tuple(thresholds)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.cleanup = cleanup
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="captcha")
+        self._variant_executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="captcha-variant")
+
+    @classmethod
+    def _otsu_threshold(cls, gray: np.ndarray) -> int:
+        histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+        weights = histogram.cumsum()
+        means = (histogram * np.arange(256)).cumsum()
+        total, total_mean = weights[-1], means[-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            between = (total_mean * weights - means * total) ** 2 / \
+                (weights * (total - weights))
+        if np.all(np.isnan(between)):
+            # 單色影像沒有前景與背景之分，每個門檻的類間變異數都是 NaN
+            return cls.FALLBACK_THRESHOLD
+        return int(np.nanargmax(between))
+
+    @classmethod
+    def binarize(cls, image_bytes: bytes, threshold: Union[int, str, None]) -> bytes:
+        """以向量化的陣列運算將驗證碼轉為灰階並二值化，回傳 PNG 位元組。"""
+        gray = np.asarray(Image.open(BytesIO(image_bytes)).convert('L'))
+        if threshold == "otsu":
+            threshold = cls._otsu_threshold(gray)
+        if threshold is not None:
+            gray = np.where(gray > threshold, 255, 0).astype(np.uint8)
+        buffered = BytesIO()
+        Image.fromarray(gray).save(buffered, format="PNG")
+        return buffered.getvalue()
+
+    @classmethod
+    def from_config(cls, ocr: "ddddocr.DdddOcr", config: dict, max_workers: int = 2) -> "CaptchaSolver":
+        return cls(ocr, thresholds=config["thresholds"], min_length=config["min_length"],
+                   max_length=config["max_length"], cleanup=config["cleanup"], max_workers=max_workers,
+                   name=config["name"])
+
+    def clean(self, text: str) -> str:
+        return ''.join(filter(self.CLEANUP_RULES[self.cleanup], text)).lower()
+
+    def _classify(self, image_bytes: bytes) -> Tuple[str, Optional[float]]:
+        """執行單次推論。若 ddddocr 支援 probability 參數，一併回傳逐字最低機率。"""
+        try:
+            result = self.ocr.classification(image_bytes, probability=True)
+        except TypeError:
+            return self.ocr.classification(image_bytes), None
+        if not isinstance(result, dict):
+            return str(result), None
+        if 'text' in result:
+            # ddddocr 1.6+ 直接提供辨識文字與整體信心
+            confidence = result.get('confidence')
+            return result['text'], (None if confidence is None else float(confidence))
+        probabilities = np.asarray(result['probability'])
+        indices = probabilities.argmax(axis=1)
+        chars, confidences = [], []
+        for index, confidence in zip(indices, probabilities.max(axis=1)):
+            char = result['charsets'][index]
+            if char:
+                chars.append(char)
+                confidences.append(float(confidence))
+        return ''.join(chars), (min(confidences) if confidences else 0.0)
+
+    def _classify_variant(self, image_bytes: bytes, threshold: Union[int, str, None]) -> Tuple[str, str, Optional[float]]:
+        raw, confidence = self._classify(self.binarize(image_bytes, threshold))
+        return raw, self.clean(raw), confidence
+
+    def solve(self, image_bytes: bytes) -> Tuple[str, float, List[Tuple[str, str, Optional[float]]]]:
+        """
+        將所有前處理版本一次送出推論，回傳 (最佳答案, 信心分數, 各版本結果)。
+        信心分數 = 支持該答案之版本的機率總和 / 版本數，範圍 0~1。
+        """
+        futures = [self._variant_executor.submit(self._classify_variant, image_bytes, threshold)
+                   for threshold in self.thresholds]
+        deadline = time.monotonic() + self.SOLVE_TIMEOUT
+        candidates = []
+        for future in futures:
+            try:
+                candidates.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except Exception as e:
+                future.cancel()
+                print(f"      - [警告] 驗證碼前處理或推論失敗: {e}")
+        scores: Dict[str, float] = {}
+        for _, cleaned, confidence in candidates:
+            if self.min_length <= len(cleaned) <= self.max_length:
+                scores[cleaned] = scores.get(cleaned, 0.0) + \
+                    (1.0 if confidence is None else confidence)
+        if not scores:
+            return "", 0.0, candidates
+        best = max(scores, key=scores.get)
+        return best, scores[best] / len(self.thresholds), candidates
+
+    def submit(self, image_bytes: bytes) -> "Future":
+        """在背景執行 solve()，讓呼叫端可以同時進行瀏覽器操作。"""
+        return self._executor.submit(self.solve, image_bytes)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        self._variant_executor.shutdown(wait=False)
+
+
+# 驗證碼前處理設定的候選清單，第一個即為原本的固定做法 (門檻 128、英數過濾、長度 4~6)
+CAPTCHA_CONFIGS: List[dict] = [
+    {"name": "t128-alnum", "thresholds": [128], "cleanup": "alnum", "min_length": 4, "max_length": 6},
+    {"name": "gray-alnum", "thresholds": [None], "cleanup": "alnum", "min_length": 4, "max_length": 6},
+    {"name": "t100-alnum", "thresholds": [100], "cleanup": "alnum", "min_length": 4, "max_length": 6},
+    {"name": "t160-alnum", "thresholds": [160], "cleanup": "alnum", "min_length": 4, "max_length": 6},
+    {"name": "otsu-alnum", "thresholds": ["otsu"], "cleanup": "alnum", "min_length": 4, "max_length": 6},
+    {"name": "vote-alnum", "thresholds": list(CaptchaSolver.DEFAULT_THRESHOLDS),
+     "cleanup": "alnum", "min_length": 4, "max_length": 6},
+    {"name": "vote-digits", "thresholds": list(CaptchaSolver.DEFAULT_THRESHOLDS),
+     "cleanup": "digits", "min_length": 4, "max_length": 6},
+    {"name": "vote-alnum-len4", "thresholds": list(CaptchaSolver.DEFAULT_THRESHOLDS),
+     "cleanup": "alnum", "min_length": 4, "max_length": 4},
+]
+
+
+class CaptchaCorpus:
+    """
+    驗證碼樣本庫。正常執行時保存每張驗證碼原圖、送出的答案、產生答案的設定以及伺服器是否接受。
+    被拒絕的樣本也會保留：同一張圖 (內容雜湊相同) 之後有答案被接受時即以該答案為標籤，
+    其餘可用 `captcha-label` 指令手動標註。被接受的答案只能證明產生它的設定答對，
+    評測時這些樣本不拿來評比該設定本身 (見 benchmark_captcha_configs)。
+    max_samples 限制保存的樣本數，超過時先刪除最舊的未標註樣本，再刪除最舊的已標註樣本。
+    """
+    # 沒有記錄設定名稱的舊樣本，當時一律由預設設定產生
+    LEGACY_CONFIG = "vote-alnum"
+    # 超過上限時一次刪到上限的這個比例，不必每記錄一張就重寫一次 labels.jsonl
+    PRUNE_TO = 0.9
+
+    def __init__(self, corpus_dir: str, max_samples: Optional[int] = None):
+        self.corpus_dir = corpus_dir
+        self.labels_file = os.path.join(corpus_dir, "labels.jsonl")
+        self.max_samples = max_samples
+        self._count: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def record(self, image_bytes: bytes, guess: str, accepted: bool, confidence: float,
+               config: Optional[str] = None):
+        with self._lock:
+            os.makedirs(self.corpus_dir, exist_ok=True)
+            digest = hashlib.sha256(image_bytes).hexdigest()
+            file_name = f"{int(time.time() * 1000)}_{digest[:12]}.png"
+            with open(os.path.join(self.corpus_dir, file_name), 'wb') as f:
+                f.write(image_bytes)
+            entry = {"file": file_name, "sha256": digest, "guess": guess,
+                     "accepted": accepted, "config": config, "label": guess if accepted else None,
+                     "label_source": "accepted" if accepted else None, "confidence": round(confidence, 4),
+                     "time": time.strftime('%Y-%m-%d %H:%M:%S')}
+            with open(self.labels_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            if self.max_samples:
+                if self._count is None:
+                    with open(self.labels_file, 'r', encoding='utf-8') as f:
+                        self._count = sum(1 for line in f if line.strip())
+                else:
+                    self._count += 1
+                if self._count > self.max_samples:
+                    self._prune(int(self.max_samples * self.PRUNE_TO))
+
+    def _prune(self, keep: int):
+        """只保留 keep 個樣本：先刪除最舊的未標註樣本，再刪除最舊的已標註樣本。"""
+        with open(self.labels_file, 'r', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        order = sorted(range(len(entries)), key=lambda i: (bool(entries[i].get("label")), i))
+        dropped = set(order[:max(0, len(entries) - keep)])
+        kept_files = {entry["file"] for i, entry in enumerate(entries) if i not in dropped}
+        temp_file = self.labels_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for i, entry in enumerate(entries):
+                if i not in dropped:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(temp_file, self.labels_file)
+        for i in dropped:
+            if entries[i]["file"] not in kept_files:
+                try:
+                    os.remove(os.path.join(self.corpus_dir, entries[i]["file"]))
+                except FileNotFoundError:
+                    pass
+        self._count = len(entries) - len(dropped)
+        print(f"[*] 驗證碼樣本庫超過 {self.max_samples} 筆，已刪除 {len(dropped)} 筆較舊的樣本。")
+
+    def load(self) -> List[dict]:
+        """
+        讀出所有樣本。被拒絕的樣本若同一張圖之後有被接受的答案，標籤取自該答案
+        (label_source 為 "retry")，標籤的來源設定則是答對的那個設定。
+        """
+        entries = []
+        try:
+            with open(self.labels_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entries.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+        accepted = {entry["sha256"]: entry for entry in entries
+                    if entry.get("accepted") and entry.get("label") and entry.get("sha256")}
+        for entry in entries:
+            if entry.get("accepted") and entry.get("label"):
+                entry.setdefault("label_source", "accepted")
+                entry["config"] = entry.get("config") or self.LEGACY_CONFIG
+            elif not entry.get("label") and entry.get("sha256") in accepted:
+                source = accepted[entry["sha256"]]
+                entry.update(label=source["label"], label_source="retry", config=source["config"])
+        return entries
+
+    def set_label(self, file_name: str, label: str):
+        """手動標註一個樣本 (重寫 labels.jsonl，先寫暫存檔再取代)。"""
+        with self._lock:
+            with open(self.labels_file, 'r', encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+            for entry in entries:
+                if entry["file"] == file_name:
+                    entry.update(label=label, label_source="manual")
+            temp_file = self.labels_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(temp_file, self.labels_file)
+
+    def labeled_samples(self) -> List[Tuple[bytes, str, Optional[str]]]:
+        """
+        回傳 (圖片, 標籤, 標籤來源設定)。標籤來自某個設定被接受的答案時，來源設定為該設定名稱；
+        手動標註的樣本為 None，可用來評比所有設定。
+        """
+        samples = []
+        for entry in self.load():
+            if not entry.get("label"):
+                continue
+            source_config = None if entry.get("label_source") == "manual" else entry.get("config")
+            try:
+                with open(os.path.join(self.corpus_dir, entry["file"]), 'rb') as f:
+                    samples.append((f.read(), entry["label"], source_config))
+            except FileNotFoundError:
+                continue
+        return samples
+
+
+def label_captcha_corpus(corpus: CaptchaCorpus):
+    """逐一列出被拒絕且尚未標註的樣本，由使用者輸入正確答案 (直接按 Enter 略過，輸入 q 結束)。"""
+    pending = [entry for entry in corpus.load() if not entry.get("accepted") and not entry.get("label")]
+    print(f"[*] 共有 {len(pending)} 個被拒絕且未標註的驗證碼樣本。")
+    labeled = 0
+    for entry in pending:
+        path = os.path.join(corpus.corpus_dir, entry["file"])
+        answer = input(f"{path} (辨識為 '{entry['guess']}')，正確答案: ").strip()
+        if answer.lower() == "q":
+            break
+        if answer:
+            corpus.set_label(entry["file"], answer.lower())
+            labeled += 1
+    print(f"[*] 本次標註 {labeled} 個樣本。")
+
+
+def benchmark_captcha_configs(ocr: "ddddocr.DdddOcr", corpus: CaptchaCorpus,
+                              configs: List[dict] = CAPTCHA_CONFIGS) -> List[dict]:
+    """
+    以樣本庫離線重播各組前處理設定，回傳依成績排序的結果
+    (準確率、無答案比例、p50/p95 延遲)，第一筆即為最佳設定。
+    每組設定只以「標籤不是它自己答對而來」的樣本評比，避免偏袒產生樣本的設定。
+    """
+    all_samples = corpus.labeled_samples()
+    results = []
+    for config in configs:
+        samples = [(image_bytes, label) for image_bytes, label, source_config in all_samples
+                   if source_config != config["name"]]
+        solver = CaptchaSolver.from_config(ocr, config)
+        correct, empty, latencies = 0, 0, []
+        try:
+            for image_bytes, label in samples:
+                started = time.perf_counter()
+                answer, _, _ = solver.solve(image_bytes)
+                latencies.append((time.perf_counter() - started) * 1000)
+                correct += answer == label
+                empty += not answer
+        finally:
+            solver.shutdown()
+        results.append({
+            "config": config, "samples": len(samples),
+            "accuracy": correct / len(samples) if samples else 0.0,
+            "empty_rate": empty / len(samples) if samples else 0.0,
+            "p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95),
+        })
+    results.sort(key=lambda r: (-r["accuracy"], r["empty_rate"], r["p95_ms"]))
+    return results
+
+
+def print_captcha_benchmark(results: List[dict]):
+    print(f"{'設定':<18}{'樣本':>6}{'準確率':>9}{'無答案':>8}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for r in results:
+        print(f"{r['config']['name']:<18}{r['samples']:>6}{r['accuracy']:>9.1%}"
+              f"{r['empty_rate']:>8.1%}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}")
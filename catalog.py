@@ -0,0 +1,128 @@
+"""
+已下載論文的目錄：依關鍵字分檔的 Markdown、CSV 與 JSON Lines 檢視。
+"""
+import os
+import time
+import csv
+import json
+import threading
+from typing import Optional
+from urllib.parse import quote
+
+from ledger import DownloadLedger
+from thesis_utils import permanent_record_url, sanitize_filename, thesis_title_key
+
+
+class DownloadCatalog:
+    """
+    已下載論文的目錄。帳本中的 catalog 表是已收錄檔案的持久化索引，每篇論文下載完成就收錄一筆，
+    並以附加方式更新各個檢視：依關鍵字分片的 Markdown (keywords/<關鍵字>.md)、catalog.csv 與 catalog.jsonl。
+    總覽 README.md 只連到各關鍵字的分片，出現新關鍵字時才重寫；啟動時不需讀取既有的目錄內容。
+    """
+
+    def __init__(self, ledger: DownloadLedger, catalog_dir: str):
+        self.ledger = ledger
+        self.catalog_dir = catalog_dir
+        self.shard_dir = os.path.join(catalog_dir, "keywords")
+        self.readme_file = os.path.join(catalog_dir, "README.md")
+        self.csv_file = os.path.join(catalog_dir, "catalog.csv")
+        self.json_file = os.path.join(catalog_dir, "catalog.jsonl")
+        self.added = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+    def add(self, record_id: str, keyword: Optional[str], file_path: str, title: Optional[str] = None,
+            url: Optional[str] = None, thesis_id: Optional[str] = None) -> bool:
+        """收錄一個檔案並附加到各個檢視；已收錄過的論文回傳 False。"""
+        entry = {"record_id": record_id, "keyword": keyword, "title": title,
+                 "file_name": os.path.basename(file_path), "file_path": os.path.abspath(file_path),
+                 "url": url, "thesis_id": thesis_id, "cataloged_at": time.time()}
+        with self._lock:
+            if not self.ledger.add_catalog_entry(entry):
+                return False
+            if self._append_views(entry):
+                self.render_index()
+            self.added += 1
+        return True
+
+    def _shard_path(self, keyword: Optional[str]) -> str:
+        return os.path.join(self.shard_dir, f"{sanitize_filename(keyword or '') or '未分類'}.md")
+
+    def _append_views(self, entry: dict) -> bool:
+        """把一筆收錄附加到關鍵字分片、CSV 與 JSONL，回傳是否新建了關鍵字分片。"""
+        shard_path = self._shard_path(entry["keyword"])
+        new_shard = not os.path.exists(shard_path)
+        with open(shard_path, 'a', encoding='utf-8') as f:
+            if new_shard:
+                f.write(f"# {entry['keyword'] or '未分類'}\n\n")
+            f.write(self._markdown_line(entry, self.shard_dir))
+        new_csv = not os.path.exists(self.csv_file)
+        with open(self.csv_file, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=DownloadLedger.CATALOG_FIELDS)
+            if new_csv:
+                writer.writeheader()
+            writer.writerow(entry)
+        with open(self.json_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return new_shard
+
+    @staticmethod
+    def _markdown_line(entry: dict, base_dir: str) -> str:
+        relative_path = os.path.relpath(entry["file_path"], base_dir).replace(os.sep, "/")
+        line = f"* [{entry['file_name']}]({quote(relative_path)})"
+        if entry["title"]:
+            line += f" - {entry['title']}"
+        if entry["url"]:
+            line += f" ([Source]({entry['url']}))"
+        return line + "\n"
+
+    def render_index(self):
+        """重寫總覽 README.md (每個關鍵字一行)，先寫暫存檔再取代，讀者不會看到寫到一半的檔案。"""
+        lines = ["# 論文下載目錄", "", "依關鍵字分類的下載清單：", ""]
+        for keyword in self.ledger.catalog_keywords():
+            relative_path = os.path.relpath(self._shard_path(keyword), self.catalog_dir).replace(os.sep, "/")
+            lines.append(f"* [{keyword or '未分類'}]({quote(relative_path)})")
+        lines += ["", "完整清單：[catalog.csv](catalog.csv)、[catalog.jsonl](catalog.jsonl)", ""]
+        temp_file = self.readme_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+        os.replace(temp_file, self.readme_file)
+
+    def rebuild(self) -> int:
+        """由帳本中的目錄索引重新產生所有檢視 (檢視檔遺失或被手動修改時使用)，回傳收錄篇數。"""
+        count = 0
+        with self._lock:
+            for name in os.listdir(self.shard_dir):
+                if name.endswith(".md"):
+                    os.remove(os.path.join(self.shard_dir, name))
+            for path in (self.csv_file, self.json_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            for entry in self.ledger.catalog_entries():
+                self._append_views(entry)
+                count += 1
+            self.render_index()
+        return count
+
+    def scan(self, download_dir: str) -> int:
+        """
+        收錄下載資料夾中尚未收錄的 PDF (舊版留下或手動放入的檔案)，標題與來源網址由帳本補上。
+        需要列出整個資料夾，只在第一次建立目錄或手動要求時執行。回傳新收錄的篇數。
+        """
+        if not os.path.isdir(download_dir):
+            return 0
+        added = 0
+        for name in sorted(os.listdir(download_dir)):
+            if not name.lower().endswith('.pdf'):
+                continue
+            file_path = os.path.join(download_dir, name)
+            stem = os.path.splitext(name)[0]
+            record_id = thesis_title_key(stem)
+            if not record_id:
+                continue
+            title, url, keyword, thesis_id = self.ledger.file_metadata(file_path, record_id) or (stem, None, None, None)
+            url = (permanent_record_url(thesis_id) if thesis_id else None) or url
+            # 已確認的論文在帳本中以永久識別碼為鍵
+            record_id = thesis_id or record_id
+            added += self.add(record_id, keyword, file_path, title, url, thesis_id)
+        return added
@@ -0,0 +1,83 @@
+"""
+以 Chrome DevTools Protocol 下載事件追蹤瀏覽器下載。
+"""
+import os
+import time
+import json
+from typing import List, Optional, Tuple
+
+from selenium import webdriver
+
+
+class CdpDownloadTracker:
+    """
+    以 Chrome DevTools Protocol 的下載事件追蹤檔案下載，取代掃描資料夾。
+    透過 Browser.setDownloadBehavior(eventsEnabled) 開啟事件，並從 chromedriver 的
+    performance log 讀取 downloadWillBegin / downloadProgress 事件；檔案以下載 GUID
+    命名存放，因此能準確對應到觸發下載的那一篇論文。
+    chromedriver 不一定會把 Browser 網域的事件寫進 performance log：點擊後 begin_timeout 秒內
+    沒有任何 downloadWillBegin 時，wait_for_download 回傳 None 並將 silent 設為 True，
+    由呼叫端改回掃描下載資料夾。
+    """
+    EVENT_METHODS = ("Browser.downloadWillBegin", "Page.downloadWillBegin",
+                     "Browser.downloadProgress", "Page.downloadProgress")
+
+    def __init__(self, driver: webdriver.Chrome, download_dir: str):
+        self.driver = driver
+        self.download_dir = download_dir
+        self.silent = False
+
+    def enable(self):
+        self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allowAndName", "downloadPath": self.download_dir, "eventsEnabled": True})
+
+    def disable(self):
+        """改回一般下載 (以伺服器建議的檔名存放、不送事件)，之後由掃描資料夾偵測下載。"""
+        self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow", "downloadPath": self.download_dir, "eventsEnabled": False})
+
+    def _read_events(self) -> List[Tuple[str, dict]]:
+        events = []
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            if message.get("method") in self.EVENT_METHODS:
+                events.append((message["method"], message.get("params", {})))
+        return events
+
+    def reset(self):
+        """丟棄目前累積的事件，之後出現的第一個下載即屬於下一次點擊。"""
+        self.driver.get_log("performance")
+
+    def wait_for_download(self, timeout: float, poll_interval: float = 0.2,
+                          begin_timeout: Optional[float] = None) -> Optional[Tuple[str, str, int, float]]:
+        """
+        等待下一個下載完成，回傳 (檔案路徑, 建議檔名, 位元組數, 耗時秒數)；
+        下載被取消或逾時則回傳 None。begin_timeout 秒內完全沒有事件時提早回傳 None 並設定 silent。
+        """
+        guid, suggested_name, started = None, "", time.monotonic()
+        deadline = started + timeout
+        self.silent = False
+        while time.monotonic() < deadline:
+            if guid is None and begin_timeout is not None and time.monotonic() - started > begin_timeout:
+                self.silent = True
+                return None
+            for method, params in self._read_events():
+                if method.endswith("downloadWillBegin"):
+                    if guid is None:
+                        guid, suggested_name = params.get("guid"), params.get("suggestedFilename", "")
+                        started = time.monotonic()
+                    continue
+                if params.get("guid") != guid:
+                    continue
+                state = params.get("state")
+                if state == "completed":
+                    return (os.path.join(self.download_dir, guid), suggested_name,
+                            int(params.get("receivedBytes", 0)), time.monotonic() - started)
+                if state == "canceled":
+                    print("\n      - [錯誤] 下載已被瀏覽器取消。")
+                    return None
+            time.sleep(poll_interval)
+        return None
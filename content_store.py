@@ -0,0 +1,65 @@
+"""
+依內容雜湊存放檔案的共用儲存區。
+"""
+import os
+import shutil
+import threading
+from typing import Tuple
+
+
+class ContentStore:
+    """
+    以內容雜湊定址的檔案庫：每份內容只在 `<root>/<hash 前兩碼>/<hash><副檔名>` 存一份，
+    下載資料夾中以論文標題命名的檔案是指向它的硬連結 (檔案系統不支援時改為複製)。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}{ext.lower()}")
+
+    def temp_path(self, name: str) -> str:
+        return os.path.join(self.tmp_dir, f"{name}.{threading.get_ident()}.part")
+
+    def add(self, source: str, digest: str, ext: str) -> Tuple[str, bool]:
+        """將檔案放入庫中，回傳 (物件路徑, 是否為新內容)。內容已存在時不會再寫一份。"""
+        target = self.object_path(digest, ext)
+        if os.path.exists(target):
+            return target, False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+        except FileExistsError:
+            return target, False
+        except OSError as e:
+            print(f"      - [警告] 無法以硬連結存入檔案庫 ({type(e).__name__})，改為複製: {os.path.basename(source)}")
+            temp = self.temp_path(digest)
+            shutil.copy2(source, temp)
+            os.replace(temp, target)
+        return target, True
+
+    @staticmethod
+    def link(object_path: str, dest: str) -> str:
+        """在 dest 建立指向物件的連結；dest 已存在時加上序號，回傳實際路徑。"""
+        base, ext = os.path.splitext(dest)
+        suffix = 1
+        while True:
+            if os.path.exists(dest) and os.path.samefile(dest, object_path):
+                return dest
+            try:
+                os.link(object_path, dest)
+                return dest
+            except FileExistsError:
+                dest = f"{base} ({suffix}){ext}"
+                suffix += 1
+            except OSError as e:
+                if not os.path.exists(dest):
+                    # 多半是檔案庫與下載資料夾不在同一個檔案系統，每個檔案會佔兩份空間
+                    print(f"      - [警告] 無法建立硬連結 ({type(e).__name__})，改為複製: {os.path.basename(dest)}")
+                    shutil.copy2(object_path, dest)
+                    return dest
+                dest = f"{base} ({suffix}){ext}"
+                suffix += 1
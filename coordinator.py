@@ -0,0 +1,212 @@
+"""
+多台機器分散下載用的共用工作佇列 (SQLite) 與狀態報表。
+"""
+import os
+import time
+import sqlite3
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+class WorkCoordinator:
+    """
+    多台機器分散下載用的共用工作佇列與中央目錄。
+    這裡以一個 SQLite 檔作為協調端的替身 (放在共用磁碟上，或單機測試時放在本機)：
+    coordinator 把論文寫入佇列，各台 worker 以自己的登入領取有時限的租約、定期續約並回報結果；
+    租約逾時的工作會在下一次有人領取時自動重新指派。下載結果與 PDF 則回報到中央目錄。
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS work_items (
+            record_id     TEXT PRIMARY KEY,
+            keyword       TEXT,
+            url           TEXT NOT NULL,
+            title         TEXT,
+            thesis_id     TEXT,
+            status        TEXT NOT NULL DEFAULT 'pending'
+                          CHECK (status IN ('pending', 'leased', 'done', 'failed')),
+            lease_owner   TEXT,
+            lease_expires REAL,
+            attempts      INTEGER NOT NULL DEFAULT 0,
+            last_error    TEXT,
+            enqueued_at   REAL NOT NULL,
+            updated_at    REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_work_claim ON work_items (status, lease_expires, enqueued_at);
+        CREATE TABLE IF NOT EXISTS catalog (
+            record_id    TEXT PRIMARY KEY,
+            title        TEXT,
+            keyword      TEXT,
+            url          TEXT,
+            thesis_id    TEXT,
+            worker_id    TEXT,
+            host         TEXT,
+            file_path    TEXT,
+            file_size    INTEGER,
+            content_hash TEXT,
+            completed_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS workers (
+            worker_id TEXT PRIMARY KEY,
+            host      TEXT,
+            last_seen REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key   TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # 共用磁碟上不適合 WAL，使用預設的 rollback journal 並等待其他機器釋放鎖
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.executescript(self.SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, items: List[Tuple[str, str, str, Optional[str], Optional[str]]]) -> int:
+        """加入 (record_id, keyword, url, title, thesis_id)；已在佇列或已完成的論文不重複加入。"""
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO work_items (record_id, keyword, url, title, thesis_id, enqueued_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", [item + (now, now) for item in items])
+            return conn.total_changes - before
+
+    def is_known(self, record_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM work_items WHERE record_id = ?", (record_id,)).fetchone() is not None
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Tuple[str, str, str, Optional[str], int]]:
+        """
+        領取一筆待處理或租約已逾時的工作，回傳 (record_id, keyword, url, title, attempts)。
+        逾時的租約即代表原 worker 已失聯，直接由這次領取的人接手；
+        已達 max_attempts 次的逾時工作與 fail() 一樣標記為失敗，不再接手。
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO workers (worker_id, host, last_seen) VALUES (?, ?, ?)",
+                         (worker_id, socket.gethostname(), now))
+            expired = conn.execute(
+                "UPDATE work_items SET status = 'failed', lease_owner = NULL, lease_expires = NULL, "
+                "last_error = 'lease_expired', updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)).rowcount
+            row = conn.execute(
+                "SELECT record_id, keyword, url, title, attempts, lease_owner FROM work_items "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY enqueued_at LIMIT 1", (now,)).fetchone()
+            if expired:
+                print(f"[*] [分散] {expired} 筆逾時的工作已達 {self.max_attempts} 次嘗試，標記為失敗。")
+            if row is None:
+                return None
+            record_id, keyword, url, title, attempts, previous_owner = row
+            conn.execute(
+                "UPDATE work_items SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE record_id = ?", (worker_id, now + lease_seconds, now, record_id))
+        if previous_owner and previous_owner != worker_id:
+            print(f"[*] [分散] {worker_id} 接手 {previous_owner} 逾時未完成的工作: {title}")
+        return record_id, keyword, url, title, attempts + 1
+
+    def heartbeat(self, worker_id: str, record_id: str, lease_seconds: float) -> bool:
+        """延長租約；若租約已被他人接手則回傳 False。"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE workers SET last_seen = ? WHERE worker_id = ?", (now, worker_id))
+            cursor = conn.execute(
+                "UPDATE work_items SET lease_expires = ?, updated_at = ? "
+                "WHERE record_id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + lease_seconds, now, record_id, worker_id))
+            return cursor.rowcount == 1
+
+    def complete(self, worker_id: str, record_id: str) -> bool:
+        """標記完成。工作已被其他 worker 完成時回傳 False。"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE work_items SET status = 'done', lease_owner = ?, lease_expires = NULL, last_error = NULL, "
+                "updated_at = ? WHERE record_id = ? AND status != 'done'", (worker_id, now, record_id))
+            return cursor.rowcount == 1
+
+    def fail(self, worker_id: str, record_id: str, reason: str, retryable: bool = True):
+        """回報失敗：可重試且未超過次數上限時放回佇列，否則標記為失敗。"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE work_items SET status = CASE WHEN ? AND attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? "
+                "WHERE record_id = ? AND lease_owner = ? AND status = 'leased'",
+                (int(retryable), self.max_attempts, reason, now, record_id, worker_id))
+
+    def record_catalog(self, record_id: str, worker_id: str, file_path: str, file_size: int,
+                       content_hash: str):
+        """把已下載檔案登錄到中央目錄 (標題、關鍵字等資訊取自工作佇列)。"""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog (record_id, title, keyword, url, thesis_id, worker_id, host, "
+                "file_path, file_size, content_hash, completed_at) "
+                "SELECT ?, title, keyword, url, thesis_id, ?, ?, ?, ?, ?, ? FROM work_items WHERE record_id = ?",
+                (record_id, worker_id, socket.gethostname(), file_path, file_size, content_hash, time.time(),
+                 record_id))
+
+    def set_enumerating(self, owner: str, active: bool):
+        """coordinator 列舉中時 worker 即使暫時領不到工作也會繼續等待。"""
+        with self._transaction() as conn:
+            if active:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             (f"enumerating:{owner}", time.strftime('%Y-%m-%d %H:%M:%S')))
+            else:
+                conn.execute("DELETE FROM meta WHERE key = ?", (f"enumerating:{owner}",))
+
+    def enumeration_active(self) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM meta WHERE key LIKE 'enumerating:%' LIMIT 1").fetchone() is not None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM work_items GROUP BY status").fetchall())
+            expired = self._conn.execute(
+                "SELECT COUNT(*) FROM work_items WHERE status = 'leased' AND lease_expires < ?",
+                (time.time(),)).fetchone()[0]
+            cataloged = self._conn.execute("SELECT COUNT(*) FROM catalog").fetchone()[0]
+        counts.update(expired_leases=expired, cataloged=cataloged)
+        return counts
+
+    def worker_summary(self) -> List[Tuple[str, str, float, int]]:
+        """各 worker 的 (ID, 主機, 最後回報時間, 完成筆數)。"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT w.worker_id, w.host, w.last_seen, "
+                "(SELECT COUNT(*) FROM catalog c WHERE c.worker_id = w.worker_id) "
+                "FROM workers w ORDER BY w.worker_id").fetchall()
+
+
+def print_coordinator_status(coordinator: WorkCoordinator):
+    stats = coordinator.stats()
+    print(f"[*] 工作佇列: 待處理 {stats.get('pending', 0)}、租用中 {stats.get('leased', 0)} "
+          f"(逾時 {stats['expired_leases']})、完成 {stats.get('done', 0)}、失敗 {stats.get('failed', 0)}；"
+          f"中央目錄 {stats['cataloged']} 篇。")
+    for worker_id, host, last_seen, completed in coordinator.worker_summary():
+        print(f"    - {worker_id} @ {host}: 完成 {completed} 篇，最後回報 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_seen))}")
@@ -4,18 +4,30 @@ import time
 import re
 import random
 import zipfile
-import shutil
 import math
-from typing import List, Set, Optional, Tuple
-from urllib.parse import quote
+import json
+import base64
+import sys
+import argparse
+import cProfile
+import dataclasses
+import pstats
+import hashlib
+import socket
+import queue
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Set, Optional, Tuple
+from urllib.parse import unquote, urljoin, urlparse
 
 import ddddocr
-from PIL import Image
-from io import BytesIO
+import requests
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.remote.webelement import WebElement
@@ -28,64 +40,521 @@ from selenium.common.exceptions import (
     WebDriverException
 )
 
+from accounts import AccountPool, load_accounts, print_account_status
+from captcha import (CaptchaCorpus, CaptchaSolver, benchmark_captcha_configs,
+                     label_captcha_corpus, print_captcha_benchmark)
+from catalog import DownloadCatalog
+from cdp_download import CdpDownloadTracker
+from content_store import ContentStore
+from coordinator import WorkCoordinator, print_coordinator_status
+from fulltext_index import FullTextIndex, print_index_stats, update_fulltext_index
+from harvest import HarvestWriter
+from ledger import DownloadLedger
+from metrics import StageMetrics, timed_stage
+from mock_server import MockNdltdServer
+from pacing import AdaptivePacer, TokenBucketRateLimiter
+from parsers import (classify_listing_availability, parse_listing_html, parse_listing_webdriver,
+                     parse_record_html)
+from thesis_utils import (disambiguated_key, extract_thesis_id, file_sha256, is_provisional_key, listing_signature,
+                          permanent_record_url, provisional_base, provisional_key, sanitize_filename,
+                          thesis_title_key)
+
 # 獲取腳本所在的目錄，確保所有檔案路徑都是相對於腳本位置的
 BASE_DIR = os.path.dirname(os.path.abspath(
     __file__)) if '__file__' in locals() else os.getcwd()
 
 
+@dataclasses.dataclass
+class DownloaderConfig:
+    """
+    BaseThesisDownloader 的所有設定。檔案與資料夾路徑皆相對於 BASE_DIR；
+    None 表示停用該功能 (例如 captcha_corpus_dir=None 不保存驗證碼樣本)。
+    """
+    # 檔案位置
+    download_dir: str = "downloaded_theses"
+    log_file: str = "download_log.txt"
+    page_progress_file: str = "page_progress.txt"
+    ledger_file: str = "download_ledger.sqlite3"
+    chrome_profile_dir: Optional[str] = None
+    content_store_dir: Optional[str] = None  # 依內容雜湊存放檔案的檔案庫，None 表示下載資料夾旁的 <download_dir>_store
+    catalog_output_dir: str = "catalog"  # ThesisDownloaderWithReadme 的下載目錄 (Markdown/CSV/JSON)
+    # 下載量與節奏
+    max_downloads_per_session: int = 70
+    items_per_page: int = 10
+    inter_article_sleep_range: Tuple[float, float] = (10.0, 20.0)
+    inter_page_sleep_range: Tuple[float, float] = (20.0, 45.0)
+    adaptive_pacing: bool = False
+    article_delay_bounds: Optional[Tuple[float, float]] = None
+    page_delay_bounds: Optional[Tuple[float, float]] = None
+    rate_limit_per_minute: Optional[float] = None
+    rate_limit_burst: int = 1
+    # 爬取模式
+    campaign_keywords: Optional[List[str]] = None
+    delta_crawl: bool = False
+    frontier_mode: bool = False
+    num_workers: int = 1
+    fast_listing_parser: bool = True
+    listing_snapshot_dir: Optional[str] = None
+    # 下載方式與瀏覽器
+    direct_download: bool = False
+    cdp_download_events: bool = False
+    background_postprocess: bool = True
+    lean_browser: bool = False
+    browser_recycle_records: Optional[int] = None
+    browser_recycle_rss_mb: Optional[float] = None
+    site_root: str = "https://ndltd.ncl.edu.tw"
+    headless: bool = False
+    # 驗證碼
+    captcha_min_confidence: float = 0.4
+    captcha_max_rerolls: int = 3
+    captcha_corpus_dir: Optional[str] = None
+    captcha_corpus_max_samples: Optional[int] = 5000
+    captcha_auto_tune: bool = True
+    captcha_min_samples: int = 30
+    prewarm_ocr: bool = False
+    # 延後重試佇列
+    retry_max_attempts: int = 5
+    retry_base_delay: float = 600.0
+    retry_max_delay: float = 86400.0
+    retry_lease_seconds: float = 3600.0  # 取出重試後保留的秒數，逾時未回報 (例如程式中斷) 即可再被取出
+    # 多帳號
+    accounts_file: Optional[str] = None
+    account_trouble_threshold: int = 3
+    # 分散模式 (coordinator / worker)
+    distributed_role: Optional[str] = None
+    coordinator_store: Optional[str] = None
+    worker_id: Optional[str] = None
+    catalog_dir: Optional[str] = None  # worker 回報檔案的中央目錄 (ContentStore)
+    lease_seconds: float = 600.0
+    # 書目收割模式
+    harvest_output: Optional[str] = None
+    harvest_concurrency: int = 4
+    harvest_page_sleep_range: Tuple[float, float] = (3.0, 6.0)
+    # 全文索引與觀測
+    fulltext_index_file: Optional[str] = None
+    index_workers: int = 2
+    metrics_dir: Optional[str] = None
+    metrics_port: Optional[int] = None
+    profile_output: Optional[str] = None
+
+
 class BaseThesisDownloader:
     """
-    臺灣博碩士論文網自動下載器 - 基礎類別 (v4 邏輯)。
-    這個基礎類別包含了所有核心的爬取、解析和下載邏輯。
+    臺灣博碩士論文網自動下載器 - 基礎類別。
+    這個基礎類別包含了所有核心的爬取、解析和下載邏輯，設定集中在 DownloaderConfig。
     """
-    # ... (此基礎類別的程式碼與前一版本完全相同，此處為節省篇幅省略)
-    # ... (為了保持完整性，在下面的最終程式碼區塊中會包含全部內容)
-
-    def __init__(self,
-                 keyword: str,
-                 download_dir: str = "downloaded_theses",
-                 log_file: str = "download_log.txt",
-                 page_progress_file: str = "page_progress.txt",
-                 max_downloads_per_session: int = 70,
-                 items_per_page: int = 10,
-                 inter_article_sleep_range: Tuple[float, float] = (10.0, 20.0),
-                 inter_page_sleep_range: Tuple[float, float] = (20.0, 45.0)
-                 ):
-        self.base_url = "https://ndltd.ncl.edu.tw/cgi-bin/gs32/gsweb.cgi/login?o=dwebmge"
+    # 改用 DownloaderConfig 之前，建構子在 keyword 之後依這個順序接受位置參數
+    LEGACY_POSITIONAL_OPTIONS = (
+        "download_dir", "log_file", "page_progress_file", "max_downloads_per_session", "items_per_page",
+        "inter_article_sleep_range", "inter_page_sleep_range", "num_workers", "rate_limit_per_minute",
+        "rate_limit_burst", "direct_download", "cdp_download_events", "captcha_min_confidence",
+        "captcha_max_rerolls", "captcha_corpus_dir", "captcha_auto_tune", "captcha_min_samples", "ledger_file",
+        "fast_listing_parser", "listing_snapshot_dir", "frontier_mode", "adaptive_pacing",
+        "article_delay_bounds", "page_delay_bounds", "chrome_profile_dir", "prewarm_ocr",
+        "background_postprocess", "campaign_keywords", "metrics_dir", "metrics_port", "profile_output",
+        "distributed_role", "coordinator_store", "worker_id", "catalog_dir", "lease_seconds",
+        "fulltext_index_file", "index_workers", "harvest_output", "harvest_concurrency",
+        "harvest_page_sleep_range", "retry_max_attempts", "retry_base_delay", "retry_max_delay",
+        "lean_browser", "browser_recycle_records", "browser_recycle_rss_mb", "site_root", "headless",
+        "accounts_file", "account_trouble_threshold", "delta_crawl")
+    KNOWN_PAGE_DELAY = (1.0, 3.0)  # 整頁論文皆已處理過時的翻頁等待 (秒)
+    JUMP_RETRIES = 3  # 以 jmpage 表單跳頁的嘗試次數，之後改為逐頁點擊
+    WORKER_POLL_INTERVAL = 15  # 分散模式 worker 領不到工作時的等待秒數
+    WORKER_IDLE_TIMEOUT = 600  # coordinator 仍在列舉但長時間沒有新工作時，worker 結束前的等待上限
+    FULLTEXT_PROBE_TIMEOUT = 3  # 詳目頁載入後確認有無「電子全文」連結的最長等待 (秒)
+    FULLTEXT_LINK_XPATH = "//a[em[text()='電子全文']]"
+    # 詳目頁的書目欄位 (標籤儲存格)，看得到這些欄位才算詳目頁已載入，可以判定有無電子全文
+    RECORD_FIELDS_XPATH = "//th[contains(@class, 'std1')] | //td[contains(@class, 'std1')]"
+    HARVEST_REQUEST_TIMEOUT = 30  # 書目收割模式單一詳目頁請求的逾時 (秒)
+    # 精簡瀏覽器模式以 CDP 擋下的資源：圖片、樣式、字型、影音與追蹤程式碼。
+    # 驗證碼圖片由 random_validation CGI 產生，網址沒有圖片副檔名，不會被擋下。
+    LEAN_BLOCKED_URLS = ["*.jpg", "*.jpeg", "*.png", "*.gif", "*.svg", "*.ico", "*.webp", "*.css",
+                         "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.mp4", "*.webm",
+                         "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*"]
+    POSTPROCESS_NAMES_LIMIT = 256  # 記住最近幾個後處理產生的檔名，掃描下載資料夾時不誤認為新下載
+    CAPTCHA_LOAD_TIMEOUT = 5  # eager 載入策略下，等待驗證碼圖片載入完成的秒數
+    CDP_EVENT_GRACE = 15  # 點擊下載後等待第一個 CDP 下載事件的秒數，逾時改回掃描下載資料夾
+    # CDP allowAndName 模式下以下載 GUID 命名的檔案
+    DOWNLOAD_GUID_NAME = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
+    UNAVAILABLE_LABELS = {
+        "embargoed": "論文尚未公開 (Embargo)",
+        "ip_restricted": "論文限校內IP (IP Restricted)",
+        "no_fulltext": "沒有電子全文",
+    }
+
+    def __init__(self, keyword: str, *args, config: Optional[DownloaderConfig] = None, **options):
+        """
+        config 為 DownloaderConfig，可作為第二個位置參數傳入；options 可個別覆寫其中的欄位，
+        例如 BaseThesisDownloader("台股", max_downloads_per_session=20)。
+        舊版依位置傳入設定的呼叫 (例如 BaseThesisDownloader("台股", "downloads", "log.txt")) 仍可使用，
+        依 LEGACY_POSITIONAL_OPTIONS 的順序對應到 DownloaderConfig 的欄位。
+        """
+        if args and isinstance(args[0], DownloaderConfig):
+            if config is not None or len(args) > 1:
+                raise TypeError("以位置參數傳入 DownloaderConfig 時，其餘設定必須以關鍵字參數傳入")
+            config, args = args[0], ()
+        if len(args) > len(self.LEGACY_POSITIONAL_OPTIONS):
+            raise TypeError(f"位置參數最多 {len(self.LEGACY_POSITIONAL_OPTIONS) + 1} 個，收到 {len(args) + 1} 個")
+        positional = dict(zip(self.LEGACY_POSITIONAL_OPTIONS, args))
+        duplicated = sorted(positional.keys() & options.keys())
+        if duplicated:
+            raise TypeError(f"設定 {duplicated} 同時以位置參數與關鍵字參數傳入")
+        config = dataclasses.replace(config or DownloaderConfig(), **positional, **options)
+        self.config = config
+        self._launch_started = time.monotonic()
+        self.startup_timings: Dict[str, float] = {}
+        metrics_path = os.path.join(BASE_DIR, config.metrics_dir) if config.metrics_dir else None
+        self.metrics = StageMetrics(
+            os.path.join(metrics_path, "events.jsonl") if metrics_path else None,
+            os.path.join(metrics_path, "thesis_downloader.prom") if metrics_path else None)
+        if config.metrics_port:
+            self.metrics.serve(config.metrics_port)
+            print(f"[*] Prometheus 指標: http://127.0.0.1:{config.metrics_port}/metrics")
+        self.profile_output = os.path.join(BASE_DIR, config.profile_output) if config.profile_output else None
+        self._profiler: Optional[cProfile.Profile] = None
+        # 分散模式：coordinator 列舉論文寫入共用佇列，worker 領取租約下載並回報到中央目錄
+        if config.distributed_role not in (None, "coordinator", "worker"):
+            raise ValueError(f"未知的分散模式角色: {config.distributed_role}")
+        self.distributed_role = config.distributed_role
+        self.coordinator = WorkCoordinator(os.path.join(BASE_DIR, config.coordinator_store)) \
+            if config.distributed_role else None
+        self.worker_id = config.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = config.lease_seconds
+        self.catalog_store = ContentStore(os.path.join(BASE_DIR, config.catalog_dir)) \
+            if config.distributed_role == "worker" and config.catalog_dir else None
+        # 執行結束時以子行程擷取新下載 PDF 的全文並更新 FTS 索引
+        self.fulltext_index_file = os.path.join(BASE_DIR, config.fulltext_index_file) if config.fulltext_index_file else None
+        self.index_workers = config.index_workers
+        # 書目收割模式：不下載 PDF，以共用連線池的 HTTP 請求平行抓取詳目頁並串流寫出書目
+        self.harvest_output = os.path.join(BASE_DIR, config.harvest_output) if config.harvest_output else None
+        self.harvest_concurrency = max(1, config.harvest_concurrency)
+        self.harvest_page_sleep_range = config.harvest_page_sleep_range
+        self.harvest_writer: Optional[HarvestWriter] = None
+        # 下載失敗的論文放進帳本中的延後重試佇列，以指數退避在之後的閒置時段或執行結束前重試
+        self.retry_max_attempts = config.retry_max_attempts
+        self.retry_base_delay = config.retry_base_delay
+        self.retry_max_delay = config.retry_max_delay
+        self.retry_lease_seconds = config.retry_lease_seconds
+        # 精簡瀏覽器：擋下非必要資源、eager 載入並重複使用分頁；處理 N 篇或記憶體超過門檻時重啟 Chrome
+        self.lean_browser = config.lean_browser
+        self.browser_recycle_records = config.browser_recycle_records
+        self.browser_recycle_rss_mb = config.browser_recycle_rss_mb
+        self._browser_rss_peak = 0.0
+        self._rss_unavailable_warned = False
+        # site_root 可改指向本機的 MockNdltdServer 進行離線評測
+        self.site_root = config.site_root.rstrip("/")
+        self.headless = config.headless
+        self.base_url = f"{self.site_root}/cgi-bin/gs32/gsweb.cgi/login?o=dwebmge"
+        self.ledger = DownloadLedger(os.path.join(BASE_DIR, config.ledger_file))
+        # 多帳號模式：主瀏覽器只負責翻頁，每個帳號以自己的瀏覽器設定檔下載，依剩餘額度分派工作
+        self.account_pool = AccountPool(load_accounts(os.path.join(BASE_DIR, config.accounts_file)), self.ledger,
+                                        config.account_trouble_threshold) if config.accounts_file else None
         self.keyword = keyword
-        self.download_dir = os.path.join(BASE_DIR, download_dir)
-        self.log_file = os.path.join(BASE_DIR, log_file)
-        self.page_progress_file = os.path.join(BASE_DIR, page_progress_file)
-        self.max_downloads_per_session = max_downloads_per_session
-        self.items_per_page = items_per_page
-        self.inter_article_sleep_range = inter_article_sleep_range
-        self.inter_page_sleep_range = inter_page_sleep_range
+        # campaign 模式：多個關鍵字依序在同一個瀏覽器與登入狀態中處理，各自保存頁數進度
+        self.keywords = list(dict.fromkeys([keyword] + list(config.campaign_keywords or [])))
+        self._last_page_pending: Optional[int] = None
+        # delta 模式：已爬完的關鍵字改以新到舊排序重新搜尋，遇到整頁都是已知論文即停止
+        self.delta_crawl = config.delta_crawl
+        self._delta_active = False
+        self._delta_sorted = False
+        self._delta_hwm_year: Optional[int] = None
+        self._delta_new_records = 0
+        self._delta_max_year: Optional[int] = None
+        self._listing_new: Optional[int] = None
+        # 列表上的 (網址, 標題) 對應到的帳本鍵與列表簽章；標題相同的不同論文會分到不同的鍵
+        self._listing_identity: Dict[Tuple[str, str], Tuple[str, Optional[str]]] = {}
+        self._resume_page: Optional[int] = None
+        self.download_dir = os.path.join(BASE_DIR, config.download_dir)
+        self.log_file = os.path.join(BASE_DIR, config.log_file)
+        self.page_progress_file = os.path.join(BASE_DIR, config.page_progress_file)
+        self.fast_listing_parser = config.fast_listing_parser
+        self.frontier_mode = config.frontier_mode
+        self.reached_last_page = False
+        self.listing_snapshot_dir = os.path.join(
+            BASE_DIR, config.listing_snapshot_dir) if config.listing_snapshot_dir else None
+        self.max_downloads_per_session = config.max_downloads_per_session
+        self.items_per_page = config.items_per_page
+        self.inter_article_sleep_range = config.inter_article_sleep_range
+        self.inter_page_sleep_range = config.inter_page_sleep_range
+        self.pacer: Optional[AdaptivePacer] = None
+        if config.adaptive_pacing:
+            # 未指定上下限時，以固定範圍的下緣為起點，允許降到其 1/4、最高退避到上緣的 3 倍
+            bounds = {
+                "article": config.article_delay_bounds or (config.inter_article_sleep_range[0] / 4, config.inter_article_sleep_range[1] * 3),
+                "page": config.page_delay_bounds or (config.inter_page_sleep_range[0] / 4, config.inter_page_sleep_range[1] * 3),
+            }
+            self.pacer = AdaptivePacer(bounds, {"article": config.inter_article_sleep_range[0],
+                                                "page": config.inter_page_sleep_range[0]})
+        self.num_workers = max(1, config.num_workers)
+        self.rate_limiter = TokenBucketRateLimiter(
+            config.rate_limit_per_minute, config.rate_limit_burst) if config.rate_limit_per_minute else None
+        self.direct_download = config.direct_download
+        self.cdp_download_events = config.cdp_download_events
+        # 平行模式下，下載計數、日誌與進度檔都由這把鎖保護
+        self._state_lock = threading.RLock()
+        self._inflight_downloads = 0
+        self._inflight_urls: Set[str] = set()
+        self._page_pending: Dict[int, int] = {}
+        # 下載完成後的雜湊、去重、解壓縮與改名移到背景執行，不佔用瀏覽器的時間
+        self.content_store = self._open_content_store(config.content_store_dir)
+        self._precomputed_hashes: Dict[str, str] = {}
+        # 只需要記住最近產生的檔名 (插入順序即新舊順序)：更早的檔案在點擊下載前就已存在於快照中
+        self._postprocess_names: Dict[str, None] = {}
+        self._postprocess_pool = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="postprocess") if config.background_postprocess else None
         self.downloaded_urls, self.last_crawled_page = self._load_log()
         self.session_download_count = 0
         self.total_pages = 0
+        # 瀏覽器相關狀態以執行緒區分，每個 worker 擁有自己的 driver
+        self._browser = threading.local()
         self.driver: Optional[webdriver.Chrome] = None
         self.wait: Optional[WebDriverWait] = None
         self.main_window_handle: Optional[str] = None
-        print("[-] 正在初始化 ddddocr 引擎...")
-        self.ocr = ddddocr.DdddOcr(show_ad=False)
-        print("[*] ddddocr 引擎初始化完成。")
+        self.chrome_profile_dir = os.path.join(
+            BASE_DIR, config.chrome_profile_dir) if config.chrome_profile_dir else None
+        self.captcha_corpus = CaptchaCorpus(
+            os.path.join(BASE_DIR, config.captcha_corpus_dir),
+            config.captcha_corpus_max_samples) if config.captcha_corpus_dir else None
+        self.captcha_benchmark_file = os.path.join(
+            BASE_DIR, "captcha_benchmark.json")
+        self.captcha_auto_tune = config.captcha_auto_tune
+        self.captcha_min_samples = config.captcha_min_samples
+        self.captcha_min_confidence = config.captcha_min_confidence
+        self.captcha_max_rerolls = config.captcha_max_rerolls
+        # ddddocr 模型延後到第一次需要辨識驗證碼時才載入，或在背景預先載入
+        self._ocr = None
+        self._captcha_solver: Optional[CaptchaSolver] = None
+        self._ocr_lock = threading.RLock()
+        if config.prewarm_ocr:
+            threading.Thread(target=lambda: self.captcha_solver,
+                             name="ocr-prewarm", daemon=True).start()
         print(f"[*] 本次執行最大下載量設定為: {self.max_downloads_per_session} 篇")
         print(f"[*] 文章間延遲範圍: {self.inter_article_sleep_range} 秒")
         print(f"[*] 翻頁間延遲範圍: {self.inter_page_sleep_range} 秒")
+        if self.pacer:
+            print(f"[*] 自適應節奏控制: 延遲上下限 {self.pacer.bounds}")
+        if len(self.keywords) > 1:
+            print(f"[*] Campaign 模式: {len(self.keywords)} 個關鍵字 {self.keywords}")
+        if self.delta_crawl:
+            print("[*] Delta 模式: 已爬完的關鍵字只抓取上次之後新增的論文")
+        if self.coordinator:
+            print(f"[*] 分散模式: {self.distributed_role} ({self.worker_id})，共用佇列 {self.coordinator.db_path}")
+        if self.harvest_output:
+            print(f"[*] 書目收割模式: {self.harvest_concurrency} 個並行請求，輸出到 {self.harvest_output}")
+        if self.lean_browser:
+            print("[*] 精簡瀏覽器模式: 擋下圖片/樣式/字型、eager 載入、重複使用分頁")
+        if self.browser_recycle_records or self.browser_recycle_rss_mb:
+            print(f"[*] 瀏覽器定期重啟: 每 {self.browser_recycle_records or '-'} 篇"
+                  f"或記憶體超過 {self.browser_recycle_rss_mb or '-'} MB")
+        if self.account_pool:
+            print(f"[*] 多帳號模式: {len(self.account_pool.accounts)} 個帳號 {list(self.account_pool.accounts)}")
+        if self.num_workers > 1:
+            print(f"[*] 平行模式: {self.num_workers} 個瀏覽器 worker")
+        if self.rate_limiter:
+            print(
+                f"[*] 全域限速: 每分鐘 {config.rate_limit_per_minute} 次請求 (突發 {self.rate_limiter.capacity})")
+        if self.direct_download:
+            print("[*] 直接下載模式: 以 HTTP 串流下載檔案，不經過 Chrome 下載管理員")
+        if self.cdp_download_events:
+            print("[*] 以 CDP 下載事件追蹤瀏覽器下載進度")
+
+    @property
+    def ocr(self) -> "ddddocr.DdddOcr":
+        with self._ocr_lock:
+            if self._ocr is None:
+                print("[-] 正在初始化 ddddocr 引擎...")
+                started = time.monotonic()
+                self._ocr = ddddocr.DdddOcr(show_ad=False)
+                print(
+                    f"[*] ddddocr 引擎初始化完成 ({time.monotonic() - started:.1f} 秒)。")
+            return self._ocr
+
+    @property
+    def captcha_solver(self) -> CaptchaSolver:
+        with self._ocr_lock:
+            if self._captcha_solver is None:
+                self._captcha_solver = self._build_captcha_solver(
+                    self.captcha_auto_tune, self.captcha_min_samples)
+            return self._captcha_solver
+
+    @contextmanager
+    def _startup_phase(self, name: str):
+        """記錄啟動階段 (瀏覽器啟動、登入、搜尋) 各自花費的時間。"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.startup_timings[name] = time.monotonic() - started
+            self.metrics.observe(f"startup:{name}", self.startup_timings[name])
+
+    def _report_time_to_first_download(self):
+        total = time.monotonic() - self._launch_started
+        phases = "、".join(f"{name} {seconds:.1f} 秒" for name,
+                          seconds in self.startup_timings.items())
+        print(f"[*] 從啟動到第一篇下載完成共 {total:.1f} 秒 ({phases})。")
+
+    def _build_captcha_solver(self, auto_tune: bool, min_samples: int) -> CaptchaSolver:
+        """
+        依樣本庫的離線評測結果挑選驗證碼前處理設定。
+        樣本數有變動時才重新評測，否則沿用 captcha_benchmark.json 中的結果。
+        """
+        if not (auto_tune and self.captcha_corpus):
+            return CaptchaSolver(self.ocr)
+        labeled = sum(1 for entry in self.captcha_corpus.load()
+                      if entry.get("label"))
+        if labeled < min_samples:
+            print(f"[*] 驗證碼樣本數 {labeled} 筆，不足 {min_samples} 筆，使用預設設定。")
+            return CaptchaSolver(self.ocr)
+        try:
+            with open(self.captcha_benchmark_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (FileNotFoundError, ValueError):
+            cached = {}
+        if cached.get("samples") == labeled and cached.get("results"):
+            results = cached["results"]
+        else:
+            print(f"[-] 正在以 {labeled} 筆驗證碼樣本評測前處理設定...")
+            results = benchmark_captcha_configs(self.ocr, self.captcha_corpus)
+            print_captcha_benchmark(results)
+            with open(self.captcha_benchmark_file, 'w', encoding='utf-8') as f:
+                json.dump({"samples": labeled, "results": results},
+                          f, ensure_ascii=False, indent=2)
+        best = results[0]
+        print(
+            f"[*] 驗證碼採用設定 '{best['config']['name']}' (離線準確率 {best['accuracy']:.1%}, p95 {best['p95_ms']:.0f} ms)")
+        return CaptchaSolver.from_config(self.ocr, best["config"])
+
+    # 以下屬性皆為執行緒區域變數，讓同一個下載器物件可以同時驅動多個瀏覽器
+    @property
+    def driver(self) -> Optional[webdriver.Chrome]:
+        return getattr(self._browser, 'driver', None)
+
+    @driver.setter
+    def driver(self, value: Optional[webdriver.Chrome]):
+        self._browser.driver = value
+
+    @property
+    def wait(self) -> Optional[WebDriverWait]:
+        return getattr(self._browser, 'wait', None)
+
+    @wait.setter
+    def wait(self, value: Optional[WebDriverWait]):
+        self._browser.wait = value
+
+    @property
+    def main_window_handle(self) -> Optional[str]:
+        return getattr(self._browser, 'main_window_handle', None)
+
+    @main_window_handle.setter
+    def main_window_handle(self, value: Optional[str]):
+        self._browser.main_window_handle = value
+
+    @property
+    def browser_download_dir(self) -> str:
+        """目前執行緒的瀏覽器實際存放下載檔的資料夾。"""
+        return getattr(self._browser, 'download_dir', None) or self.download_dir
 
     def _normalize_url(self, url: str) -> Optional[str]:
+        """舊版日誌的鍵 (`/record?r1=..`)，只用於匯入 download_log.txt。"""
         if not isinstance(url, str):
             return None
         match = re.search(r'/record\?.*$', url)
         return match.group(0) if match else None
 
-    def _setup_driver(self):
+    def _record_key(self, title: Optional[str], url: Optional[str] = None) -> Optional[str]:
+        """
+        論文在帳本中的鍵。URL 中的 r1 只是這次搜尋結果的名次，換關鍵字或排序就會變；
+        已知永久識別碼的論文以識別碼為鍵，標題鍵只是打開詳目頁之前的提示 (見 _assign_listing_keys)，
+        打開後即改用識別碼 (見 _check_thesis_identity)。
+        """
+        identity = self._listing_identity.get((url, title)) if url and title else None
+        return identity[0] if identity else thesis_title_key(title)
+
+    def _listing_sig(self, url: Optional[str], title: Optional[str]) -> Optional[str]:
+        identity = self._listing_identity.get((url, title)) if url and title else None
+        return identity[1] if identity else None
+
+    def _bind_record_key(self, url: str, title: Optional[str], record_id: str):
+        """佇列或重試中的論文已有帳本鍵，處理時沿用該鍵而不是重新由標題推得。"""
+        if url and title:
+            with self._state_lock:
+                self._listing_identity[(url, title)] = (record_id, self._listing_sig(url, title))
+
+    def _assign_listing_keys(self, records: List[dict]):
+        """
+        決定列表頁上每篇論文的帳本鍵。標題鍵若是已確認論文的別名，且列表上的作者/學校/學年度
+        只符合其中一篇，直接使用該篇的永久識別碼；符合不只一篇或都不符合時，改用依列表網址而定的暫時鍵，
+        打開詳目頁後才知道是哪一篇。尚未確認過的標題鍵在帳本中已屬於另一組作者/學校/學年度時，
+        改用標題鍵加上簽章雜湊的鍵；舊紀錄沒有簽章時視為同一篇並補上簽章。
+        """
+        entries = [(record["url"], record["title"], thesis_title_key(record["title"]), listing_signature(record))
+                   for record in records if record["url"] and record["title"]]
+        entries = [entry for entry in entries if entry[2]]
+        hints = {base for _, _, base, _ in entries}
+        hints.update(disambiguated_key(base, sig) for _, _, base, sig in entries if sig)
+        confirmed = self.ledger.resolve_aliases(sorted(hints))
+        claimed = self.ledger.listing_signatures(sorted({base for _, _, base, _ in entries}))
+        seen: Set[str] = set()
+        with self._state_lock:
+            for url, title, base, sig in entries:
+                targets = dict(confirmed.get(base, []))
+                if sig:
+                    targets.update(confirmed.get(disambiguated_key(base, sig), []))
+                matches = [record_id for record_id, target_sig in targets.items() if target_sig == sig]
+                if len(matches) == 1:
+                    key = matches[0]
+                elif targets or (not sig and base in seen):
+                    key = provisional_key(base, url)
+                else:
+                    key = base
+                    if sig:
+                        owner = claimed.get(base)
+                        if owner is not None and owner != sig:
+                            key = disambiguated_key(base, sig)
+                            print(f"    - [識別] 標題與帳本中另一篇論文相同 ({owner} ≠ {sig})，改用獨立的鍵: {title}")
+                        else:
+                            claimed[base] = sig
+                seen.add(base)
+                self._listing_identity[(url, title)] = (key, sig)
+
+    def _check_thesis_identity(self, title: str, url: Optional[str] = None) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        讀取目前詳目頁的永久識別碼，之後這篇論文改以識別碼為帳本鍵；若同一篇論文先前已用其他鍵下載過，
+        回傳該筆紀錄。
+        """
+        record_key = self._record_key(title, url)
+        thesis_id = extract_thesis_id(self.driver.page_source)
+        if not record_key or not thesis_id:
+            return None
+        duplicate = self.ledger.find_downloaded_thesis(thesis_id, record_key)
+        self._adopt_thesis_id(record_key, thesis_id, title, url)
+        return duplicate
+
+    def _adopt_thesis_id(self, record_key: str, thesis_id: str, title: Optional[str], url: Optional[str]) -> str:
+        """把以標題 (或暫時鍵) 登錄的論文改以永久識別碼為鍵，標題鍵留作別名；回傳新的鍵。"""
+        known_id = self.ledger.get_thesis_id(record_key)
+        if known_id and known_id != thesis_id:
+            # 目前的鍵已確認是標題相同的另一篇論文，不合併，識別碼另立一筆
+            print(f"      - [識別] 永久識別碼與帳本中同標題的論文不同 ({known_id} ≠ {thesis_id})，改用獨立的鍵。")
+            aliases, source = [thesis_title_key(title)], thesis_id
+        else:
+            aliases, source = [thesis_title_key(title), record_key], record_key
+        aliases = [alias for alias in aliases if alias and not is_provisional_key(alias)]
+        self.ledger.adopt_key(source, thesis_id, aliases, title=title, listing_sig=self._listing_sig(url, title))
+        self._bind_record_key(url, title, thesis_id)
+        return thesis_id
+
+    def _setup_driver(self, browser_download_dir: Optional[str] = None, profile_dir: Optional[str] = None):
         print("[-] 設定 Selenium WebDriver...")
         os.makedirs(self.download_dir, exist_ok=True)
         print(f"[*] 所有 PDF 將會下載至: {self.download_dir}")
+        # 平行模式下每個 worker 使用獨立的暫存下載資料夾，避免彼此誤認檔案
+        self._browser.download_dir = browser_download_dir
+        self._browser.profile_dir = profile_dir
+        os.makedirs(self.browser_download_dir, exist_ok=True)
         chrome_options = Options()
         prefs = {
-            "download.default_directory": self.download_dir, "download.prompt_for_download": False,
+            "download.default_directory": self.browser_download_dir, "download.prompt_for_download": False,
             "download.directory_upgrade": True, "plugins.always_open_pdf_externally": True
         }
         chrome_options.add_experimental_option("prefs", prefs)
@@ -94,62 +563,363 @@ class BaseThesisDownloader:
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
         chrome_options.add_argument("--disable-popup-blocking")
+        if self.headless:
+            chrome_options.add_argument("--headless=new")
         chrome_options.add_experimental_option(
             "excludeSwitches", ["enable-automation"])
+        if self.cdp_download_events:
+            chrome_options.set_capability(
+                "goog:loggingPrefs", {"performance": "ALL"})
+        # 只有主瀏覽器使用持久化的設定檔 (同一個 user-data-dir 不能同時被多個 Chrome 使用)；
+        # 多帳號模式下每個帳號的瀏覽器另有自己的設定檔
+        if profile_dir:
+            chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+        elif self.chrome_profile_dir and browser_download_dir is None:
+            chrome_options.add_argument(
+                f"--user-data-dir={self.chrome_profile_dir}")
+        if self.lean_browser:
+            # DOM 解析完成即返回，不等圖片與樣式；之後的元素一律以明確等待取得
+            chrome_options.page_load_strategy = "eager"
+            chrome_options.add_argument("--disable-extensions")
+            chrome_options.add_argument("--disable-background-networking")
         try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(
-                service=service, options=chrome_options)
+            try:
+                self.driver = webdriver.Chrome(
+                    service=Service(self._chromedriver_path()), options=chrome_options)
+            except WebDriverException as e:
+                print(f"[警告] 快取的 chromedriver 無法啟動 ({type(e).__name__})，重新下載後再試一次...")
+                self.driver = webdriver.Chrome(
+                    service=Service(self._chromedriver_path(refresh=True)), options=chrome_options)
         except Exception as e:
             print(f"[錯誤] WebDriver 初始化失敗: {e}")
             raise
         self.wait = WebDriverWait(self.driver, 20)
+        self._browser.work_tab = None
+        self._browser.records_since_start = 0
+        if self.lean_browser:
+            self._block_nonessential_resources()
+        self._browser.download_tracker = None
+        if self.cdp_download_events:
+            try:
+                tracker = CdpDownloadTracker(
+                    self.driver, self.browser_download_dir)
+                tracker.enable()
+                self._browser.download_tracker = tracker
+            except WebDriverException as e:
+                print(f"[警告] 無法啟用 CDP 下載事件，改用資料夾監控: {e}")
 
-    def _load_log(self) -> Tuple[Set[str], int]:
-        urls, last_page = set(), 1
+    def _chromedriver_path(self, refresh: bool = False) -> str:
+        """
+        取得 chromedriver 路徑。優先使用帳本中快取的路徑，避免每次啟動都透過網路查詢版本；
+        快取不存在或 refresh=True 時才呼叫 ChromeDriverManager().install()。
+        """
+        cached_path = self.ledger.get_meta("chromedriver_path")
+        if cached_path and os.path.isfile(cached_path) and not refresh:
+            return cached_path
+        driver_path = ChromeDriverManager().install()
+        self.ledger.set_meta("chromedriver_path", driver_path)
+        return driver_path
+
+    def _block_nonessential_resources(self, enabled: bool = True):
+        """以 CDP 在目前分頁擋下 (或解除擋下) LEAN_BLOCKED_URLS；設定只對目前的分頁有效。"""
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                urls = {self._normalize_url(line.strip()) for line in f if line.strip(
-                ) and self._normalize_url(line.strip())}
-            print(f"[*] 已從 {self.log_file} 載入 {len(urls)} 筆有效紀錄。")
-        except FileNotFoundError:
-            print(f"[*] 未找到下載紀錄檔 {self.log_file}，將會從頭開始下載。")
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs",
+                                        {"urls": self.LEAN_BLOCKED_URLS if enabled else []})
+        except WebDriverException as e:
+            print(f"[警告] 無法設定資源阻擋: {type(e).__name__}")
+
+    def _open_work_tab(self):
+        """切換到處理論文用的分頁：精簡模式重複使用同一個分頁，否則每篇開一個新分頁。"""
+        work_tab = getattr(self._browser, 'work_tab', None)
+        if self.lean_browser and work_tab in self.driver.window_handles:
+            self.driver.switch_to.window(work_tab)
+            return
+        self.driver.switch_to.new_window('tab')
+        if self.lean_browser:
+            self._browser.work_tab = self.driver.current_window_handle
+            self._block_nonessential_resources()
+
+    def _release_work_tab(self):
+        """
+        關閉處理過程中網站另開的分頁 (例如下載宣言頁)；精簡模式下保留工作分頁並清空內容，
+        否則連同工作分頁一併關閉。最後回到主視窗，並累計這個瀏覽器處理過的論文數。
+        """
+        keep = {self.main_window_handle}
+        if self.lean_browser:
+            keep.add(getattr(self._browser, 'work_tab', None))
+        for handle in self.driver.window_handles:
+            if handle not in keep:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+        work_tab = getattr(self._browser, 'work_tab', None)
+        if self.lean_browser and work_tab in self.driver.window_handles:
+            self.driver.switch_to.window(work_tab)
+            self.driver.get("about:blank")
+        self.driver.switch_to.window(self.main_window_handle)
+        self._browser.records_since_start = getattr(self._browser, 'records_since_start', 0) + 1
+
+    def _browser_rss_mb(self) -> Optional[float]:
+        """目前執行緒的 Chrome (chromedriver 底下所有子行程) 的常駐記憶體總和 (MB)；需要 psutil。"""
         try:
-            with open(self.page_progress_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if content.isdigit():
-                    last_page = int(content)
-                    print(
-                        f"[*] 已從 {self.page_progress_file} 載入上次爬取進度：從第 {last_page} 頁開始。")
-                else:
-                    print(f"[*] {self.page_progress_file} 內容無效，將從第 1 頁開始。")
+            import psutil
+        except ImportError:
+            if not self._rss_unavailable_warned:
+                self._rss_unavailable_warned = True
+                print("[警告] 未安裝 psutil (pip install psutil)，無法量測瀏覽器記憶體，只依處理篇數重啟。")
+            return None
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            total = 0
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    continue
+        except (psutil.Error, AttributeError):
+            return None
+        rss_mb = total / (1024 * 1024)
+        with self._state_lock:
+            self._browser_rss_peak = max(self._browser_rss_peak, rss_mb)
+        self.metrics.set_gauge("browser_rss_mb", round(rss_mb, 1), thread=threading.current_thread().name)
+        self.metrics.set_gauge("browser_rss_peak_mb", round(self._browser_rss_peak, 1))
+        return rss_mb
+
+    def _browser_recycle_due(self) -> bool:
+        """每處理完一篇 (或一頁) 時檢查是否該重啟瀏覽器；精簡模式下同時記錄記憶體用量以便比較。"""
+        records = getattr(self._browser, 'records_since_start', 0)
+        rss_mb = self._browser_rss_mb() if self.lean_browser or self.browser_recycle_rss_mb else None
+        if self.browser_recycle_records and records >= self.browser_recycle_records:
+            return True
+        return bool(self.browser_recycle_rss_mb and records and rss_mb is not None
+                    and rss_mb >= self.browser_recycle_rss_mb)
+
+    def _recycle_browser(self):
+        """重啟目前執行緒的 Chrome 以釋放累積的記憶體，並以原本的 cookie 保留登入狀態。"""
+        records = getattr(self._browser, 'records_since_start', 0)
+        rss_before = self._browser_rss_mb()
+        cookies = self.driver.get_cookies()
+        download_dir = getattr(self._browser, 'download_dir', None)
+        print(f"\n[*] 重啟瀏覽器以釋放記憶體 (已處理 {records} 篇"
+              + (f"，記憶體 {rss_before:.0f} MB)..." if rss_before is not None else ")..."))
+        with self.metrics.span("browser_restart"):
+            self._close_browser()
+            self._setup_driver(browser_download_dir=download_dir,
+                               profile_dir=getattr(self._browser, 'profile_dir', None))
+            if not self._restore_session_cookies(cookies):
+                print("[!] 重啟後無法沿用登入狀態，請在瀏覽器視窗中手動登入。")
+                self.wait_for_manual_login()
+            self.main_window_handle = self.driver.current_window_handle
+        self.metrics.inc("browser_restarts")
+        rss_after = self._browser_rss_mb()
+        if rss_before is not None and rss_after is not None:
+            print(f"[*] 瀏覽器已重啟，記憶體 {rss_before:.0f} MB -> {rss_after:.0f} MB。")
+
+    def _recycle_browser_if_due(self):
+        """worker 瀏覽器沒有搜尋結果頁要保留，處理完一篇後即可直接重啟。"""
+        if self._browser_recycle_due():
+            self._recycle_browser()
+
+    def _load_log(self) -> Tuple[DownloadLedger, int]:
+        """
+        開啟下載帳本並取得本關鍵字的頁數進度。第一次執行時會匯入舊的文字日誌。
+        回傳的帳本支援 `in` 判斷，可直接當作 downloaded_urls 使用。
+        """
+        imported = self.ledger.import_text_log(
+            self.log_file, self.page_progress_file, self.keyword, self._normalize_url)
+        if imported is not None:
+            print(f"[*] 已將 {self.log_file} 中 {imported} 筆紀錄匯入下載帳本。")
+        migrated = self.ledger.migrate_identity(thesis_title_key, self._existing_pdfs())
+        if migrated is not None:
+            rekeyed, retired, pdf_count = migrated
+            print(f"[*] 論文識別鍵遷移: {rekeyed} 筆改用標題鍵，{retired} 筆沒有標題的名次鍵不再用於去重，"
+                  f"依資料夾中 {pdf_count} 個 PDF 重建已下載紀錄。")
+        rekeyed = self.ledger.migrate_thesis_keys(is_provisional_key)
+        if rekeyed:
+            print(f"[*] 論文識別鍵遷移: {rekeyed} 筆已知永久識別碼的紀錄改以識別碼為鍵，原本的標題鍵留作別名。")
+        self.ledger.purge_provisional(is_provisional_key)
+        unprocessed = [row for row in self.ledger.unprocessed_downloads() if os.path.exists(row[1])]
+        if unprocessed:
+            print(f"[*] 有 {len(unprocessed)} 個上次中斷前尚未完成後處理的檔案，將重新處理。")
+            for record_id, file_path, title in unprocessed:
+                self._schedule_postprocess(
+                    file_path, self._sanitize_filename(title or os.path.splitext(os.path.basename(file_path))[0]),
+                    record_id)
+        print(f"[*] 下載帳本: {self.ledger.db_path}")
+        last_page = self.ledger.get_page_progress(self.keyword)
+        if last_page:
+            print(f"[*] 已從帳本載入關鍵字 '{self.keyword}' 的爬取進度：從第 {last_page} 頁開始。")
+        else:
+            print(f"[*] 帳本中沒有關鍵字 '{self.keyword}' 的頁數進度，將從第 1 頁開始。")
+            last_page = 1
+        return self.ledger, last_page
+
+    def _existing_pdfs(self) -> List[Tuple[str, str, int]]:
+        """列出下載資料夾中的 PDF (標題, 路徑, 大小)；去掉檔名衝突時加上的序號或時間戳記。"""
+        try:
+            names = [name for name in os.listdir(self.download_dir) if name.lower().endswith('.pdf')]
         except FileNotFoundError:
-            print(f"[*] 未找到頁數進度檔 {self.page_progress_file}，將從第 1 頁開始。")
-        return urls, last_page
+            return []
+        pdfs = []
+        for name in names:
+            title = re.sub(r'(?: \(\d+\)|_\d{10})$', '', os.path.splitext(name)[0])
+            path = os.path.join(self.download_dir, name)
+            pdfs.append((title, path, os.path.getsize(path)))
+        return pdfs
 
-    def _log_download(self, url: str):
-        normalized_url = self._normalize_url(url)
+    def _log_download(self, url: str, title: Optional[str] = None, file_path: Optional[str] = None,
+                      keyword: Optional[str] = None):
+        """keyword 為論文所屬的關鍵字 (各工作隨任務傳入)，省略時為目前的關鍵字；以下紀錄方法皆同。"""
+        keyword = keyword or self.keyword
+        normalized_url = self._record_key(title, url)
         if not normalized_url:
-            print(f"[警告] 無法正規化此 URL，將不予記錄: {url}")
+            print(f"[警告] 缺少論文標題，無法產生識別鍵，將不予記錄: {url}")
             return
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(normalized_url + '\n')
-        self.downloaded_urls.add(normalized_url)
-        self.session_download_count += 1
-        print(
-            f"      - [計數] 本次執行已下載 {self.session_download_count}/{self.max_downloads_per_session} 篇。")
+        # 此處只記下原始檔案，雜湊與去重由後處理補上，計數與下載上限判斷不必等待
+        file_size = os.path.getsize(file_path) if file_path and os.path.exists(file_path) else None
+        with self._state_lock:
+            self.ledger.mark_downloaded(normalized_url, title, keyword, url,
+                                        file_path, file_size, None)
+            self._journal(title, "done", os.path.basename(file_path) if file_path else None, url, keyword)
+            self.ledger.clear_retry(normalized_url)
+            self.metrics.inc("downloads")
+            self.session_download_count += 1
+            print(
+                f"      - [計數] 本次執行已下載 {self.session_download_count}/{self.max_downloads_per_session} 篇。")
+            if self.session_download_count == 1:
+                self._report_time_to_first_download()
+
+    def _log_record_status(self, url: str, title: Optional[str], status: str, reason: str,
+                           keyword: Optional[str] = None):
+        keyword = keyword or self.keyword
+        normalized_url = self._record_key(title, url)
+        if normalized_url:
+            self.ledger.mark_status(normalized_url, status, reason, title=title, keyword=keyword, url=url,
+                                    listing_sig=self._listing_sig(url, title))
+            self._journal(title, status, reason, url, keyword)
+            if status == "failed":
+                self._schedule_retry(normalized_url, url, title, reason, keyword)
+            else:
+                self.ledger.clear_retry(normalized_url)
+        self.metrics.inc("skips" if status == "skipped" else "failures", reason=reason)
+
+    def _log_duplicate(self, url: str, title: Optional[str], keyword: Optional[str] = None):
+        """已下載過的同一篇論文：鍵已併入識別碼那筆 (狀態為已下載)，只記日誌，不改寫狀態。"""
+        record_id = self._record_key(title, url)
+        if record_id:
+            self._journal(title, "skipped", "duplicate", url, keyword)
+            self.ledger.clear_retry(record_id)
+        self.metrics.inc("skips", reason="duplicate")
+
+    def _schedule_retry(self, record_id: str, url: str, title: Optional[str], reason: str,
+                        keyword: Optional[str] = None):
+        """把失敗的論文排入延後重試佇列；分散模式的 worker 由 coordinator 的租約機制負責重試。"""
+        if self.distributed_role == "worker":
+            return
+        # 列表上的網址綁定搜尋 session，之後的執行無法開啟，能取得永久網址時改存永久網址
+        thesis_id = self.ledger.get_thesis_id(record_id)
+        retry_url = (permanent_record_url(thesis_id) if thesis_id else None) or url
+        failure_class, attempts, next_attempt_at = self.ledger.schedule_retry(
+            record_id, keyword or self.keyword, retry_url, title, reason,
+            self.retry_max_attempts, self.retry_base_delay, self.retry_max_delay)
+        if reason in self.ledger.UNCOUNTED_REASONS:
+            print(f"      - [重試佇列] {failure_class} 不計入失敗次數 (目前 {attempts} 次)，"
+                  f"{time.strftime('%m-%d %H:%M', time.localtime(next_attempt_at))} 後重試。")
+        elif next_attempt_at is None:
+            print(f"      - [重試佇列] 已失敗 {attempts} 次 ({failure_class})，列為永久失敗。")
+        else:
+            print(f"      - [重試佇列] 第 {attempts} 次失敗 ({failure_class})，"
+                  f"{time.strftime('%m-%d %H:%M', time.localtime(next_attempt_at))} 後重試。")
+
+    def _journal(self, title: Optional[str], state: str, detail: Optional[str] = None, url: Optional[str] = None,
+                 keyword: Optional[str] = None):
+        """在檢查點日誌記下一筆論文的狀態轉換。"""
+        record_id = self._record_key(title, url)
+        if record_id:
+            self.ledger.append_journal([(record_id, keyword or self.keyword, None, None, state, detail)])
 
     def _log_progress(self, page_num: int):
+        if self._delta_active:
+            # delta 每次都從第 1 頁開始，不覆寫關鍵字原本的頁數進度
+            return
+        with self._state_lock:
+            try:
+                self.ledger.set_page_progress(self.keyword, page_num)
+                print(f"[*] 已記錄頁數進度：第 {page_num} 頁。")
+            except Exception as e:
+                print(f"[錯誤] 記錄頁數進度時發生錯誤: {e}")
+
+    def _download_limit_reached(self) -> bool:
+        with self._state_lock:
+            return self.session_download_count + self._inflight_downloads >= self.max_downloads_per_session
+
+    def _reserve_download_slot(self, normalized_url: str) -> bool:
+        """
+        在處理一篇論文前預留一個下載名額，確保多個 worker 合計不會超過
+        max_downloads_per_session，也不會同時處理同一篇論文。
+        """
+        with self._state_lock:
+            if normalized_url in self.downloaded_urls or normalized_url in self._inflight_urls:
+                return False
+            if self._download_limit_reached():
+                return False
+            self._inflight_downloads += 1
+            self._inflight_urls.add(normalized_url)
+            return True
+
+    def _release_download_slot(self, normalized_url: str):
+        with self._state_lock:
+            self._inflight_downloads -= 1
+            self._inflight_urls.discard(normalized_url)
+
+    def _sleep_delay(self, kind: str) -> float:
+        """取得文章間 ("article") 或翻頁間 ("page") 的休息秒數，並計入刻意休息的耗時統計。"""
+        if self.pacer:
+            delay = self.pacer.next_delay(kind)
+        else:
+            sleep_range = self.inter_article_sleep_range if kind == "article" else self.inter_page_sleep_range
+            delay = random.uniform(*sleep_range)
+        self.metrics.observe(f"sleep_{kind}", delay)
+        return delay
+
+    def _pace_success(self, latency: Optional[float] = None):
+        if self.pacer:
+            self.pacer.record_success(latency)
+        account = getattr(self._browser, 'account', None)
+        if account and self.account_pool:
+            self.account_pool.record_success(account)
+
+    def _pace_trouble(self, kind: str, detail: str = ""):
+        if self.pacer:
+            self.pacer.record_trouble(kind, detail)
+        account = getattr(self._browser, 'account', None)
+        if account and self.account_pool:
+            self.account_pool.record_trouble(account, kind)
+
+    def _navigation_latency(self) -> Optional[float]:
+        """目前頁面從送出請求到載入完成的秒數 (Navigation Timing)；瀏覽器不支援時回傳 None。"""
         try:
-            with open(self.page_progress_file, 'w', encoding='utf-8') as f:
-                f.write(str(page_num))
-            print(f"[*] 已記錄頁數進度：第 {page_num} 頁。")
-        except Exception as e:
-            print(f"[錯誤] 記錄頁數進度時發生錯誤: {e}")
+            duration = self.driver.execute_script(
+                "const entry = performance.getEntriesByType('navigation')[0];"
+                "return entry && entry.loadEventEnd > 0 ? entry.duration : null;")
+        except WebDriverException:
+            return None
+        return duration / 1000.0 if isinstance(duration, (int, float)) else None
+
+    def _throttle(self):
+        """向全域限速器取得一個請求令牌。"""
+        if self.rate_limiter:
+            waited = self.rate_limiter.acquire()
+            if waited > 0.5:
+                print(f"    - [限速] 等待全域令牌 {waited:.1f} 秒。")
 
     def wait_for_manual_login(self):
         print("\n[步驟 1] 等待使用者手動登入...")
         self.driver.get(self.base_url)
+        if self._is_logged_in():
+            print("[*] 沿用瀏覽器設定檔中仍有效的登入狀態，略過手動登入。")
+            return
         print("\n" + "="*50)
         print("★★★ 請手動操作瀏覽器 ★★★")
         print("程式已開啟網站首頁，請在瀏覽器視窗中手動完成所有登入步驟。")
@@ -162,17 +932,90 @@ class BaseThesisDownloader:
         except TimeoutException:
             raise Exception("手動登入逾時（未能偵測到「登出」按鈕）。請確保您已成功登入。")
 
+    def _is_logged_in(self) -> bool:
+        return bool(self.driver.find_elements(
+            By.XPATH, "//div[@class='user_area']//a[text()='登出']"))
+
+    def _restore_session_cookies(self, cookies: List[dict]) -> bool:
+        """將主瀏覽器的登入 cookie 複製到目前執行緒的瀏覽器，回傳是否已登入。"""
+        self.driver.get(self.base_url)
+        for cookie in cookies:
+            cookie = {k: v for k, v in cookie.items() if k in (
+                'name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry')}
+            try:
+                self.driver.add_cookie(cookie)
+            except WebDriverException:
+                continue
+        self.driver.refresh()
+        return self._is_logged_in()
+
+    def _submit_search(self, query: Optional[str] = None):
+        self.driver.get(
+            f"{self.site_root}/cgi-bin/gs32/gsweb.cgi/ccd=20_UgG/search?mode=basic")
+        search_box = self.wait.until(
+            EC.presence_of_element_located((By.ID, "ysearchinput0")))
+        search_box.send_keys(query or self.keyword)
+        search_button = self.wait.until(
+            EC.element_to_be_clickable((By.ID, "gs32search")))
+        search_button.click()
+
+    def _jump_with_form(self, target_page: int):
+        jmpage_input = self.wait.until(
+            EC.visibility_of_element_located((By.ID, "jmpage")))
+        self.driver.execute_script(
+            "arguments[0].value = arguments[1];", jmpage_input, str(target_page))
+        jump_button = self.wait.until(
+            EC.element_to_be_clickable((By.NAME, "jumpfmt1page")))
+        old_page_element = self.driver.find_element(
+            By.TAG_NAME, 'html')
+        jump_button.click()
+        self.wait.until(EC.staleness_of(old_page_element))
+        self.wait.until(EC.presence_of_element_located((By.ID, "tablefmt1")))
+
+    def _jump_to_page(self, target_page: int) -> int:
+        """
+        跳轉到指定的結果頁，回傳實際到達的頁碼。
+        先以 jmpage 表單重試數次 (每次重試前重新送出搜尋)，仍失敗時改為從第 1 頁逐頁點擊「下一頁」，
+        中途失敗則停在已到達的頁面，而不是回到第 1 頁。
+        """
+        for attempt in range(1, self.JUMP_RETRIES + 1):
+            try:
+                if attempt > 1:
+                    self._submit_search()
+                self._jump_with_form(target_page)
+                print(f"[*] 成功跳轉到第 {target_page} 頁。")
+                time.sleep(random.uniform(2.0, 4.0))
+                return target_page
+            except Exception as e:
+                print(f"[警告] 第 {attempt}/{self.JUMP_RETRIES} 次跳轉到第 {target_page} 頁失敗: {type(e).__name__}")
+                time.sleep(random.uniform(2.0, 4.0))
+        print(f"[*] 改為逐頁點擊「下一頁」前往第 {target_page} 頁...")
+        page = 1
+        try:
+            self._submit_search()
+            self.wait.until(EC.presence_of_element_located((By.ID, "tablefmt1")))
+            while page < target_page:
+                next_button = self.wait.until(EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, 'input[name="gonext"][type="image"]:not([src*="_"])')))
+                old_page_element = self.driver.find_element(By.TAG_NAME, 'html')
+                self._throttle()
+                self.driver.execute_script("arguments[0].click();", next_button)
+                self.wait.until(EC.staleness_of(old_page_element))
+                self.wait.until(EC.presence_of_element_located((By.ID, "tablefmt1")))
+                page += 1
+                sleep_duration = random.uniform(*self.KNOWN_PAGE_DELAY)
+                self.metrics.observe("sleep_page", sleep_duration)
+                time.sleep(sleep_duration)
+            print(f"[*] 已逐頁到達第 {page} 頁。")
+        except Exception as e:
+            print(f"[錯誤] 逐頁前往時發生錯誤: {type(e).__name__}，將從目前到達的第 {page} 頁開始爬取。")
+        return page
+
+    @timed_stage("search")
     def run_search(self):
         print("\n[步驟 2] 執行關鍵字搜尋...")
-        self.driver.get(
-            "https://ndltd.ncl.edu.tw/cgi-bin/gs32/gsweb.cgi/ccd=20_UgG/search?mode=basic")
-        try:
-            search_box = self.wait.until(
-                EC.presence_of_element_located((By.ID, "ysearchinput0")))
-            search_box.send_keys(self.keyword)
-            search_button = self.wait.until(
-                EC.element_to_be_clickable((By.ID, "gs32search")))
-            search_button.click()
+        try:
+            self._submit_search()
             print(f"[*] 已成功提交搜尋，關鍵字為: '{self.keyword}'")
             try:
                 print("[-] 正在等待總筆數資訊載入...")
@@ -191,93 +1034,195 @@ class BaseThesisDownloader:
             except (NoSuchElementException, TimeoutException):
                 print("[警告] 未能成功解析到明確的總筆數，將使用「下一頁」按鈕判斷結束。")
                 self.total_pages = 0
+            if self._delta_active:
+                self._delta_sorted = self._sort_results_newest_first()
             page_to_start = self.last_crawled_page
             if page_to_start > 1:
-                if self.total_pages > 0 and page_to_start <= self.total_pages:
+                # 總頁數未知時仍嘗試跳轉，失敗時由 _jump_to_page 的逐頁退路處理
+                if self.total_pages == 0 or page_to_start <= self.total_pages:
                     print(f"[*] 嘗試跳轉到上次中斷的第 {page_to_start} 頁...")
-                    try:
-                        jmpage_input = self.wait.until(
-                            EC.visibility_of_element_located((By.ID, "jmpage")))
-                        self.driver.execute_script(
-                            "arguments[0].value = arguments[1];", jmpage_input, str(page_to_start))
-                        jump_button = self.wait.until(
-                            EC.element_to_be_clickable((By.NAME, "jumpfmt1page")))
-                        old_page_element = self.driver.find_element(
-                            By.TAG_NAME, 'html')
-                        jump_button.click()
-                        self.wait.until(EC.staleness_of(old_page_element))
-                        print(f"[*] 成功跳轉到第 {page_to_start} 頁。")
-                        time.sleep(random.uniform(2.0, 4.0))
-                    except Exception as e:
-                        print(f"[錯誤] 跳轉頁面時發生錯誤: {e}，將從第 1 頁開始爬取。")
-                        self.last_crawled_page = 1
+                    self.last_crawled_page = self._jump_to_page(page_to_start)
+                    if self.last_crawled_page != page_to_start:
+                        self._resume_page = None
                 else:
-                    print(f"[*] 上次頁數 ({page_to_start}) 無效或總頁數未知，將從頭開始。")
+                    print(f"[*] 上次頁數 ({page_to_start}) 超過總頁數，將從頭開始。")
                     self.last_crawled_page = 1
+                    self._resume_page = None
         except TimeoutException:
             print("[錯誤] 搜尋頁面元素載入逾時。")
             self.driver.save_screenshot("search_page_timeout.png")
             raise
 
+    def _sort_results_newest_first(self) -> bool:
+        """
+        把搜尋結果改為依學年度由新到舊排序：找出選項含「學年度」的排序下拉選單，優先選擇遞減 (新→舊) 的選項。
+        選單沒有自動送出時改以表單送出。找不到排序選單時回傳 False。
+        """
+        try:
+            for select_element in self.driver.find_elements(By.TAG_NAME, "select"):
+                options = [option.text.strip() for option in select_element.find_elements(By.TAG_NAME, "option")]
+                year_options = [index for index, text in enumerate(options) if "學年度" in text]
+                if not year_options:
+                    continue
+                descending = [index for index in year_options
+                              if any(word in options[index] for word in ("遞減", "降冪", "desc"))
+                              or "新" in options[index] and options[index].find("新") < options[index].find("舊")
+                              or "新" in options[index] and "舊" not in options[index]]
+                target = (descending or year_options)[0]
+                old_page = self.driver.find_element(By.TAG_NAME, 'html')
+                Select(select_element).select_by_index(target)
+                try:
+                    WebDriverWait(self.driver, 5).until(EC.staleness_of(old_page))
+                except TimeoutException:
+                    self.driver.execute_script("if (arguments[0].form) { arguments[0].form.submit(); }", select_element)
+                    self.wait.until(EC.staleness_of(old_page))
+                self.wait.until(EC.presence_of_element_located((By.ID, "tablefmt1")))
+                print(f"[*] [Delta] 搜尋結果已改為依「{options[target]}」排序。")
+                return True
+        except (WebDriverException, TimeoutException) as e:
+            print(f"[警告] [Delta] 無法變更排序: {type(e).__name__}")
+            return False
+        print("[警告] [Delta] 找不到依學年度排序的選項，將走訪所有結果頁 (已知論文快速略過)。")
+        return False
+
+    def _start_delta(self, keyword: str):
+        """已爬完的關鍵字改為 delta 模式：從第 1 頁開始，並載入上次的高水位 (最新學年度)。"""
+        self._delta_active = True
+        self._delta_sorted = False
+        self._delta_new_records = 0
+        self._delta_max_year = None
+        self.last_crawled_page = 1
+        self._resume_page = None
+        high_water = json.loads(self.ledger.get_meta(f"delta_high_water:{keyword}") or "{}")
+        self._delta_hwm_year = high_water.get("year")
+        print(f"\n=== [Delta] 關鍵字 '{keyword}' 只抓取新增的論文"
+              + (f" (上次 {high_water.get('at')}，最新學年度 {self._delta_hwm_year})" if high_water else "") + " ===")
+
+    def _finish_delta(self, keyword: str):
+        """更新高水位：本次看到的最新學年度 (不低於原本的) 與執行時間。因下載上限中斷時保留原本的高水位。"""
+        self._delta_active = False
+        if self._download_limit_reached():
+            print(f"[*] [Delta] 已達下載上限，關鍵字 '{keyword}' 的高水位不更新，下次重新檢查。")
+            return
+        year = max(filter(None, (self._delta_hwm_year, self._delta_max_year)), default=None)
+        self.ledger.set_meta(f"delta_high_water:{keyword}", json.dumps(
+            {"year": year, "at": time.strftime('%Y-%m-%d %H:%M:%S'), "new_records": self._delta_new_records}))
+        print(f"[*] [Delta] 關鍵字 '{keyword}' 發現 {self._delta_new_records} 篇新論文。")
+
+    def _count_new_listing_records(self, records: List[dict]) -> int:
+        """
+        計算列表頁上的新論文數 (登錄到帳本之前)：尚未處理過，且學年度不早於高水位。
+        同時記下新論文中最新的學年度，作為下次的高水位。
+        """
+        keyed = [(self._record_key(record["title"], record["url"]), record) for record in records if record["title"]]
+        known = self.ledger.processed([key for key, _ in keyed if key])
+        new = 0
+        for key, record in keyed:
+            if not key or key in known:
+                continue
+            year = int(record["year"]) if record.get("year") and record["year"].isdigit() else None
+            if year is not None and self._delta_hwm_year is not None and year < self._delta_hwm_year:
+                continue
+            new += 1
+            if year is not None:
+                self._delta_max_year = max(year, self._delta_max_year or year)
+        self._delta_new_records += new
+        return new
+
     def _sanitize_filename(self, name: str) -> str:
-        sanitized_name = re.sub(r'[\\/*?:"<>|]', "", name)
-        sanitized_name = re.sub(r'[\n\t\r]', " ", sanitized_name)
-        sanitized_name = re.sub(r'\s+', " ", sanitized_name).strip()
-        max_len = 150
-        return sanitized_name[:max_len].strip() if len(sanitized_name) > max_len else sanitized_name
+        return sanitize_filename(name)
 
+    def _parse_listing_records_snapshot(self) -> List[dict]:
+        """只取一次 page_source，在本機一次解析出所有紀錄。"""
+        html = self.driver.page_source
+        if self.listing_snapshot_dir:
+            os.makedirs(self.listing_snapshot_dir, exist_ok=True)
+            snapshot_path = os.path.join(
+                self.listing_snapshot_dir, f"listing_{int(time.time() * 1000)}.html")
+            with open(snapshot_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+        return parse_listing_html(html, self.driver.current_url)
+
+    def _parse_listing_records(self) -> List[dict]:
+        """
+        解析目前的搜尋結果頁，回傳每篇論文的 url、title、embargoed、ip_restricted、
+        year、school、degree。
+        """
+        self.wait.until(EC.presence_of_element_located(
+            (By.CSS_SELECTOR, "td.tdfmt1-content")))
+        if self.fast_listing_parser:
+            return self._parse_listing_records_snapshot()
+        return parse_listing_webdriver(self.driver)
+
+    @timed_stage("parse_listing")
     def _parse_article_links(self) -> List[Tuple[str, str]]:
+        """解析列表頁，並依頁面上的標記先排除無法下載的論文；判定結果記入帳本，之後不再開啟。"""
         results = []
         try:
-            self.wait.until(EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "td.tdfmt1-content")))
-            article_elements = self.driver.find_elements(
-                By.CSS_SELECTOR, "td.tdfmt1-content")
-            for elem in article_elements:
-                try:
-                    elem_text = elem.text
-                    is_embargoed = "網際網路公開日期" in elem_text
-                    is_ip_restricted = "校內系統及IP範圍內開放" in elem_text
-                    if is_embargoed or is_ip_restricted:
-                        try:
-                            title_for_log = elem.find_element(
-                                By.CSS_SELECTOR, "span.etd_d").text
-                            reason = "論文尚未公開 (Embargo)" if is_embargoed else "論文限校內IP (IP Restricted)"
-                            print(f"    - [跳過] {reason}: {title_for_log}")
-                        except NoSuchElementException:
-                            print("    - [跳過] 發現一篇無法立即下載的論文。")
-                        continue
-                    link_tag = elem.find_element(By.CSS_SELECTOR, "a.slink")
-                    title_span = link_tag.find_element(
-                        By.CSS_SELECTOR, "span.etd_d")
-                    url = link_tag.get_attribute('href')
-                    title = title_span.text
-                    if url and title:
-                        results.append((url, title))
-                except NoSuchElementException:
+            records = self._parse_listing_records()
+            self._assign_listing_keys(records)
+            if self._delta_active:
+                self._listing_new = self._count_new_listing_records(records)
+            page_has_markers = any(record["fulltext_marked"] for record in records)
+            for record in records:
+                # 書目收割模式不需要全文，所有論文都要收割
+                availability = None if self.harvest_output else \
+                    classify_listing_availability(record, page_has_markers)
+                if availability:
+                    if record["title"]:
+                        print(f"    - [跳過] {self.UNAVAILABLE_LABELS[availability]}: {record['title']}")
+                        self._log_record_status(record["url"], record["title"], "skipped", availability)
+                    else:
+                        print("    - [跳過] 發現一篇無法立即下載的論文。")
                     continue
+                if record["url"] and record["title"]:
+                    results.append((record["url"], record["title"]))
             if not results:
                 print("[提示] 本頁未找到任何有效的論文連結 (a.slink)。")
         except TimeoutException:
             print("[警告] 等待論文連結載入逾時。")
         return results
 
-    def _wait_for_download_complete(self, timeout: int = 180) -> Optional[str]:
+    @timed_stage("download_wait")
+    def _wait_for_download_complete(self, timeout: int = 180, initial_files: Optional[Set[str]] = None,
+                                    clicked_at: Optional[float] = None) -> Optional[str]:
+        """
+        等待點擊後的下載完成。initial_files 為點擊前下載資料夾中的檔案；CDP 沒有送出事件而改回掃描時
+        點擊前沒有快照，改以 clicked_at 之後才修改過的檔案為準。兩者都沒有提供時以開始等待當下的內容為準。
+        出現不只一個新檔案時優先取以下載 GUID 命名的檔案，仍無法判斷是哪一個則視為失敗，不任選一個。
+        """
+        if getattr(self._browser, 'download_tracker', None):
+            return self._wait_for_download_event(timeout, clicked_at)
         print("      - 自動監控下載中...", end="")
-        seconds, initial_dl_files = 0, set(os.listdir(self.download_dir))
+        watch_dir = self.browser_download_dir
+        seconds, last_sizes = 0, {}
+        if initial_files is None and clicked_at is None:
+            initial_files = set(os.listdir(watch_dir))
         while seconds < timeout:
-            new_files = set(os.listdir(self.download_dir)) - initial_dl_files
-            if new_files:
-                new_file_name = new_files.pop()
-                if not new_file_name.endswith('.crdownload'):
-                    full_path = os.path.join(self.download_dir, new_file_name)
-                    try:
-                        with open(full_path, 'rb'):
-                            pass
-                        print(f" 下載完成: {new_file_name}")
-                        return full_path
-                    except IOError:
+            new_files = set(os.listdir(watch_dir)) - (initial_files or set()) - self._postprocess_names.keys()
+            if clicked_at is not None:
+                new_files = {name for name in new_files if self._modified_since(watch_dir, name, clicked_at)}
+            finished = [name for name in new_files if not name.endswith('.crdownload')]
+            candidates = [name for name in finished if self.DOWNLOAD_GUID_NAME.match(name)] or finished
+            if len(candidates) > 1:
+                print(f"\n      - [錯誤] 下載資料夾中出現多個新檔案，無法判斷是哪一個: {sorted(candidates)}")
+                return None
+            if candidates:
+                new_file_name = candidates[0]
+                full_path = os.path.join(watch_dir, new_file_name)
+                try:
+                    with open(full_path, 'rb'):
                         pass
+                    if not os.path.splitext(new_file_name)[1]:
+                        # CDP allowAndName 的 GUID 檔案沒有 .crdownload 暫存名，需等大小穩定才算完成
+                        size = os.path.getsize(full_path)
+                        if not size or last_sizes.get(new_file_name) != size:
+                            last_sizes[new_file_name] = size
+                            raise IOError("download still growing")
+                    print(f" 下載完成: {new_file_name}")
+                    return self._restore_download_extension(full_path)
+                except IOError:
+                    pass
             time.sleep(1)
             seconds += 1
             if seconds % 10 == 0:
@@ -285,54 +1230,413 @@ class BaseThesisDownloader:
         print("\n      - [錯誤] 等待下載逾時。")
         return None
 
+    # ==============================================================================
+    # 直接 HTTP 串流下載：沿用瀏覽器的登入 cookie，不經過 Chrome 下載管理員
+    # ==============================================================================
+    DIRECT_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+    DIRECT_DOWNLOAD_MIN_THROUGHPUT = 20 * 1024  # bytes/s，用來由 Content-Length 推算期限
+    DIRECT_DOWNLOAD_MIN_DEADLINE = 60.0
+
+    def _new_http_session(self, pool_maxsize: int) -> requests.Session:
+        """建立具連線池與 keep-alive 的 HTTP session，沿用瀏覽器的 User-Agent。"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        try:
+            session.headers["User-Agent"] = self.driver.execute_script(
+                "return navigator.userAgent;")
+        except WebDriverException:
+            pass
+        return session
+
+    def _sync_browser_cookies(self, session: requests.Session):
+        for cookie in self.driver.get_cookies():
+            session.cookies.set(cookie['name'], cookie['value'],
+                                domain=cookie.get('domain'), path=cookie.get('path', '/'))
+
+    def _get_http_session(self) -> requests.Session:
+        """取得目前執行緒專用、具連線池與 keep-alive 的 HTTP session，並同步瀏覽器 cookie。"""
+        session = getattr(self._browser, 'http_session', None)
+        if session is None:
+            session = self._new_http_session(4)
+            self._browser.http_session = session
+        self._sync_browser_cookies(session)
+        return session
+
+    def _filename_from_response(self, response: requests.Response) -> str:
+        disposition = response.headers.get('Content-Disposition', '')
+        match = re.search(r"filename\*\s*=\s*[^']*''([^;]+)", disposition, re.I)
+        if match:
+            name = unquote(match.group(1).strip().strip('"'))
+        else:
+            match = re.search(r'filename\s*=\s*"?([^";]+)"?', disposition, re.I)
+            if match:
+                raw_name = match.group(1).strip()
+                try:
+                    # 伺服器常以 Big5/UTF-8 位元組直接放在標頭中，requests 會以 latin-1 解讀
+                    name = raw_name.encode('latin-1').decode('utf-8')
+                except UnicodeError:
+                    try:
+                        name = raw_name.encode('latin-1').decode('big5')
+                    except UnicodeError:
+                        name = raw_name
+            else:
+                name = os.path.basename(urlparse(response.url).path)
+        name = self._sanitize_filename(name)
+        if not os.path.splitext(name)[1]:
+            content_type = response.headers.get('Content-Type', '').lower()
+            ext = '.zip' if 'zip' in content_type else '.pdf'
+            name = f"{name or 'download_' + str(int(time.time()))}{ext}"
+        return name
+
+    @timed_stage("download_stream")
+    def _stream_download(self, file_url: str) -> Optional[str]:
+        """
+        以串流方式將檔案寫入暫存檔，完成後原子性地重新命名。
+        回傳完成的檔案路徑；若伺服器回傳的不是檔案或下載失敗則回傳 None。
+        """
+        session = self._get_http_session()
+        print("      - 直接串流下載中...", end="")
+        try:
+            with session.get(file_url, stream=True, timeout=(10, 30),
+                             headers={"Referer": self.driver.current_url}) as response:
+                response.raise_for_status()
+                if 'text/html' in response.headers.get('Content-Type', '').lower():
+                    print(" 伺服器回傳的是網頁而非檔案。")
+                    return None
+                total_bytes = int(response.headers.get('Content-Length') or 0)
+                deadline = time.monotonic() + max(
+                    self.DIRECT_DOWNLOAD_MIN_DEADLINE, total_bytes / self.DIRECT_DOWNLOAD_MIN_THROUGHPUT)
+                file_name = self._filename_from_response(response)
+                final_path = os.path.join(self.browser_download_dir, file_name)
+                base, ext = os.path.splitext(final_path)
+                suffix = 1
+                while os.path.exists(final_path):
+                    final_path = f"{base} ({suffix}){ext}"
+                    suffix += 1
+                temp_path = f"{final_path}.{threading.get_ident()}.part"
+                received, next_report = 0, 0.25
+                digest = hashlib.sha256()
+                started = time.monotonic()
+                try:
+                    with open(temp_path, 'wb') as f:
+                        for chunk in response.iter_content(self.DIRECT_DOWNLOAD_CHUNK_SIZE):
+                            if time.monotonic() > deadline:
+                                raise TimeoutError("下載超過由 Content-Length 推算的期限")
+                            f.write(chunk)
+                            digest.update(chunk)
+                            received += len(chunk)
+                            if total_bytes and received / total_bytes >= next_report:
+                                print(f" {int(next_report * 100)}%", end="", flush=True)
+                                next_report += 0.25
+                        f.flush()
+                        os.fsync(f.fileno())
+                    if total_bytes and received != total_bytes:
+                        raise IOError(f"檔案不完整 ({received}/{total_bytes} bytes)")
+                    os.replace(temp_path, final_path)
+                    with self._state_lock:
+                        self._precomputed_hashes[final_path] = digest.hexdigest()
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                elapsed = max(time.monotonic() - started, 1e-6)
+                print(f" 下載完成: {file_name} ({received / 1024:.0f} KB, {received / 1024 / elapsed:.0f} KB/s)")
+                return final_path
+        except Exception as e:
+            print(f"\n      - [警告] 直接下載失敗: {type(e).__name__} - {e}")
+            return None
+
+    def _download_via_link(self, download_link: WebElement) -> Optional[str]:
+        """
+        依設定以直接串流或 Chrome 下載管理員取得檔案。
+        直接下載失敗時，退回點擊連結並等待 Chrome 完成下載。
+        """
+        if self.direct_download:
+            href = download_link.get_attribute('href') or ''
+            if href and not href.lower().startswith('javascript:'):
+                downloaded_file = self._stream_download(
+                    urljoin(self.driver.current_url, href))
+                if downloaded_file:
+                    return downloaded_file
+                print("      - 改用瀏覽器下載...")
+        tracker = getattr(self._browser, 'download_tracker', None)
+        if tracker:
+            # CDP 以 GUID 對應下載，不必列出資料夾；事件沒有出現時改以點擊時間判斷新檔案
+            tracker.reset()
+            clicked_at = time.time()
+            download_link.click()
+            return self._wait_for_download_complete(clicked_at=clicked_at)
+        initial_files = set(os.listdir(self.browser_download_dir))
+        download_link.click()
+        return self._wait_for_download_complete(initial_files=initial_files)
+
+    @staticmethod
+    def _modified_since(directory: str, name: str, since: float) -> bool:
+        try:
+            # 容許 1 秒的檔案系統時間精度誤差
+            return os.path.getmtime(os.path.join(directory, name)) >= since - 1
+        except OSError:
+            return False
+
+    def _wait_for_download_event(self, timeout: int, clicked_at: Optional[float] = None) -> Optional[str]:
+        """
+        以 CDP 事件等待下載完成，並將以 GUID 命名的檔案改回伺服器建議的檔名。
+        CDP_EVENT_GRACE 秒內沒有收到任何下載事件時，此瀏覽器改回掃描下載資料夾。
+        """
+        print("      - 以 CDP 事件監控下載中...", end="", flush=True)
+        tracker = self._browser.download_tracker
+        result = tracker.wait_for_download(timeout, begin_timeout=self.CDP_EVENT_GRACE)
+        if result is None and tracker.silent:
+            print(f"\n      - [警告] {self.CDP_EVENT_GRACE} 秒內沒有收到 CDP 下載事件，"
+                  "此瀏覽器改回掃描下載資料夾。")
+            self._browser.download_tracker = None
+            try:
+                tracker.disable()
+            except WebDriverException:
+                pass
+            return self._wait_for_download_complete(max(1, timeout - self.CDP_EVENT_GRACE), clicked_at=clicked_at)
+        if not result:
+            print("\n      - [錯誤] 等待下載逾時。")
+            return None
+        guid_path, suggested_name, received_bytes, elapsed = result
+        file_name = self._sanitize_filename(
+            suggested_name) or os.path.basename(guid_path)
+        final_path = os.path.join(self.browser_download_dir, file_name)
+        base, ext = os.path.splitext(final_path)
+        suffix = 1
+        while os.path.exists(final_path):
+            final_path = f"{base} ({suffix}){ext}"
+            suffix += 1
+        os.replace(guid_path, final_path)
+        throughput = received_bytes / 1024 / max(elapsed, 1e-6)
+        print(
+            f" 下載完成: {file_name} ({received_bytes / 1024:.0f} KB, {elapsed:.1f} 秒, {throughput:.0f} KB/s)")
+        return final_path
+
+    @staticmethod
+    def _restore_download_extension(path: str) -> str:
+        """
+        CDP 模式下檔案以下載 GUID 命名、沒有副檔名；改回掃描資料夾時依檔頭補上 .pdf 或 .zip，
+        讓後處理能判斷是否需要解壓縮。
+        """
+        if os.path.splitext(path)[1]:
+            return path
+        with open(path, 'rb') as f:
+            magic = f.read(4)
+        ext = ".zip" if magic.startswith(b"PK") else ".pdf" if magic.startswith(b"%PDF") else ""
+        if not ext:
+            return path
+        os.replace(path, path + ext)
+        return path + ext
+
     def _preprocess_captcha_image(self, image_bytes: bytes) -> bytes:
         try:
-            img = Image.open(BytesIO(image_bytes)).convert(
-                'L').point(lambda p: 255 if p > 128 else 0)
-            buffered = BytesIO()
-            img.save(buffered, format="PNG")
-            return buffered.getvalue()
+            return CaptchaSolver.binarize(image_bytes, 128)
         except Exception as e:
             print(f"      - [警告] 驗證碼圖片預處理失敗: {e}")
             return image_bytes
 
-    def _solve_captcha_with_ddddocr(self, captcha_element: WebElement) -> str:
+    def _read_captcha_image(self, captcha_element: WebElement) -> bytes:
+        """
+        直接從已載入的 <img> 取出驗證碼影像 (透過 canvas 匯出)，不重新請求圖片，
+        也不經過 chromedriver 的截圖流程；失敗時才退回 screenshot_as_png。
+        """
+        try:
+            data_url = self.driver.execute_script(
+                "const img = arguments[0];"
+                "if (!img.complete || !img.naturalWidth) { return null; }"
+                "const canvas = document.createElement('canvas');"
+                "canvas.width = img.naturalWidth; canvas.height = img.naturalHeight;"
+                "canvas.getContext('2d').drawImage(img, 0, 0);"
+                "return canvas.toDataURL('image/png');", captcha_element)
+            if data_url and data_url.startswith("data:image/png;base64,"):
+                return base64.b64decode(data_url.split(",", 1)[1])
+        except WebDriverException:
+            pass
+        return captcha_element.screenshot_as_png
+
+    @timed_stage("captcha_ocr")
+    def _solve_captcha_with_ddddocr(self, captcha_element: WebElement) -> Tuple[str, float]:
+        """辨識驗證碼，回傳 (答案, 信心分數)；無法辨識時答案為空字串。"""
         try:
-            res = self.ocr.classification(
-                self._preprocess_captcha_image(captcha_element.screenshot_as_png))
-            res_cleaned = ''.join(filter(str.isalnum, res)).lower()
-            print(f"      - ddddocr 辨識結果: '{res}' -> 清理後: '{res_cleaned}'")
-            if 4 <= len(res_cleaned) <= 6:
-                return res_cleaned
-            return ""
+            image_bytes = self._read_captcha_image(captcha_element)
+            future = self.captcha_solver.submit(image_bytes)
+            res_cleaned, confidence, candidates = future.result(timeout=CaptchaSolver.SOLVE_TIMEOUT * 2)
+            summary = ", ".join(f"'{cleaned}'" for _, cleaned, _ in candidates)
+            print(
+                f"      - ddddocr 辨識結果: [{summary}] -> 採用: '{res_cleaned}' (信心 {confidence:.2f})")
+            self._browser.last_captcha = (image_bytes, res_cleaned, confidence)
+            return res_cleaned, confidence
         except Exception as e:
             print(f"      - [錯誤] ddddocr 處理過程中發生錯誤: {e}")
-            return ""
+            return "", 0.0
+
+    def _solve_captcha_on_page(self) -> str:
+        """
+        在下載宣言頁面上取得一個足夠可信的驗證碼答案。
+        信心不足時只重新載入驗證碼，不送出答案，也不消耗外層的 MAX_RETRIES 次數。
+        """
+        self._browser.last_captcha = None
+        captcha_text = ""
+        for reroll in range(self.captcha_max_rerolls + 1):
+            captcha_img = self.wait.until(EC.presence_of_element_located(
+                (By.XPATH, "//img[contains(@src, 'random_validation')]")))
+            if self.lean_browser:
+                self._wait_for_captcha_image(captcha_img)
+            captcha_text, confidence = self._solve_captcha_with_ddddocr(
+                captcha_img)
+            if captcha_text and confidence >= self.captcha_min_confidence:
+                return captcha_text
+            if reroll < self.captcha_max_rerolls:
+                print(
+                    f"      - 驗證碼信心不足 ({confidence:.2f} < {self.captcha_min_confidence})，重新載入驗證碼...")
+                self.driver.refresh()
+                time.sleep(random.uniform(1.0, 2.0))
+        # 多次重新載入仍信心不足時，只能送出目前頁面上這張圖的答案
+        return captcha_text
+
+    def _wait_for_captcha_image(self, captcha_img: WebElement):
+        """eager 載入時頁面可能在驗證碼圖片載入前就返回；若圖片一直沒有載入 (被擋下)，解除此分頁的資源阻擋。"""
+        try:
+            WebDriverWait(self.driver, self.CAPTCHA_LOAD_TIMEOUT).until(lambda driver: driver.execute_script(
+                "return arguments[0].complete && arguments[0].naturalWidth > 0;", captcha_img))
+        except TimeoutException:
+            print("      - [警告] 驗證碼圖片未載入，解除此分頁的資源阻擋後重新載入...")
+            self._block_nonessential_resources(enabled=False)
+            self.driver.refresh()
 
-    def _unzip_and_cleanup(self, file_path: str, new_name_base: str):
-        if not file_path.lower().endswith('.zip'):
+    def _record_captcha_outcome(self, accepted: bool):
+        """將最近一次送出的驗證碼與伺服器的接受結果存入樣本庫。"""
+        self.metrics.inc("captcha_attempts")
+        if accepted:
+            self.metrics.inc("captcha_successes")
+        last_captcha = getattr(self._browser, 'last_captcha', None)
+        if not (self.captcha_corpus and last_captcha):
             return
-        new_pdf_name, dest_pdf_path = f"{new_name_base}.pdf", os.path.join(
-            self.download_dir, f"{new_name_base}.pdf")
-        print(f"      - 正在解壓縮並重新命名為: {new_pdf_name}")
+        image_bytes, guess, confidence = last_captcha
         try:
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            self.captcha_corpus.record(
+                image_bytes, guess, accepted, confidence, self.captcha_solver.name)
+        except OSError as e:
+            print(f"      - [警告] 無法保存驗證碼樣本: {e}")
+        self._browser.last_captcha = None
+
+    @timed_stage("unzip")
+    def _extract_pdf_from_zip(self, zip_path: str) -> Optional[Tuple[str, str]]:
+        """將 zip 中的第一個 PDF 解壓到檔案庫的暫存區，邊寫邊計算雜湊，回傳 (暫存路徑, 雜湊)。"""
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
                 pdf_files_in_zip = [
                     name for name in zip_ref.namelist() if name.lower().endswith('.pdf')]
                 if not pdf_files_in_zip:
                     print(
-                        f"      - [警告] 在 {os.path.basename(file_path)} 中未找到 PDF 檔案。")
-                    return
-                with zip_ref.open(pdf_files_in_zip[0]) as source, open(dest_pdf_path, 'wb') as target:
-                    shutil.copyfileobj(source, target)
-                print("      - 解壓縮完成。")
-            os.remove(file_path)
-            print(f"      - 已刪除原始 .zip 檔案: {os.path.basename(file_path)}")
+                        f"      - [警告] 在 {os.path.basename(zip_path)} 中未找到 PDF 檔案。")
+                    return None
+                temp_pdf_path = self.content_store.temp_path(os.path.basename(zip_path))
+                digest = hashlib.sha256()
+                with zip_ref.open(pdf_files_in_zip[0]) as source, open(temp_pdf_path, 'wb') as target:
+                    for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                        target.write(chunk)
+                        digest.update(chunk)
+                return temp_pdf_path, digest.hexdigest()
         except zipfile.BadZipFile:
             print(
-                f"      - [錯誤] 檔案不是一個有效的 .zip 檔案: {os.path.basename(file_path)}")
+                f"      - [錯誤] 檔案不是一個有效的 .zip 檔案: {os.path.basename(zip_path)}")
+        except Exception as e:
+            print(f"      - [錯誤] 解壓縮時發生錯誤: {e}")
+        return None
+
+    def _schedule_postprocess(self, raw_path: str, sanitized_title: str, record_id: Optional[str]):
+        """交給背景執行緒做後處理；未啟用背景後處理時直接執行。"""
+        if self._postprocess_pool is None:
+            self._postprocess_download(raw_path, sanitized_title, record_id)
+            return
+        self._postprocess_pool.submit(self._postprocess_download, raw_path, sanitized_title, record_id)
+
+    @timed_stage("postprocess")
+    def _postprocess_download(self, raw_path: str, sanitized_title: str, record_id: Optional[str]) -> Optional[str]:
+        """
+        計算雜湊、依雜湊去重後放入檔案庫，再以論文標題建立連結並更新帳本，回傳最終路徑。
+        帳本記錄的路徑在每個步驟都指向實際存在的檔案：先建立新連結、更新帳本，最後才刪除原始檔。
+        """
+        try:
+            with self._state_lock:
+                digest = self._precomputed_hashes.pop(raw_path, None)
+            content_path = raw_path
+            if raw_path.lower().endswith('.zip'):
+                extracted = self._extract_pdf_from_zip(raw_path)
+                if extracted is None:
+                    return None
+                content_path, digest = extracted
+                ext = ".pdf"
+            else:
+                digest = digest or file_sha256(raw_path)
+                ext = os.path.splitext(raw_path)[1] or ".pdf"
+            duplicate = self.ledger.find_by_hash(digest, record_id)
+            object_path, is_new = self.content_store.add(content_path, digest, ext)
+            dest_name = f"{sanitized_title}{ext.lower()}"
+            self._remember_postprocess_name(dest_name)
+            final_path = self.content_store.link(object_path, os.path.join(self.download_dir, dest_name))
+            self._remember_postprocess_name(os.path.basename(final_path))
+            if record_id:
+                self.ledger.update_file(record_id, final_path, os.path.getsize(final_path), digest)
+                if self.distributed_role == "worker":
+                    self._report_to_catalog(record_id, final_path, digest)
+                self._catalog_download(record_id, final_path)
+            for leftover in {content_path, raw_path}:
+                if os.path.exists(leftover) and os.path.abspath(leftover) != os.path.abspath(final_path):
+                    os.remove(leftover)
+            if duplicate:
+                print(f"      - [後處理] {os.path.basename(final_path)} 與已下載的 "
+                      f"{os.path.basename(duplicate[1])} 內容相同，只建立連結不另存一份。")
+            elif is_new:
+                print(f"      - [後處理] 已存入 {os.path.basename(final_path)} (sha256 {digest[:12]})")
+            return final_path
         except Exception as e:
-            print(f"      - [錯誤] 解壓縮或刪除檔案時發生錯誤: {e}")
+            print(f"      - [錯誤] 後處理 {os.path.basename(raw_path)} 時發生錯誤: {type(e).__name__} - {e}")
+            return None
+
+    def _remember_postprocess_name(self, name: str):
+        with self._state_lock:
+            self._postprocess_names.pop(name, None)
+            self._postprocess_names[name] = None
+            while len(self._postprocess_names) > self.POSTPROCESS_NAMES_LIMIT:
+                del self._postprocess_names[next(iter(self._postprocess_names))]
+
+    def _open_content_store(self, store_dir: Optional[str]) -> ContentStore:
+        """
+        開啟檔案庫。檔案庫放在下載資料夾之外，掃描或監看下載資料夾時不會看到它；
+        舊版放在 <download_dir>/.store，存在時搬到新位置 (同一個檔案系統內只是改名，硬連結不受影響)。
+        """
+        root = os.path.join(BASE_DIR, store_dir) if store_dir else \
+            os.path.normpath(self.download_dir) + "_store"
+        legacy = os.path.join(self.download_dir, ".store")
+        if os.path.isdir(legacy) and not os.path.exists(root):
+            try:
+                os.replace(legacy, root)
+                print(f"[*] 已將檔案庫從 {legacy} 搬到 {root}")
+            except OSError as e:
+                print(f"[警告] 無法搬移舊的檔案庫 ({type(e).__name__})，繼續使用 {legacy}")
+                root = legacy
+        return ContentStore(root)
+
+    def _catalog_download(self, record_id: str, final_path: str):
+        """下載完成 (檔案已放到最終位置) 時呼叫，基礎類別不建立目錄，由子類別覆寫。"""
+
+    @timed_stage("fulltext_probe")
+    def _probe_fulltext_link(self) -> Optional[WebElement]:
+        """
+        短暫確認詳目頁是否有「電子全文」連結，而不是等 self.wait 的完整逾時。連結出現即回傳；
+        頁面已解析完成且看得到書目欄位卻沒有連結時回傳 None，表示確定沒有電子全文。
+        期限內頁面仍未載入時拋出 TimeoutException：暫時變慢不能當成沒有電子全文。
+        """
+        WebDriverWait(self.driver, self.FULLTEXT_PROBE_TIMEOUT, poll_frequency=0.2).until(
+            lambda driver: driver.find_elements(By.XPATH, self.FULLTEXT_LINK_XPATH)
+            or (driver.execute_script("return document.readyState") != "loading"
+                and driver.find_elements(By.XPATH, self.RECORD_FIELDS_XPATH)))
+        links = self.driver.find_elements(By.XPATH, self.FULLTEXT_LINK_XPATH)
+        return links[0] if links and links[0].is_displayed() else None
 
     def _handle_alert_if_present(self) -> bool:
         try:
@@ -344,14 +1648,42 @@ class BaseThesisDownloader:
         except NoAlertPresentException:
             return False
 
-    def _process_article_in_new_tab(self, article_url: str, article_title: str):
+    @timed_stage("article")
+    def _process_article_in_new_tab(self, article_url: str, article_title: str, keyword: Optional[str] = None):
+        """處理一篇論文。keyword 為論文所屬的關鍵字，重試與分散模式的工作可能不屬於目前的關鍵字。"""
         print(f"    - 正在處理: {article_title}")
-        self.driver.switch_to.new_window('tab')
-        self.driver.get(article_url)
+        self._throttle()
+        self._open_work_tab()
+        load_started = time.monotonic()
+        try:
+            self.driver.get(article_url)
+        except TimeoutException:
+            print("      - [警告] 詳目頁載入逾時，排入重試佇列。")
+            self._pace_trouble("timeout", "詳目頁載入逾時")
+            self._release_work_tab()
+            self._log_record_status(article_url, article_title, "failed", "timeout", keyword=keyword)
+            return None, None, None
+        page_latency = time.monotonic() - load_started
+        self.metrics.observe("navigate", page_latency, lean=self.lean_browser)
+        # 每個正常載入的頁面都回報給節奏控制，不論之後是否下載
+        self._pace_success(page_latency)
+        self._journal(article_title, "opened", url=article_url, keyword=keyword)
         MAX_RETRIES = 3
+        failure_status, failure_reason = "failed", "captcha"
+        download_requested = False
         try:
-            self.wait.until(EC.element_to_be_clickable(
-                (By.XPATH, "//a[em[text()='電子全文']]"))).click()
+            duplicate = self._check_thesis_identity(article_title, article_url)
+            if duplicate:
+                print(f"      - [跳過] 永久識別碼與已下載的論文相同: {duplicate[1] or duplicate[0]}")
+                self._log_duplicate(article_url, article_title, keyword=keyword)
+                return None, None, None
+            fulltext_link = self._probe_fulltext_link()
+            if fulltext_link is None:
+                print("      - [提示] 此頁面沒有「電子全文」連結，立即跳過。")
+                self._log_record_status(article_url, article_title, "skipped", "no_fulltext", keyword=keyword)
+                return None, None, None
+            download_requested = True
+            fulltext_link.click()
             self.wait.until(EC.element_to_be_clickable(
                 (By.XPATH, "//img[@alt='電子全文']/following-sibling::a[@title='電子全文']"))).click()
             time.sleep(random.uniform(1.5, 3.0))
@@ -360,10 +1692,7 @@ class BaseThesisDownloader:
                 print(
                     f"      - 偵測到下載宣言頁面，嘗試 ddddocr (第 {i + 1}/{MAX_RETRIES} 次)...")
                 try:
-                    captcha_img = self.wait.until(EC.presence_of_element_located(
-                        (By.XPATH, "//img[contains(@src, 'random_validation')]")))
-                    captcha_text = self._solve_captcha_with_ddddocr(
-                        captcha_img)
+                    captcha_text = self._solve_captcha_on_page()
                     if not captcha_text:
                         print("      - ddddocr 未能辨識，刷新頁面後重試...")
                         self.driver.refresh()
@@ -377,37 +1706,44 @@ class BaseThesisDownloader:
                         By.XPATH, "//input[@value='我同意']").click()
                     time.sleep(1.5)
                     if self._handle_alert_if_present():
+                        self._record_captcha_outcome(accepted=False)
+                        self._pace_trouble("captcha_rejected")
                         print("      - 驗證碼辨識失敗，進行下一次重試...")
                         self.driver.refresh()
                         time.sleep(random.uniform(2, 4))
                         continue
+                    self._record_captcha_outcome(accepted=True)
+                    self._journal(article_title, "captcha_solved", captcha_text, article_url, keyword=keyword)
                     print("      - 未偵測到警告視窗，嘗試尋找最終下載連結...")
-                    self.wait.until(EC.presence_of_element_located(
-                        (By.LINK_TEXT, "下載"))).click()
-                    newly_downloaded_file = self._wait_for_download_complete()
+                    download_link = self.wait.until(EC.presence_of_element_located(
+                        (By.LINK_TEXT, "下載")))
+                    self._journal(article_title, "downloading", url=article_url, keyword=keyword)
+                    newly_downloaded_file = self._download_via_link(
+                        download_link)
                     if newly_downloaded_file:
-                        self._log_download(article_url)
                         sanitized_title = self._sanitize_filename(
                             article_title)
-                        if newly_downloaded_file.lower().endswith(".zip"):
-                            self._unzip_and_cleanup(
-                                newly_downloaded_file, sanitized_title)
-                        elif newly_downloaded_file.lower().endswith(".pdf"):
-                            new_pdf_path = os.path.join(
-                                self.download_dir, f"{sanitized_title}.pdf")
-                            print(f"      - 正在重新命名為: {sanitized_title}.pdf")
-                            if os.path.exists(new_pdf_path):
-                                base, ext = os.path.splitext(new_pdf_path)
-                                new_pdf_path = f"{base}_{int(time.time())}{ext}"
-                            os.rename(newly_downloaded_file, new_pdf_path)
+                        self._log_download(
+                            article_url, article_title, newly_downloaded_file, keyword=keyword)
+                        self._schedule_postprocess(
+                            newly_downloaded_file, sanitized_title, self._record_key(article_title, article_url))
                         return sanitized_title, article_title, article_url
                     else:
                         print("      - [警告] 點擊最終連結後，下載逾時。")
+                        failure_reason = "download_timeout"
+                        self._pace_trouble("timeout", "下載逾時")
                         break
                 except Exception as e:
                     print(
                         f"      - [警告] 在第 {i + 1} 次重試中發生預期外的錯誤: {type(e).__name__}")
+                    failure_reason = "error"
+                    if isinstance(e, UnexpectedAlertPresentException):
+                        self._pace_trouble("alert", type(e).__name__)
+                    elif isinstance(e, TimeoutException):
+                        failure_reason = "timeout"
+                        self._pace_trouble("timeout", type(e).__name__)
                     if self._handle_alert_if_present():
+                        failure_reason = "alert"
                         print("      - 已處理意外彈窗，將刷新頁面重試...")
                     else:
                         print(f"      - 錯誤詳情: {str(e)[:100]}...")
@@ -421,31 +1757,34 @@ class BaseThesisDownloader:
                     else:
                         print("      - 已達最大重試次數，跳過此論文。")
         except TimeoutException:
-            print("      - [提示] 此頁面未找到「電子全文」按鈕或連結，自動跳過。")
+            # 逾時只代表伺服器暫時變慢，不能據此判定沒有電子全文；交給重試佇列稍後再試
+            print("      - [警告] 等待詳目頁或「電子全文」連結逾時，排入重試佇列。")
+            failure_reason = "timeout"
+            self._pace_trouble("timeout", "詳目頁逾時")
         except Exception as e:
             print(f"      - [嚴重錯誤] 處理此頁面時發生未知錯誤: {e}")
             self.driver.save_screenshot(f"error_page_{int(time.time())}.png")
+            failure_reason = "error"
         finally:
-            if len(self.driver.window_handles) > 1:
-                self.driver.close()
-            self.driver.switch_to.window(self.main_window_handle)
-            sleep_duration = random.uniform(*self.inter_article_sleep_range)
-            print(f"    - 論文處理完畢，隨機休息 {sleep_duration:.1f} 秒...")
-            time.sleep(sleep_duration)
+            self._release_work_tab()
+            # 沒有對伺服器發出下載請求 (無電子全文、重複論文) 時不需要文章間延遲
+            if download_requested:
+                sleep_duration = self._sleep_delay("article")
+                print(f"    - 論文處理完畢，隨機休息 {sleep_duration:.1f} 秒...")
+                time.sleep(sleep_duration)
+        self._log_record_status(
+            article_url, article_title, failure_status, failure_reason, keyword=keyword)
         return None, None, None
 
-    def run_download_process(self):
-        print("\n[步驟 3] 執行下載流程...")
+    def _iter_result_pages(self):
+        """
+        從 last_crawled_page 開始逐頁走訪搜尋結果，每頁產生 (頁碼, [(url, title), ...])。
+        呼叫端處理完一頁後繼續迭代，才會點擊「下一頁」並進行翻頁延遲。
+        """
         if not self.main_window_handle:
             self.main_window_handle = self.driver.current_window_handle
         page_num = self.last_crawled_page
         while True:
-            if self.session_download_count >= self.max_downloads_per_session:
-                print(
-                    f"\n[!] 已達到本次執行下載上限 ({self.max_downloads_per_session} 篇)，程式將自動停止。")
-                print(f"[!] 目前進度已儲存，下次執行將從第 {page_num} 頁繼續。")
-                self._log_progress(page_num)
-                break
             print(f"\n--- 正在處理第 {page_num} 頁 ---")
             print(
                 f"--- 本次執行進度: {self.session_download_count}/{self.max_downloads_per_session} ---\n")
@@ -455,46 +1794,866 @@ class BaseThesisDownloader:
                     EC.presence_of_element_located((By.ID, "tablefmt1")))
             except TimeoutException:
                 print(f"[錯誤] 第 {page_num} 頁的搜尋結果表格載入逾時，爬取結束。")
-                break
+                self._pace_trouble("timeout", "搜尋結果頁載入逾時")
+                return
+            # 翻頁後的等待與頁面載入同時進行，載入耗時改由瀏覽器的 Navigation Timing 取得
+            page_latency = self._navigation_latency()
+            if page_latency is not None:
+                self.metrics.observe("listing_page", page_latency)
+                self._pace_success(page_latency)
+            self._listing_new = None
             article_urls_with_titles = self._parse_article_links()
             print(f"[*] 本頁找到 {len(article_urls_with_titles)} 篇可處理的論文連結。")
-            for url, title in article_urls_with_titles:
-                if self.session_download_count >= self.max_downloads_per_session:
-                    break
-                normalized_url = self._normalize_url(url)
-                if not normalized_url:
-                    continue
-                if normalized_url in self.downloaded_urls:
-                    print(f"    - [跳過] 該論文已存在於日誌中: {title}")
-                    continue
-                self._process_article_in_new_tab(url, title)
-            self._log_progress(page_num)
+            self._last_page_pending = None
+            yield page_num, article_urls_with_titles
+            if self._delta_active and self._delta_sorted and self._listing_new == 0:
+                # 結果依新到舊排序，整頁都是已知論文代表之後的頁面也不會有新論文
+                print(f"[*] [Delta] 第 {page_num} 頁的論文皆已知，停止翻頁。")
+                return
             try:
                 print(f"\n[-] 正在尋找「下一頁」按鈕 (目前在第 {page_num} 頁)...")
                 next_button = self.wait.until(EC.presence_of_element_located(
                     (By.CSS_SELECTOR, 'input[name="gonext"][type="image"]:not([src*="_"])')))
-                self.driver.execute_script(
-                    "arguments[0].click();", next_button)
-                page_num += 1
-                sleep_duration = random.uniform(*self.inter_page_sleep_range)
-                print(
-                    f"[-] 翻頁成功，前往第 {page_num} 頁。為模擬真人行為，將隨機等待 {sleep_duration:.1f} 秒...")
+                if self._browser_recycle_due():
+                    # 主瀏覽器保存著搜尋結果頁，重啟後重新搜尋並跳到下一頁
+                    self._recycle_browser()
+                    self._submit_search()
+                    self.wait.until(EC.presence_of_element_located((By.ID, "tablefmt1")))
+                    page_num = self._jump_to_page(page_num + 1)
+                else:
+                    self._throttle()
+                    self.driver.execute_script(
+                        "arguments[0].click();", next_button)
+                    page_num += 1
+                if self.harvest_output:
+                    # 書目收割只發出詳目頁的 HTTP 請求 (另受全域限速)，翻頁延遲改用較短的範圍
+                    sleep_duration = random.uniform(*self.harvest_page_sleep_range)
+                    self.metrics.observe("sleep_page", sleep_duration)
+                    print(f"[-] 翻頁成功，前往第 {page_num} 頁 (書目收割，等待 {sleep_duration:.1f} 秒)...")
+                elif self._last_page_pending == 0:
+                    # 整頁都是已處理過的論文，沒有對伺服器發出下載請求，不必再等完整的翻頁延遲
+                    sleep_duration = random.uniform(*self.KNOWN_PAGE_DELAY)
+                    self.metrics.observe("sleep_page", sleep_duration)
+                    print(f"[-] 上一頁的論文皆已處理過，快速前往第 {page_num} 頁 (等待 {sleep_duration:.1f} 秒)...")
+                else:
+                    sleep_duration = self._sleep_delay("page")
+                    print(
+                        f"[-] 翻頁成功，前往第 {page_num} 頁。為模擬真人行為，將隨機等待 {sleep_duration:.1f} 秒...")
                 time.sleep(sleep_duration)
             except TimeoutException:
                 print("\n[-] 未找到可點擊的「下一頁」按鈕，可能已達最後一頁。爬取結束。")
+                self.reached_last_page = True
                 if self.total_pages > 0 and page_num >= self.total_pages:
                     print(f"--- 已成功爬取所有 {self.total_pages} 頁論文。 ---")
-                break
+                return
             except Exception as e:
                 print(f"\n[錯誤] 翻頁時發生未知錯誤: {e}。爬取結束。")
+                return
+
+    def _pending_articles(self, article_urls_with_titles: List[Tuple[str, str]],
+                          page_num: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        登錄本頁所有論文到帳本，並過濾掉無法正規化或已下載過的論文。
+        若這是依檢查點日誌續接的那一頁，上次中斷前已處理完 (含失敗、跳過) 的論文也一併略過。
+        """
+        self.ledger.add_pending([(self._record_key(title, url), title, self.keyword, url, self._listing_sig(url, title))
+                                for url, title in article_urls_with_titles if self._record_key(title, url)])
+        keys = [key for key in (self._record_key(title, url) for url, title in article_urls_with_titles) if key]
+        unavailable = self.ledger.unavailable(keys)
+        finished: Set[str] = set()
+        if page_num is not None and page_num == self._resume_page:
+            finished = self.ledger.journal_finished(keys)
+            self._resume_page = None
+        pending, listed = [], []
+        for position, (url, title) in enumerate(article_urls_with_titles):
+            normalized_url = self._record_key(title, url)
+            if not normalized_url:
+                continue
+            if normalized_url in self.downloaded_urls:
+                print(f"    - [跳過] 該論文已存在於日誌中: {title}")
+                continue
+            if normalized_url in unavailable:
+                print(f"    - [跳過] 先前已確認無法下載: {title}")
+                continue
+            if normalized_url in finished:
+                print(f"    - [跳過] 上次中斷前已處理過: {title}")
+                continue
+            pending.append((url, title))
+            listed.append((normalized_url, self.keyword, page_num, position, "listed", None))
+        if listed:
+            self.ledger.append_journal(listed)
+        self._last_page_pending = len(pending)
+        return pending
+
+    def run_download_process(self):
+        print("\n[步驟 3] 執行下載流程...")
+        if self.distributed_role == "coordinator":
+            self._enumerate_to_coordinator()
+            return
+        if self.harvest_output:
+            self._run_metadata_harvest()
+            return
+        if self.account_pool:
+            self._run_account_pool_process()
+            return
+        if self.frontier_mode:
+            self._run_frontier_pipeline()
+            return
+        if self.num_workers > 1:
+            self._run_parallel_download_process()
+            return
+        for page_num, article_urls_with_titles in self._iter_result_pages():
+            if self._download_limit_reached():
+                print(
+                    f"\n[!] 已達到本次執行下載上限 ({self.max_downloads_per_session} 篇)，程式將自動停止。")
+                print(f"[!] 目前進度已儲存，下次執行將從第 {page_num} 頁繼續。")
+                self._log_progress(page_num)
                 break
+            for url, title in self._pending_articles(article_urls_with_titles, page_num):
+                normalized_url = self._record_key(title, url)
+                if not self._reserve_download_slot(normalized_url):
+                    if self._download_limit_reached():
+                        break
+                    continue
+                try:
+                    self._process_article_in_new_tab(url, title)
+                finally:
+                    self._release_download_slot(normalized_url)
+            self._log_progress(page_num)
 
-    def run(self):
+    # ==============================================================================
+    # 書目收割模式：瀏覽器只負責翻頁，詳目頁以 HTTP 連線池平行抓取後解析成書目
+    # ==============================================================================
+    def _run_metadata_harvest(self):
+        if self.harvest_writer is None:
+            self.harvest_writer = HarvestWriter(self.harvest_output)
+        session = self._new_http_session(self.harvest_concurrency)
+        # 在途請求上限為並行數的兩倍，解析或寫出跟不上時翻頁會暫停等待
+        slots = threading.BoundedSemaphore(self.harvest_concurrency * 2)
+        previous: Optional[Tuple[int, List[Future]]] = None
+        harvested_before = self.harvest_writer.count
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.harvest_concurrency, thread_name_prefix="harvest") as pool:
+            for page_num, article_urls_with_titles in self._iter_result_pages():
+                # 上一頁的請求在翻頁延遲期間完成，確認後才記錄頁數進度
+                if previous:
+                    self._finish_harvest_page(*previous)
+                self._sync_browser_cookies(session)
+                keys = [self._record_key(title, url) for url, title in article_urls_with_titles]
+                done = self.ledger.harvested([key for key in keys if key])
+                futures = []
+                for (url, title), record_id in zip(article_urls_with_titles, keys):
+                    if not record_id or record_id in done:
+                        continue
+                    slots.acquire()
+                    future = pool.submit(self._harvest_record, session, url, title, record_id, self.keyword)
+                    future.add_done_callback(lambda _: slots.release())
+                    futures.append(future)
+                print(f"[*] [收割] 第 {page_num} 頁送出 {len(futures)} 筆詳目頁請求 (略過已收割 {len(done)} 筆)。")
+                previous = (page_num, futures)
+            if previous:
+                self._finish_harvest_page(*previous)
+        harvested = self.harvest_writer.count - harvested_before
+        elapsed = time.monotonic() - started
+        rate = harvested / elapsed * 3600 if elapsed > 0 else 0.0
+        print(f"[*] [收割] 關鍵字 '{self.keyword}' 完成 {harvested} 筆書目，"
+              f"耗時 {elapsed:.0f} 秒 (約 {rate:.0f} 筆/小時)。")
+
+    def _finish_harvest_page(self, page_num: int, futures: List[Future]):
+        failed = sum(1 for future in futures if not future.result())
+        if failed:
+            print(f"[警告] [收割] 第 {page_num} 頁有 {failed} 筆書目抓取失敗，下次執行會重新抓取。")
+        self._log_progress(page_num)
+
+    @timed_stage("harvest_record")
+    def _harvest_record(self, session: requests.Session, url: str, title: str,
+                        record_id: str, keyword: str) -> bool:
+        """抓取並解析一篇論文的詳目頁，寫出書目並記入帳本；失敗回傳 False。"""
+        self._throttle()
+        try:
+            response = session.get(url, timeout=self.HARVEST_REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"    - [收割失敗] {title}: {e}")
+            self.metrics.inc("harvest_failures", reason="request")
+            self._pace_trouble("timeout", "詳目頁請求失敗")
+            return False
+        if "charset" not in response.headers.get("Content-Type", "").lower():
+            response.encoding = "utf-8"
+        record = parse_record_html(response.text)
+        if not record.get("title") and not record.get("author"):
+            # 通常是搜尋 session 過期被導回登入頁，不寫出空白書目
+            print(f"    - [收割失敗] 詳目頁沒有書目欄位 (session 可能已過期): {title}")
+            self.metrics.inc("harvest_failures", reason="empty")
+            return False
+        thesis_id = record.get("thesis_id")
+        if thesis_id:
+            record_id = self._adopt_thesis_id(record_id, thesis_id, title, url)
+        record = {"record_id": record_id, "keyword": keyword,
+                  "url": (permanent_record_url(thesis_id) if thesis_id else None) or url,
+                  **record, "harvested_at": time.time()}
+        self.harvest_writer.write(record)
+        self.ledger.mark_harvested(record_id, keyword, thesis_id)
+        self.metrics.inc("harvested")
+        self._pace_success(response.elapsed.total_seconds())
+        return True
+
+    # ==============================================================================
+    # 平行下載模式：主瀏覽器負責翻頁，N 個 worker 瀏覽器從共用佇列取出論文下載
+    # ==============================================================================
+    def _register_page(self, page_num: int, task_count: int):
+        with self._state_lock:
+            self._page_pending[page_num] = task_count
+        self._advance_page_progress()
+
+    def _complete_page_task(self, page_num: int):
+        with self._state_lock:
+            self._page_pending[page_num] -= 1
+        self._advance_page_progress()
+
+    def _advance_page_progress(self):
+        """只有當某頁以及它之前的所有頁面都處理完畢，才將該頁寫入進度檔。"""
+        with self._state_lock:
+            while self._page_pending:
+                first_page = min(self._page_pending)
+                if self._page_pending[first_page] > 0:
+                    break
+                del self._page_pending[first_page]
+                self._log_progress(first_page)
+
+    def _start_worker_browser(self, worker_id: int, cookies: List[dict]) -> bool:
+        """在目前執行緒啟動 worker 專用的瀏覽器並沿用主瀏覽器的登入狀態。"""
+        worker_dir = os.path.join(self.download_dir, f".worker_{worker_id}")
+        try:
+            self._setup_driver(browser_download_dir=worker_dir)
+            if not self._restore_session_cookies(cookies):
+                print(f"[!] worker {worker_id} 無法沿用登入狀態，請在該視窗手動登入。")
+                self.wait_for_manual_login()
+            self.main_window_handle = self.driver.current_window_handle
+            print(f"[*] worker {worker_id} 已就緒。")
+            return True
+        except Exception as e:
+            print(f"[錯誤] worker {worker_id} 啟動失敗: {type(e).__name__} - {e}")
+            self._close_browser()
+            return False
+
+    def _worker_loop(self, worker_id: int, task_queue: "queue.Queue", cookies: List[dict]):
+        if not self._start_worker_browser(worker_id, cookies):
+            return
+        try:
+            while True:
+                task = task_queue.get()
+                if task is None:
+                    task_queue.task_done()
+                    break
+                page_num, url, title = task
+                normalized_url = self._record_key(title, url)
+                completed = True
+                try:
+                    if self._reserve_download_slot(normalized_url):
+                        try:
+                            self._process_article_in_new_tab(url, title)
+                        finally:
+                            self._release_download_slot(normalized_url)
+                    elif self._download_limit_reached():
+                        # 因達到上限而未處理的論文不算完成，讓進度檔停在這一頁
+                        completed = False
+                except Exception as e:
+                    print(f"[錯誤] worker {worker_id} 處理論文時發生錯誤: {e}")
+                finally:
+                    if completed:
+                        self._complete_page_task(page_num)
+                    task_queue.task_done()
+                self._recycle_browser_if_due()
+        finally:
+            self._close_browser()
+
+    def _run_parallel_download_process(self):
+        print(f"[*] 平行模式：啟動 {self.num_workers} 個瀏覽器 worker...")
+        if not self.main_window_handle:
+            self.main_window_handle = self.driver.current_window_handle
+        task_queue: "queue.Queue" = queue.Queue(maxsize=self.num_workers * 2)
+        cookies = self.driver.get_cookies()
+        workers = [threading.Thread(target=self._worker_loop, args=(i + 1, task_queue, cookies),
+                                    name=f"worker-{i + 1}", daemon=True)
+                   for i in range(self.num_workers)]
+        for worker in workers:
+            worker.start()
+        try:
+            for page_num, article_urls_with_titles in self._iter_result_pages():
+                if self._download_limit_reached():
+                    print(
+                        f"\n[!] 已達到本次執行下載上限 ({self.max_downloads_per_session} 篇)，停止派送新工作。")
+                    break
+                pending = self._pending_articles(article_urls_with_titles, page_num)
+                self._register_page(page_num, len(pending))
+                for index, (url, title) in enumerate(pending):
+                    if not self._put_task(task_queue, (page_num, url, title), workers):
+                        # 沒有存活的 worker，剩餘工作無法派送
+                        with self._state_lock:
+                            self._page_pending[page_num] -= len(pending) - index
+                        print("[錯誤] 所有 worker 皆已停止，結束平行下載。")
+                        return
+        finally:
+            for _ in workers:
+                self._put_task(task_queue, None, workers)
+            for worker in workers:
+                worker.join()
+            print(f"[*] 平行下載結束，本次共下載 {self.session_download_count} 篇。")
+
+    # ==============================================================================
+    # 多帳號模式：主瀏覽器翻頁，依剩餘額度把論文分派給各帳號的瀏覽器
+    # ==============================================================================
+    def _run_account_pool_process(self):
+        pool = self.account_pool
+        print(f"[*] 多帳號模式：啟動 {len(pool.accounts)} 個帳號的瀏覽器...")
+        if not self.main_window_handle:
+            self.main_window_handle = self.driver.current_window_handle
+        queues = {name: queue.Queue() for name in pool.accounts}
+        workers = [threading.Thread(target=self._account_worker_loop, args=(name, queues),
+                                    name=f"account-{name}", daemon=True) for name in pool.accounts]
+        for worker in workers:
+            worker.start()
+        try:
+            for page_num, article_urls_with_titles in self._iter_result_pages():
+                if self._download_limit_reached():
+                    print(f"\n[!] 已達到本次執行下載上限 ({self.max_downloads_per_session} 篇)，停止派送新工作。")
+                    break
+                pending = self._pending_articles(article_urls_with_titles, page_num)
+                self._register_page(page_num, len(pending))
+                for index, (url, title) in enumerate(pending):
+                    account = self._wait_for_account(workers)
+                    if account is None:
+                        with self._state_lock:
+                            self._page_pending[page_num] -= len(pending) - index
+                        print("\n[!] 所有帳號的額度皆已用完 (或瀏覽器皆已停止)，停止派送新工作。")
+                        return
+                    queues[account].put((page_num, url, title))
+        finally:
+            for name in pool.accounts:
+                queues[name].put(None)
+            for worker in workers:
+                worker.join()
+            print(f"[*] 多帳號下載結束，本次共下載 {self.session_download_count} 篇。")
+            print_account_status(pool)
+
+    def _wait_for_account(self, workers: List[threading.Thread]) -> Optional[str]:
+        """等到有帳號可以接下一篇論文；所有帳號都用完額度或瀏覽器皆已停止時回傳 None。冷卻中的帳號會等它冷卻結束。"""
+        while any(worker.is_alive() for worker in workers):
+            account = self.account_pool.pick()
+            if account:
+                return account
+            if self.account_pool.exhausted():
+                return None
+            time.sleep(2)
+        return None
+
+    def _start_account_browser(self, name: str) -> bool:
+        """以帳號自己的設定檔啟動瀏覽器；設定檔中沒有有效的登入狀態時，在該視窗手動登入一次。"""
+        account = self.account_pool.accounts[name]
+        try:
+            self._setup_driver(browser_download_dir=os.path.join(self.download_dir, f".account_{name}"),
+                               profile_dir=os.path.join(BASE_DIR, account["profile_dir"]))
+            self._browser.account = name
+            self.driver.get(self.base_url)
+            if not self._is_logged_in():
+                print(f"[!] 帳號 {name} 尚未登入，請在該帳號的瀏覽器視窗手動登入 (登入狀態會保存在設定檔中)。")
+                self.wait_for_manual_login()
+            self.main_window_handle = self.driver.current_window_handle
+            print(f"[*] 帳號 {name} 已就緒，今日剩餘額度 {self.account_pool.remaining(name)} 篇。")
+            return True
+        except Exception as e:
+            print(f"[錯誤] 帳號 {name} 的瀏覽器啟動失敗: {type(e).__name__} - {e}")
+            self._close_browser()
+            return False
+
+    def _account_worker_loop(self, name: str, queues: Dict[str, "queue.Queue"]):
+        pool = self.account_pool
+        started = self._start_account_browser(name)
+        if not started:
+            pool.disable(name)
+        try:
+            while True:
+                task = queues[name].get()
+                if task is None:
+                    break
+                page_num, url, title = task
+                pool.task_done(name)
+                if not started or not pool.available(name):
+                    # 額度用完、冷卻中或瀏覽器無法使用，轉給其他帳號
+                    other = pool.pick(exclude={name})
+                    if other:
+                        print(f"    - [帳號] {name} 無法處理，轉給 {other}: {title}")
+                        queues[other].put(task)
+                    else:
+                        # 沒有帳號可以接手，這一頁的進度不前進，下次執行會重新處理
+                        print(f"    - [帳號] 沒有可用的帳號，留待下次執行: {title}")
+                    continue
+                normalized_url = self._record_key(title, url)
+                completed = True
+                try:
+                    if self._reserve_download_slot(normalized_url):
+                        try:
+                            if self._process_article_in_new_tab(url, title)[0] is not None:
+                                pool.record_download(name)
+                        finally:
+                            self._release_download_slot(normalized_url)
+                    elif self._download_limit_reached():
+                        completed = False
+                except Exception as e:
+                    print(f"[錯誤] 帳號 {name} 處理論文時發生錯誤: {e}")
+                finally:
+                    if completed:
+                        self._complete_page_task(page_num)
+                self._recycle_browser_if_due()
+        finally:
+            if started:
+                self._close_browser()
+
+    # ==============================================================================
+    # Frontier 模式：列舉與下載分成兩個階段，透過帳本中的持久化佇列銜接
+    # ==============================================================================
+    def _produce_frontier(self):
+        """以主瀏覽器走訪所有搜尋結果頁，把待下載論文寫入 frontier 佇列。"""
+        self.reached_last_page = False
+        for page_num, article_urls_with_titles in self._iter_result_pages():
+            if self._download_limit_reached():
+                print("[!] 已達到本次下載上限，停止列舉，下次執行將從此頁繼續。")
+                self._log_progress(page_num)
+                return
+            pending = self._pending_articles(article_urls_with_titles, page_num)
+            added = self.ledger.enqueue_frontier(self.keyword, page_num, [
+                (self._record_key(title, url), url, title) for url, title in pending])
+            print(
+                f"[*] [列舉] 第 {page_num} 頁加入 {added} 篇，佇列中共 {self.ledger.frontier_size(self.keyword)} 篇待下載。")
+            self._log_progress(page_num)
+        if self.reached_last_page:
+            self.ledger.set_meta(f"frontier_complete:{self.keyword}",
+                                 time.strftime('%Y-%m-%d %H:%M:%S'))
+            print(f"[*] [列舉] 關鍵字 '{self.keyword}' 的所有結果頁皆已列入佇列。")
+
+    def _frontier_consumer_loop(self, worker_id: int, cookies: List[dict], producer_done: threading.Event):
+        if not self._start_worker_browser(worker_id, cookies):
+            return
+        worker_name = f"worker-{worker_id}"
+        try:
+            while True:
+                if self._download_limit_reached():
+                    break
+                task = self.ledger.claim_frontier(self.keyword, worker_name)
+                if task is None:
+                    if producer_done.is_set():
+                        break
+                    # 佇列暫時是空的 (列舉端正在翻頁等待)，趁空檔處理已到期的重試
+                    retry = self.ledger.claim_due_retry(self.keyword, self.retry_lease_seconds, identified_only=True)
+                    if not (retry and self._retry_failed_record(retry, allow_search=False)):
+                        time.sleep(2)
+                    continue
+                record_id, url, title, _ = task
+                self._bind_record_key(url, title, record_id)
+                if not self._reserve_download_slot(record_id):
+                    if self._download_limit_reached():
+                        self.ledger.release_frontier(record_id)
+                        break
+                    self.ledger.complete_frontier(record_id)
+                    continue
+                try:
+                    self._process_article_in_new_tab(url, title)
+                except Exception as e:
+                    print(f"[錯誤] worker {worker_id} 處理論文時發生錯誤: {e}")
+                finally:
+                    self._release_download_slot(record_id)
+                    self.ledger.complete_frontier(record_id)
+                self._recycle_browser_if_due()
+        finally:
+            self._close_browser()
+
+    def _run_frontier_pipeline(self):
+        """
+        主瀏覽器負責列舉 (含翻頁延遲)，num_workers 個 worker 瀏覽器同時從佇列取出論文下載，
+        讓翻頁等待與下載工作互相重疊。佇列保存在帳本中，中斷後可直接續下。
+        """
+        if not self.main_window_handle:
+            self.main_window_handle = self.driver.current_window_handle
+        released = self.ledger.reset_frontier_claims(self.keyword)
+        if released:
+            print(f"[*] 已將上次中斷時領取的 {released} 篇論文放回佇列。")
+        print(
+            f"[*] Frontier 模式：佇列中已有 {self.ledger.frontier_size(self.keyword)} 篇，啟動 {self.num_workers} 個下載 worker...")
+        producer_done = threading.Event()
+        cookies = self.driver.get_cookies()
+        consumers = [threading.Thread(target=self._frontier_consumer_loop,
+                                      args=(i + 1, cookies, producer_done),
+                                      name=f"worker-{i + 1}", daemon=True)
+                     for i in range(self.num_workers)]
+        for consumer in consumers:
+            consumer.start()
+        try:
+            if self.ledger.get_meta(f"frontier_complete:{self.keyword}"):
+                print("[*] 此關鍵字的結果頁已全部列舉過，只消化佇列。")
+            else:
+                self._produce_frontier()
+        finally:
+            producer_done.set()
+            for consumer in consumers:
+                consumer.join()
+            print(
+                f"[*] Frontier 模式結束，本次共下載 {self.session_download_count} 篇，佇列剩餘 {self.ledger.frontier_size(self.keyword)} 篇。")
+
+    # ==============================================================================
+    # 分散模式：coordinator 列舉並解析永久網址，各台機器上的 worker 以租約領取工作
+    # ==============================================================================
+    def _resolve_work_item(self, url: str, title: str,
+                           keyword: Optional[str] = None) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        開啟論文詳目頁取得永久識別碼，回傳 (不依賴 session 的網址, thesis_id)。
+        列表上的網址綁定這次搜尋的 session 與名次，其他機器無法使用；沒有電子全文的論文回傳 None。
+        """
+        self._throttle()
+        self._open_work_tab()
         try:
-            self._setup_driver()
-            self.wait_for_manual_login()
-            self.run_search()
+            load_started = time.monotonic()
+            self.driver.get(url)
+            page_latency = time.monotonic() - load_started
+            self.metrics.observe("navigate", page_latency, lean=self.lean_browser)
+            self._pace_success(page_latency)
+            if self._check_thesis_identity(title, url):
+                self._log_duplicate(url, title, keyword=keyword)
+                return None
+            if self._probe_fulltext_link() is None:
+                self._log_record_status(url, title, "skipped", "no_fulltext", keyword=keyword)
+                return None
+            thesis_id = extract_thesis_id(self.driver.page_source)
+            permanent_url = permanent_record_url(thesis_id) if thesis_id else None
+            if not permanent_url:
+                print(f"      - [警告] 找不到永久網址，改用列表網址 (其他機器可能無法開啟): {title}")
+            return permanent_url or url, thesis_id
+        except TimeoutException:
+            # 暫時逾時不當成沒有電子全文；這篇留在帳本中，下次列舉時再解析
+            print(f"      - [警告] 詳目頁逾時，下次列舉時再解析: {title}")
+            self._pace_trouble("timeout", "詳目頁逾時")
+            self._log_record_status(url, title, "failed", "timeout", keyword=keyword)
+            return None
+        finally:
+            self._release_work_tab()
+
+    def _enumerate_to_coordinator(self):
+        """走訪結果頁，把可下載的論文 (以永久網址) 寫入共用工作佇列。"""
+        if not self.main_window_handle:
+            self.main_window_handle = self.driver.current_window_handle
+        for page_num, article_urls_with_titles in self._iter_result_pages():
+            items = []
+            for url, title in self._pending_articles(article_urls_with_titles, page_num):
+                record_id = self._record_key(title, url)
+                if self.coordinator.is_known(record_id):
+                    continue
+                resolved = self._resolve_work_item(url, title)
+                if resolved:
+                    # 解析後已改以永久識別碼為鍵
+                    items.append((self._record_key(title, url), self.keyword, resolved[0], title, resolved[1]))
+            added = self.coordinator.enqueue(items)
+            print(f"[*] [分散] 第 {page_num} 頁加入 {added} 篇到共用佇列。")
+            self._log_progress(page_num)
+
+    def _heartbeat_loop(self, record_id: str, stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.coordinator.heartbeat(self.worker_id, record_id, self.lease_seconds):
+                print(f"      - [警告] [分散] 工作 {record_id} 的租約已被他人接手。")
+                return
+
+    def _run_distributed_worker(self):
+        """從共用佇列領取工作直到佇列清空且沒有 coordinator 在列舉，或閒置超過 WORKER_IDLE_TIMEOUT。"""
+        if not self.main_window_handle:
+            self.main_window_handle = self.driver.current_window_handle
+        print(f"\n[步驟 3] [分散] worker {self.worker_id} 開始領取工作...")
+        idle_started = None
+        while not self._download_limit_reached():
+            item = self.coordinator.claim(self.worker_id, self.lease_seconds)
+            if item is None:
+                idle_started = idle_started or time.monotonic()
+                if not self.coordinator.enumeration_active() and not self.coordinator.stats().get('leased'):
+                    print("[*] [分散] 共用佇列已清空。")
+                    break
+                if time.monotonic() - idle_started > self.WORKER_IDLE_TIMEOUT:
+                    print("[*] [分散] 等待新工作逾時，worker 結束。")
+                    break
+                time.sleep(self.WORKER_POLL_INTERVAL)
+                continue
+            idle_started = None
+            record_id, keyword, url, title, attempts = item
+            print(f"[*] [分散] 領取工作 (第 {attempts} 次嘗試): {title}")
+            if record_id in self.downloaded_urls:
+                self.coordinator.complete(self.worker_id, record_id)
+                continue
+            self._bind_record_key(url, title, record_id)
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat_loop, args=(record_id, stop),
+                                         name="lease-heartbeat", daemon=True)
+            heartbeat.start()
+            try:
+                downloaded = self._process_article_in_new_tab(url, title, keyword)[0] is not None
+            except Exception as e:
+                print(f"[錯誤] [分散] 處理工作時發生錯誤: {type(e).__name__} - {e}")
+                downloaded = False
+            finally:
+                stop.set()
+                heartbeat.join()
+            if downloaded:
+                self.coordinator.complete(self.worker_id, record_id)
+            else:
+                status = self.ledger.get_status(record_id) or ("failed", "error")
+                if status[0] == "downloaded":
+                    self.coordinator.complete(self.worker_id, record_id)
+                else:
+                    # 無電子全文、重複論文等跳過原因重試也沒有用
+                    self.coordinator.fail(self.worker_id, record_id, status[1] or status[0],
+                                          retryable=status[0] == "failed")
+            self._recycle_browser_if_due()
+        print_coordinator_status(self.coordinator)
+
+    def _report_to_catalog(self, record_id: str, final_path: str, digest: str):
+        """把後處理完成的 PDF 複製到中央目錄 (依內容雜湊存放) 並登錄。"""
+        file_path = final_path
+        if self.catalog_store:
+            file_path, _ = self.catalog_store.add(final_path, digest, os.path.splitext(final_path)[1] or ".pdf")
+        self.coordinator.record_catalog(record_id, self.worker_id, file_path, os.path.getsize(final_path), digest)
+
+    def _put_task(self, task_queue: "queue.Queue", task, workers: List[threading.Thread]) -> bool:
+        while any(worker.is_alive() for worker in workers):
+            try:
+                task_queue.put(task, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _switch_keyword(self, keyword: str):
+        """切換到 campaign 中的下一個關鍵字，頁數進度從帳本中該關鍵字的紀錄續接。"""
+        self.keyword = keyword
+        # 列表網址中的名次只在同一次搜尋內有意義，換關鍵字時清掉舊的對應
+        self._listing_identity.clear()
+        self.last_crawled_page = self.ledger.get_page_progress(keyword) or 1
+        self.total_pages = 0
+        self.reached_last_page = False
+        self._resume_page = None
+        # frontier 與分散模式的續接點是佇列本身，不需要依日誌跳頁
+        resume = None if self.frontier_mode or self.distributed_role \
+            else self.ledger.journal_resume_point(keyword, self.last_crawled_page)
+        if resume:
+            self.last_crawled_page = self._resume_page = resume[0]
+            print(f"[*] 依檢查點日誌，直接從第 {resume[0]} 頁第 {resume[1] + 1} 筆未完成的論文續接。")
+
+    def _keyword_finished(self, keyword: str) -> bool:
+        if self.ledger.get_meta(f"keyword_complete:{keyword}"):
+            return True
+        # frontier 模式下結果頁已全部列舉且佇列已清空，同樣不必再搜尋
+        return self.frontier_mode and bool(self.ledger.get_meta(f"frontier_complete:{keyword}")) \
+            and self.ledger.frontier_size(keyword) == 0
+
+    def run_campaign(self):
+        """
+        依序處理所有關鍵字 (只有一個時就是一般的單一關鍵字執行)，整個 campaign 共用同一個瀏覽器與登入狀態。
+        已爬完所有結果頁的關鍵字直接略過，不再重新搜尋；其餘各自從帳本中的頁數進度續爬。
+        論文以帳本去重，在前一個關鍵字下載過的論文不會再下載。
+        分散模式的 worker 不搜尋，直接從共用佇列領取工作。
+        帳本中已到重試時間的失敗論文在每種模式都會處理：分散模式交給共用佇列，其餘模式在結束前重試。
+        """
+        if self.distributed_role == "worker":
+            self._hand_retries_to_coordinator()
+            self._run_distributed_worker()
+            return
+        if self.distributed_role == "coordinator":
+            self.coordinator.set_enumerating(self.worker_id, True)
+        try:
+            self._run_keywords()
+            if self.distributed_role == "coordinator":
+                self._hand_retries_to_coordinator()
+        finally:
+            if self.distributed_role == "coordinator":
+                self.coordinator.set_enumerating(self.worker_id, False)
+                print_coordinator_status(self.coordinator)
+        if self.distributed_role is None:
+            self._drain_retry_queue()
+
+    def _drain_retry_queue(self):
+        """執行結束前，依序重試所有關鍵字中已到重試時間的失敗論文，最後列出重試佇列的狀態。"""
+        retried = 0
+        while not self._download_limit_reached():
+            retry = self.ledger.claim_due_retry(lease_seconds=self.retry_lease_seconds)
+            if retry is None:
+                break
+            if retried == 0:
+                print("\n[步驟 4] 重試先前失敗且已到重試時間的論文...")
+            self._retry_failed_record(retry)
+            retried += 1
+            self._recycle_browser_if_due()
+        if retried:
+            print(f"[*] 本次共重試 {retried} 篇失敗的論文。")
+        print_retry_report(self.ledger)
+
+    def _hand_retries_to_coordinator(self):
+        """
+        分散模式不在本機重試：把帳本中已到重試時間的失敗論文 (包括列舉時詳目頁逾時的論文)
+        解析成永久網址後加入共用佇列，由 worker 依租約重試，本機的重試紀錄隨即移除。
+        """
+        if not self.main_window_handle:
+            self.main_window_handle = self.driver.current_window_handle
+        handed = 0
+        while True:
+            retry = self.ledger.claim_due_retry(lease_seconds=self.retry_lease_seconds)
+            if retry is None:
+                break
+            if handed == 0:
+                print("\n[步驟 4] [分散] 把已到重試時間的失敗論文交給共用佇列...")
+            item = self._retry_work_item(retry)
+            if item:
+                self.coordinator.enqueue([item])
+                self.ledger.clear_retry(retry[0])
+                self.ledger.clear_retry(item[0])
+            handed += 1
+        if handed:
+            print(f"[*] [分散] 本次共處理 {handed} 篇待重試的論文。")
+            print_retry_report(self.ledger)
+
+    def _retry_work_item(self, retry: Tuple[str, Optional[str], str, Optional[str], int]
+                         ) -> Optional[Tuple[str, str, str, Optional[str], Optional[str]]]:
+        """把一筆待重試的論文轉成共用佇列的工作 (record_id, keyword, url, title, thesis_id)；不需要或無法重試時回傳 None。"""
+        record_id, keyword, stored_url, title, _ = retry
+        # 重試的紀錄與日誌歸在論文原本的關鍵字之下
+        keyword = keyword or self.keyword
+        if record_id in self.downloaded_urls:
+            self.ledger.clear_retry(record_id)
+            return None
+        thesis_id = self.ledger.get_thesis_id(record_id)
+        if thesis_id:
+            return record_id, keyword, permanent_record_url(thesis_id), title, thesis_id
+        url = self._locate_by_search(title, record_id) if title else None
+        if url is None:
+            self._retry_not_found(stored_url, title, record_id, keyword)
+            return None
+        self._bind_record_key(url, title or record_id, record_id)
+        resolved = self._resolve_work_item(url, title or record_id, keyword)
+        if resolved is None:
+            return None
+        # 解析後已改以永久識別碼為鍵
+        return self._record_key(title or record_id, url), keyword, resolved[0], title, resolved[1]
+
+    def _retry_not_found(self, stored_url: str, title: Optional[str], record_id: str, keyword: Optional[str]):
+        """重新搜尋找不到論文不是下載失敗：延後再試，不計入失敗次數。"""
+        print(f"    - [重試] 沒有永久網址，重新搜尋也找不到這篇論文: {title or record_id}")
+        self._bind_record_key(stored_url, title, record_id)
+        self._log_record_status(stored_url, title, "failed", "not_found", keyword)
+
+    def _retry_failed_record(self, retry: Tuple[str, Optional[str], str, Optional[str], int],
+                             allow_search: bool = True) -> bool:
+        """
+        重試一筆失敗的論文；沒有實際處理 (已下載、正由其他 worker 處理或已達上限) 時回傳 False。
+        列表上的網址綁定當初的搜尋 session，之後開啟可能是另一篇論文，因此只重播永久網址；
+        沒有永久識別碼的論文以標題重新搜尋找出這次的網址。allow_search 為 False 時 (下載 worker
+        的瀏覽器與列舉端共用登入，搜尋會打亂列舉中的結果) 這類論文交回佇列，留給結束前的重試階段。
+        """
+        record_id, keyword, stored_url, title, attempts = retry
+        # 重試的紀錄與日誌歸在論文原本的關鍵字之下，不改動其他執行緒也在讀取的 self.keyword
+        keyword = keyword or self.keyword
+        if record_id in self.downloaded_urls:
+            self.ledger.clear_retry(record_id)
+            return False
+        thesis_id = self.ledger.get_thesis_id(record_id)
+        url = permanent_record_url(thesis_id) if thesis_id else None
+        if url is None:
+            if not allow_search:
+                self.ledger.release_retry(record_id)
+                return False
+            url = self._locate_by_search(title, record_id) if title else None
+            if url is None:
+                self._retry_not_found(stored_url, title, record_id, keyword)
+                return True
+        self._bind_record_key(url, title or record_id, record_id)
+        if not self._reserve_download_slot(record_id):
+            # 另一個 worker 正在處理同一篇論文，或已達下載上限；交回佇列下次再試
+            self.ledger.release_retry(record_id)
+            return False
+        try:
+            print(f"    - [重試] 第 {attempts + 1} 次嘗試: {title or record_id}")
+            self._process_article_in_new_tab(url, title or record_id, keyword)
+        except Exception as e:
+            print(f"[錯誤] 重試論文時發生錯誤: {e}")
+        finally:
+            self._release_download_slot(record_id)
+        return True
+
+    def _locate_by_search(self, title: str, record_id: str) -> Optional[str]:
+        """
+        以標題重新搜尋，在第一頁結果中找出帳本鍵相同的論文，回傳它在這次搜尋中的網址。
+        暫時鍵依當初的列表網址而定，這次搜尋不會再得到同一個鍵，改比對標題鍵，打開後再以識別碼確認。
+        """
+        self._throttle()
+        try:
+            self._submit_search(title)
+            records = self._parse_listing_records()
+        except (TimeoutException, WebDriverException) as e:
+            print(f"    - [重試] 重新搜尋失敗: {type(e).__name__}")
+            return None
+        self._assign_listing_keys(records)
+        provisional = is_provisional_key(record_id)
+        for record in records:
+            if not record["url"] or not record["title"]:
+                continue
+            if self._record_key(record["title"], record["url"]) == record_id or (
+                    provisional and thesis_title_key(record["title"]) == provisional_base(record_id)):
+                return record["url"]
+        return None
+
+    def _run_keywords(self):
+        for index, keyword in enumerate(self.keywords):
+            if self._download_limit_reached():
+                print(f"\n[!] 已達到本次執行下載上限，剩餘關鍵字 {self.keywords[index:]} 留待下次執行。")
+                break
+            delta = self._keyword_finished(keyword)
+            if delta and not self.delta_crawl:
+                print(f"[*] 關鍵字 '{keyword}' 的所有結果頁先前已處理完畢，略過。")
+                continue
+            self._switch_keyword(keyword)
+            if delta:
+                self._start_delta(keyword)
+            if len(self.keywords) > 1:
+                print(f"\n=== [Campaign {index + 1}/{len(self.keywords)}] 關鍵字 '{keyword}'，"
+                      f"從第 {self.last_crawled_page} 頁開始 ===")
+            with self._startup_phase("搜尋") if "搜尋" not in self.startup_timings else nullcontext():
+                self.run_search()
             self.run_download_process()
+            if delta:
+                self._finish_delta(keyword)
+                continue
+            # frontier 模式下 reached_last_page 只代表列舉完畢，佇列清空 (見 _keyword_finished) 才算完成
+            if self._keyword_finished(keyword) or (
+                    self.reached_last_page and not self.frontier_mode and not self._download_limit_reached()):
+                self.ledger.set_meta(f"keyword_complete:{keyword}", time.strftime('%Y-%m-%d %H:%M:%S'))
+                print(f"[*] 關鍵字 '{keyword}' 的所有結果頁皆已處理完畢。")
+
+    def _start_profiler(self):
+        if self.profile_output and self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+            print(f"[*] cProfile 已啟用，結束時輸出至 {self.profile_output}")
+
+    def _stop_profiler(self):
+        if self._profiler is None:
+            return
+        self._profiler.disable()
+        self._profiler.dump_stats(self.profile_output)
+        print(f"[*] cProfile 結果已寫入 {self.profile_output}，耗時最多的函式:")
+        pstats.Stats(self._profiler).sort_stats("cumulative").print_stats(15)
+        self._profiler = None
+
+    def run(self):
+        try:
+            self._start_profiler()
+            with self._startup_phase("瀏覽器啟動"):
+                self._setup_driver()
+            with self._startup_phase("登入"):
+                self.wait_for_manual_login()
+            self.run_campaign()
         except Exception as e:
             print(f"\n[主程式發生嚴重錯誤]：{type(e).__name__} - {e}")
             if self.driver:
@@ -504,6 +2663,42 @@ class BaseThesisDownloader:
             print("\n--- 爬蟲程式執行完畢 ---\n")
 
     def close(self):
+        self._close_browser()
+        if self._postprocess_pool is not None:
+            print("[*] 等待背景後處理 (雜湊、去重、改名) 完成...")
+            self._postprocess_pool.shutdown(wait=True)
+        if self._captcha_solver:
+            self._captcha_solver.shutdown()
+        if self.fulltext_index_file:
+            self._update_fulltext_index()
+        if self.harvest_writer is not None:
+            self.harvest_writer.close()
+            print(f"[*] 書目收割: 本次共寫出 {self.harvest_writer.count} 筆到 {self.harvest_writer.output_path}")
+        self._stop_profiler()
+        self.metrics.print_summary()
+        self.metrics.close()
+        if self.coordinator:
+            self.coordinator.close()
+        self.ledger.close()
+
+    def _update_fulltext_index(self):
+        print("[*] 更新全文索引...")
+        try:
+            with self.metrics.span("fulltext_index"):
+                stats = update_fulltext_index(self.download_dir, self.fulltext_index_file, self.ledger,
+                                              self.index_workers)
+        except Exception as e:
+            # 結束時的索引更新是附帶工作，缺少套件或擷取失敗都不影響已完成的下載
+            print(f"[警告] 無法更新全文索引: {type(e).__name__} - {e}")
+            return
+        print_index_stats(stats)
+
+    def _close_browser(self):
+        """只關閉目前執行緒所擁有的瀏覽器。"""
+        session = getattr(self._browser, 'http_session', None)
+        if session is not None:
+            session.close()
+            self._browser.http_session = None
         if self.driver:
             print("\n[-] 關閉 Selenium 瀏覽器。")
             self.driver.quit()
@@ -512,133 +2707,64 @@ class BaseThesisDownloader:
 
 class ThesisDownloaderWithReadme(BaseThesisDownloader):
     """
-    增強型臺灣博碩士論文網自動下載器 (v6)。
-    兼具「事後統整」與「即時記錄」兩種模式。
-    1. 啟動時，掃描資料夾，將已存在的 PDF 建立基本連結。
-    2. 下載時，即時記錄新下載的 PDF，並包含完整資訊。
+    增強型臺灣博碩士論文網自動下載器 (v7)。
+    以 DownloadCatalog 維護下載目錄 (位置由 catalog_output_dir 設定，預設為 catalog/ 資料夾)：
+    1. 第一次啟動時，掃描下載資料夾，收錄已存在的 PDF (之後的啟動不再掃描或讀取既有目錄)。
+    2. 每篇論文下載完成時，立即收錄並附上來源網址。
     """
 
     def __init__(self, *args, **kwargs):
+        self.catalog: Optional[DownloadCatalog] = None
         super().__init__(*args, **kwargs)
-        self.readme_file = os.path.join(BASE_DIR, "README.md")
-        self.readme_handle = None
-
-    def _initialize_readme(self):
-        try:
-            print(f"[*] 初始化 README.md 記錄檔於: {self.readme_file}")
-            self.readme_handle = open(self.readme_file, 'a+', encoding='utf-8')
-            self.readme_handle.seek(0)
-            if not self.readme_handle.read(1):
-                session_header = (
-                    f"# --- Crawler Session Started: {time.strftime('%Y-%m-%d %H:%M:%S')} ---\n"
-                    f"**Keyword:** `{self.keyword}`\n\n"
-                )
-                self.readme_handle.write(session_header)
-                self.readme_handle.flush()
-            self.readme_handle.seek(0, 2)  # Move to the end for appending
-        except Exception as e:
-            print(f"[錯誤] 初始化 README.md 失敗: {e}")
-            self.readme_handle = None
-
-    # ==============================================================================
-    # ★★★★★★★★★★★★★★★★★★★★★★★★★ 新增的函式 ★★★★★★★★★★★★★★★★★★★★★★★★★
-    # ==============================================================================
-    def _consolidate_existing_pdfs(self):
-        """
-        [事後統整] 掃描下載資料夾，將尚未被記錄的 PDF 檔案以基本格式加入 README.md。
-        """
-        print("\n[統整模式] 正在檢查已存在的 PDF 檔案...")
-        if not self.readme_handle:
-            print("[警告] README 控制代碼未初始化，跳過統整。")
-            return
-        if not os.path.isdir(self.download_dir):
-            print(f"[*] 下載資料夾 '{self.download_dir}' 不存在，無需統整。")
-            return
-
-        # 1. 讀取 README 中已記錄的檔名，避免重複加入
-        self.readme_handle.seek(0)
-        logged_pdfs = set(re.findall(
-            r"\[(.*?.pdf)\]", self.readme_handle.read()))
 
-        self.readme_handle.seek(0, 2)  # 讀取完畢後，將指標移回檔案末尾以供後續附加
-        print(f"[*] README 中已記錄 {len(logged_pdfs)} 個檔案。")
+    def _load_log(self) -> Tuple[DownloadLedger, int]:
+        # 基礎類別在這裡排入上次中斷前未完成的後處理，完成時就會收錄，目錄必須先開好
+        self.catalog_dir = os.path.join(BASE_DIR, self.config.catalog_output_dir)
+        self.catalog = DownloadCatalog(self.ledger, self.catalog_dir)
+        return super()._load_log()
 
-        # 2. 獲取資料夾中實際存在的所有 PDF 檔名
-        try:
-            existing_pdfs = {f for f in os.listdir(
-                self.download_dir) if f.lower().endswith('.pdf')}
-        except Exception as e:
-            print(f"[錯誤] 無法讀取下載資料夾 '{self.download_dir}': {e}")
+    def _open_catalog(self):
+        """目錄還沒建立過時，收錄下載資料夾中既有的 PDF。"""
+        if self.ledger.get_meta("catalog_seeded"):
+            print(f"[*] 下載目錄: {self.catalog.readme_file}")
             return
+        print("\n[目錄] 第一次建立下載目錄，正在收錄已存在的 PDF 檔案...")
+        added = self.catalog.scan(self.download_dir)
+        self.catalog.render_index()
+        self.ledger.set_meta("catalog_seeded", time.strftime('%Y-%m-%d %H:%M:%S'))
+        print(f"[*] 已收錄 {added} 個既有檔案，目錄位於: {self.catalog.readme_file}")
 
-        # 3. 找出那些存在於資料夾、但未被記錄在 README 的檔案
-        pdfs_to_add = sorted(list(existing_pdfs - logged_pdfs))
-
-        if not pdfs_to_add:
-            print("[*] 無需統整，所有已存在的 PDF 都已被記錄。")
+    def _catalog_download(self, record_id: str, final_path: str):
+        """[即時記錄] 把剛下載完成的論文收錄到目錄，來源網址優先使用不依賴搜尋 session 的永久網址。"""
+        if self.catalog is None:
             return
-
-        print(f"[*] 發現 {len(pdfs_to_add)} 個尚未記錄的 PDF，現在開始寫入 README...")
-
-        # 4. 將新發現的檔案寫入 README
         try:
-            self.readme_handle.write("\n## --- 本次啟動時發現的已存在檔案 ---\n\n")
-            for pdf_filename in pdfs_to_add:
-                encoded_filename = quote(pdf_filename)
-                pdf_relative_url = f"./{os.path.basename(self.download_dir)}/{encoded_filename}"
-                # 採用精簡格式，因為沒有來源網址等詳細資訊
-                readme_entry = f"* [{pdf_filename}]({pdf_relative_url}) - `(已存在於資料夾中的檔案)`\n"
-                self.readme_handle.write(readme_entry)
-
-            self.readme_handle.write("\n---\n")
-            self.readme_handle.flush()
-            print(f"[*] 統整完成，已將 {len(pdfs_to_add)} 個檔案連結加入 README.md。")
+            title, url, keyword, thesis_id = (self.ledger.file_metadata(final_path, record_id)
+                                              or (None, None, self.keyword, None))
+            url = (permanent_record_url(thesis_id) if thesis_id else None) or url
+            if self.catalog.add(record_id, keyword, final_path, title, url, thesis_id):
+                print(f"      - [目錄] 已收錄 {os.path.basename(final_path)}")
         except Exception as e:
-            print(f"[錯誤] 寫入統整資訊到 README 時發生錯誤: {e}")
-
-    def _log_readme_entry(self, sanitized_title: str, original_title: str, article_url: str):
-        """
-        [即時記錄] 將一筆成功的下載紀錄以 Markdown 格式寫入 README.md。
-        """
-        if self.readme_handle:
-            try:
-                pdf_filename = f"{sanitized_title}.pdf"
-                encoded_filename = quote(pdf_filename)
-                pdf_relative_url = f"./{os.path.basename(self.download_dir)}/{encoded_filename}"
-                readme_entry = (
-                    f"* [{pdf_filename}]({pdf_relative_url}) - {original_title} "
-                    f"([Source]({article_url}))\n"
-                )
-                self.readme_handle.write(readme_entry)
-                self.readme_handle.flush()
-            except Exception as e:
-                print(f"      - [警告] 寫入 README.md 失敗: {e}")
-
-    def _setup_driver(self):
-        super()._setup_driver()
-        self._initialize_readme()
+            print(f"      - [警告] 寫入下載目錄失敗: {type(e).__name__} - {e}")
 
-    # ==============================================================================
-    # ★★★★★★★★★★★★★★★★★★★★★★★★★ 修改的函式 ★★★★★★★★★★★★★★★★★★★★★★★★★
-    # ==============================================================================
     def run(self):
         """
         覆寫後的執行流程：
         1. 執行基礎設定 (setup)
-        2. (新功能) 統整已存在的 PDF 檔案
-        3. 執行完整的下載流程 (登入、搜尋、下載)
+        2. 開啟下載目錄 (第一次時收錄已存在的 PDF 檔案)
+        3. 執行完整的下載流程 (登入、搜尋、下載)，每篇完成時即時收錄
         """
         try:
-            # 基礎設定，會同時初始化 README.md 控制代碼
-            self._setup_driver()
+            self._start_profiler()
+            with self._startup_phase("瀏覽器啟動"):
+                self._setup_driver()
 
-            # 執行「事後統整」
-            self._consolidate_existing_pdfs()
+            with self._startup_phase("下載目錄"):
+                self._open_catalog()
 
-            # 執行「即時記錄」流程
-            self.wait_for_manual_login()
-            self.run_search()
-            self.run_download_process()
+            with self._startup_phase("登入"):
+                self.wait_for_manual_login()
+            self.run_campaign()
 
         except Exception as e:
             print(f"\n[主程式發生嚴重錯誤]：{type(e).__name__} - {e}")
@@ -649,28 +2775,279 @@ class ThesisDownloaderWithReadme(BaseThesisDownloader):
             print("\n--- 爬蟲程式執行完畢 ---\n")
 
     def close(self):
-        if self.readme_handle:
-            print("[-] 正在關閉 README.md 檔案...")
-            self.readme_handle.close()
         super().close()
+        if self.catalog is not None and self.catalog.added:
+            print(f"[*] 下載目錄: 本次共收錄 {self.catalog.added} 篇論文。")
+
+
+def print_retry_report(ledger: DownloadLedger):
+    """列出延後重試佇列：哪些失敗仍會再試、哪些已達重試上限成為永久失敗。"""
+    rows = ledger.retry_summary()
+    if not rows:
+        print("[*] 延後重試佇列是空的。")
+        return
+    print("\n[*] 延後重試佇列:")
+    print(f"{'類別':<10}{'可重試':>6}{'已到期':>7}{'永久失敗':>8}  下次重試")
+    for failure_class, retryable, permanent, due, next_at in rows:
+        next_text = time.strftime('%m-%d %H:%M', time.localtime(next_at)) if next_at and retryable else "-"
+        print(f"{failure_class:<12}{retryable or 0:>9}{due or 0:>10}{permanent or 0:>12}  {next_text}")
+    failures = ledger.permanent_failures()
+    if failures:
+        print("[*] 永久失敗 (已達重試上限，不再自動重試):")
+        for title, failure_class, attempts, keyword in failures:
+            print(f"    - [{failure_class}, {attempts} 次] {title}" + (f"  [{keyword}]" if keyword else ""))
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="臺灣博碩士論文網自動下載器")
+    parser.add_argument("--metrics", action="store_true",
+                        help="把各階段耗時寫入 METRICS_DIR (events.jsonl 與 Prometheus 文字檔)")
+    subparsers = parser.add_subparsers(dest="command")
+    bench_parser = subparsers.add_parser(
+        "benchmark-captcha", help="以驗證碼樣本庫離線評測各組前處理設定")
+    bench_parser.add_argument(
+        "--corpus", default=os.path.join(BASE_DIR, "captcha_corpus"))
+    label_parser = subparsers.add_parser(
+        "captcha-label", help="手動標註被拒絕的驗證碼樣本，供離線評測使用")
+    label_parser.add_argument(
+        "--corpus", default=os.path.join(BASE_DIR, "captcha_corpus"))
+    listing_parser = subparsers.add_parser(
+        "benchmark-listing", help="以儲存的搜尋結果頁比較 WebDriver 與快速列表解析器")
+    listing_parser.add_argument("pages", nargs="+", help="儲存的搜尋結果頁 HTML 檔")
+    listing_parser.add_argument("--repeat", type=int, default=5)
+    campaign_parser = subparsers.add_parser(
+        "campaign", help="在同一個瀏覽器與登入狀態中依序下載多個關鍵字")
+    campaign_parser.add_argument("keywords", nargs="+", help="要依序處理的關鍵字")
+    campaign_parser.add_argument("--delta", action="store_true", help="已爬完的關鍵字只抓取上次執行後新增的論文")
+    coordinator_parser = subparsers.add_parser(
+        "coordinator", help="分散模式：列舉搜尋結果並寫入共用工作佇列")
+    coordinator_parser.add_argument("keywords", nargs="*", help="要列舉的關鍵字 (預設為 SEARCH_KEYWORD)")
+    coordinator_parser.add_argument("--store", default="shared/work_queue.sqlite3", help="共用工作佇列的 SQLite 檔")
+    worker_parser = subparsers.add_parser(
+        "worker", help="分散模式：以本機登入從共用佇列領取工作下載")
+    worker_parser.add_argument("--store", default="shared/work_queue.sqlite3", help="共用工作佇列的 SQLite 檔")
+    worker_parser.add_argument("--worker-id", default=None, help="worker 名稱 (預設為主機名稱-PID)")
+    worker_parser.add_argument("--catalog-dir", default="shared/catalog", help="中央目錄存放 PDF 的資料夾")
+    worker_parser.add_argument("--profile", default=None, help="此 worker 使用的 Chrome 設定檔資料夾")
+    harvest_parser = subparsers.add_parser(
+        "harvest", help="書目收割模式：只抓取詳目頁的書目欄位 (不下載 PDF)，輸出 JSONL 或 Parquet")
+    harvest_parser.add_argument("keywords", nargs="*", help="要收割的關鍵字 (預設為 SEARCH_KEYWORD)")
+    harvest_parser.add_argument("--output", default="metadata.jsonl", help="輸出檔 (.jsonl 或 .parquet)")
+    harvest_parser.add_argument("--concurrency", type=int, default=4, help="同時進行的詳目頁請求數")
+    harvest_parser.add_argument("--rate", type=float, default=30, help="每分鐘最多的請求數")
+    status_parser = subparsers.add_parser("queue-status", help="顯示共用工作佇列與各 worker 的狀態")
+    status_parser.add_argument("--store", default="shared/work_queue.sqlite3")
+    subparsers.add_parser("retry-status", help="顯示延後重試佇列：可重試與永久失敗的論文")
+    catalog_parser = subparsers.add_parser("catalog", help="維護下載目錄 (catalog/README.md、CSV、JSONL)")
+    catalog_parser.add_argument("--scan", action="store_true", help="收錄下載資料夾中尚未收錄的 PDF")
+    catalog_parser.add_argument("--rebuild", action="store_true", help="由帳本中的目錄索引重新產生所有檢視")
+    account_parser = subparsers.add_parser("account-status", help="顯示多帳號的今日用量、剩餘額度與冷卻狀態")
+    account_parser.add_argument("--accounts", default="accounts.json", help="多帳號設定檔 (JSON)")
+    index_parser = subparsers.add_parser("index", help="擷取新增或變更 PDF 的全文並更新 FTS 索引")
+    index_parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    query_parser = subparsers.add_parser("search-text", help="在已下載論文的全文索引中搜尋")
+    query_parser.add_argument("query")
+    query_parser.add_argument("--limit", type=int, default=10)
+    bench_index_parser = subparsers.add_parser(
+        "benchmark-index", help="以現有 PDF 比較不同子行程數的全文索引吞吐量")
+    bench_index_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    for name, help_text in (("mock-server", "啟動離線的論文網替身伺服器 (供手動測試)"),
+                            ("benchmark-e2e", "以 headless Chrome 對離線替身伺服器進行端對端效能評測")):
+        mock_parser = subparsers.add_parser(name, help=help_text)
+        mock_parser.add_argument("--records", type=int, default=50, help="模擬的論文篇數")
+        mock_parser.add_argument("--latency", type=float, nargs=2, default=[0.05, 0.2], help="每個請求的延遲範圍 (秒)")
+        mock_parser.add_argument("--error-rate", type=float, default=0.0, help="HTML 頁面回傳 503 的比例")
+        mock_parser.add_argument("--file-kb", type=int, default=256, help="每個下載檔案的大小 (KB)")
+        mock_parser.add_argument("--zip-ratio", type=float, default=0.2, help="以 ZIP 提供下載的比例")
+        mock_parser.add_argument("--captcha-reject-rate", type=float, default=0.1, help="驗證碼被隨機拒絕的比例")
+        mock_parser.add_argument("--strict-captcha", action="store_true", help="驗證碼答案必須正確 (連同 OCR 一起評測)")
+    subparsers.choices["mock-server"].add_argument("--port", type=int, default=8765)
+    e2e_parser = subparsers.choices["benchmark-e2e"]
+    e2e_parser.add_argument("--workers", type=int, default=1, help="下載瀏覽器數")
+    e2e_parser.add_argument("--lean", action="store_true", help="使用精簡瀏覽器模式")
+    e2e_parser.add_argument("--direct-download", action="store_true", help="以 HTTP 串流下載")
+    e2e_parser.add_argument("--frontier", action="store_true", help="使用 frontier 模式")
+    e2e_parser.add_argument("--report", default="benchmark_e2e.json", help="評測結果輸出檔")
+    e2e_parser.add_argument("--baseline", default=None, help="先前的評測結果檔，用於比較差異")
+    args = parser.parse_args()
+    DOWNLOAD_DIR = os.path.join(BASE_DIR, "downloaded_theses")
+    FULLTEXT_INDEX_FILE = "fulltext_index.sqlite3"  # index / search-text 指令使用的全文索引
+
+    if args.command == "index":
+        ledger = DownloadLedger(os.path.join(BASE_DIR, "download_ledger.sqlite3"))
+        try:
+            print_index_stats(update_fulltext_index(
+                DOWNLOAD_DIR, os.path.join(BASE_DIR, FULLTEXT_INDEX_FILE), ledger, args.workers))
+        finally:
+            ledger.close()
+        sys.exit(0)
+
+    if args.command == "retry-status":
+        ledger = DownloadLedger(os.path.join(BASE_DIR, "download_ledger.sqlite3"))
+        print_retry_report(ledger)
+        ledger.close()
+        sys.exit(0)
+
+    if args.command == "catalog":
+        ledger = DownloadLedger(os.path.join(BASE_DIR, "download_ledger.sqlite3"))
+        catalog = DownloadCatalog(ledger, os.path.join(BASE_DIR, "catalog"))
+        if args.scan:
+            print(f"[*] 新收錄 {catalog.scan(DOWNLOAD_DIR)} 個檔案。")
+        if args.rebuild:
+            print(f"[*] 已由索引重新產生目錄，共 {catalog.rebuild()} 篇。")
+        else:
+            catalog.render_index()
+        print(f"[*] 下載目錄: {catalog.readme_file}")
+        ledger.close()
+        sys.exit(0)
+
+    if args.command == "account-status":
+        ledger = DownloadLedger(os.path.join(BASE_DIR, "download_ledger.sqlite3"))
+        print_account_status(AccountPool(load_accounts(os.path.join(BASE_DIR, args.accounts)), ledger))
+        ledger.close()
+        sys.exit(0)
+
+    if args.command == "search-text":
+        index = FullTextIndex(os.path.join(BASE_DIR, FULLTEXT_INDEX_FILE))
+        for title, snippet, keyword, source_url, path in index.search(args.query, args.limit):
+            print(f"- {title}" + (f"  [{keyword}]" if keyword else ""))
+            print(f"    {snippet}")
+            print(f"    {source_url or os.path.basename(path)}")
+        index.close()
+        sys.exit(0)
+
+    if args.command == "benchmark-index":
+        # benchmarks 會匯入本模組的下載器類別，因此只在需要時才匯入，避免循環匯入
+        from benchmarks import benchmark_fulltext_index
+        benchmark_fulltext_index(DOWNLOAD_DIR, args.workers)
+        sys.exit(0)
+
+    if args.command == "queue-status":
+        print_coordinator_status(WorkCoordinator(os.path.join(BASE_DIR, args.store)))
+        sys.exit(0)
+
+    if args.command in ("mock-server", "benchmark-e2e"):
+        server_options = dict(latency=tuple(args.latency), error_rate=args.error_rate, file_kb=args.file_kb,
+                              zip_ratio=args.zip_ratio, captcha_reject_rate=args.captcha_reject_rate,
+                              strict_captcha=args.strict_captcha)
+        if args.command == "mock-server":
+            server = MockNdltdServer(records=args.records, port=args.port, **server_options).start()
+            print(f"[*] 模擬伺服器已啟動: {server.url}/cgi-bin/gs32/gsweb.cgi/login?o=dwebmge (Ctrl+C 結束)")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                server.stop()
+        else:
+            from benchmarks import benchmark_end_to_end
+            benchmark_end_to_end(
+                args.records, server_options,
+                dict(num_workers=args.workers, lean_browser=args.lean, direct_download=args.direct_download,
+                     frontier_mode=args.frontier),
+                os.path.join(BASE_DIR, args.report), os.path.join(BASE_DIR, args.baseline) if args.baseline else None)
+        sys.exit(0)
+
+    if args.command == "benchmark-listing":
+        from benchmarks import benchmark_listing_parsers
+        benchmark_listing_parsers(args.pages, args.repeat)
+        sys.exit(0)
+
+    if args.command == "captcha-label":
+        label_captcha_corpus(CaptchaCorpus(args.corpus))
+        sys.exit(0)
+
+    if args.command == "benchmark-captcha":
+        print_captcha_benchmark(benchmark_captcha_configs(
+            ddddocr.DdddOcr(show_ad=False), CaptchaCorpus(args.corpus)))
+        sys.exit(0)
+
     SEARCH_KEYWORD = "台股"
+    METRICS_DIR = "metrics"  # 加上 --metrics 時寫出階段耗時紀錄的資料夾
+    METRICS_PORT = None  # 設定埠號 (例如 9108) 即可讓 Prometheus 從 /metrics 抓取指標
+    PROFILE_OUTPUT = None  # 設定檔名 (例如 "run.prof") 以 cProfile 分析整次執行
+    CAMPAIGN_KEYWORDS = []  # 接在 SEARCH_KEYWORD 之後依序處理的其他關鍵字，各自保存進度
     DOWNLOAD_LIMIT = 1000
     LONG_ARTICLE_DELAY = (15.0, 30.0)
     LONG_PAGE_DELAY = (30.0, 60.0)
+    NUM_WORKERS = 1  # 大於 1 時啟用平行下載模式 (frontier 模式下為下載 worker 數)
+    FRONTIER_MODE = False  # 先列舉所有結果頁到持久化佇列，再由 worker 獨立下載
+    ADAPTIVE_PACING = False  # 設為 True 時依伺服器狀況自動調整延遲 (AIMD)，取代固定的隨機休息範圍
+    CHROME_PROFILE_DIR = "chrome_profile_thesis"  # 保留登入狀態的瀏覽器設定檔，仍有效時可略過手動登入
+    RATE_LIMIT_PER_MINUTE = None  # 所有 worker 合計每分鐘最多開啟的頁面數，None 表示只依休息範圍控制
+    DIRECT_DOWNLOAD = False  # 設為 True 時以 HTTP 串流直接下載，失敗時自動退回瀏覽器下載
+    CDP_DOWNLOAD_EVENTS = True  # 以 CDP 下載事件取代每秒掃描下載資料夾
+    LEAN_BROWSER = False  # 擋下圖片/樣式/字型、eager 載入並重複使用分頁
+    BROWSER_RECYCLE_RECORDS = 150  # 每個瀏覽器處理這麼多篇後重啟 Chrome (保留登入)，None 表示不重啟
+    BROWSER_RECYCLE_RSS_MB = 1500  # Chrome 記憶體超過此值 (MB) 時重啟，需要 psutil
+    ACCOUNTS_FILE = None  # 多帳號設定檔 (例如 "accounts.json")，設定後依各帳號剩餘額度分派下載
+    CAPTCHA_CORPUS_DIR = None  # 設定資料夾 (例如 "captcha_corpus") 以保存驗證碼樣本，供自動挑選前處理設定
+    PREWARM_OCR = False  # 設為 True 時在背景預先載入 ddddocr 模型，縮短第一張驗證碼的等待
+    UPDATE_INDEX_ON_EXIT = False  # 設為 True 時每次執行結束都更新全文索引 (也可隨時執行 index 指令)
+    DELTA_CRAWL = False  # 已爬完的關鍵字改為依學年度由新到舊重新檢查，遇到整頁都是舊論文即停止
+
+    if args.command == "campaign" or (args.command in ("coordinator", "harvest") and args.keywords):
+        SEARCH_KEYWORD, CAMPAIGN_KEYWORDS = args.keywords[0], args.keywords[1:]
+    if args.command == "campaign":
+        DELTA_CRAWL = DELTA_CRAWL or args.delta
+    mode_options = {}
+    if args.command == "coordinator":
+        mode_options = dict(distributed_role="coordinator", coordinator_store=args.store)
+    elif args.command == "worker":
+        mode_options = dict(distributed_role="worker", coordinator_store=args.store,
+                           worker_id=args.worker_id, catalog_dir=args.catalog_dir)
+        CHROME_PROFILE_DIR = args.profile or CHROME_PROFILE_DIR
+    elif args.command == "harvest":
+        mode_options = dict(harvest_output=args.output, harvest_concurrency=args.concurrency)
+        RATE_LIMIT_PER_MINUTE = args.rate
 
-    downloader = ThesisDownloaderWithReadme(
-        keyword=SEARCH_KEYWORD,
+    config = DownloaderConfig(
         max_downloads_per_session=DOWNLOAD_LIMIT,
         inter_article_sleep_range=LONG_ARTICLE_DELAY,
-        inter_page_sleep_range=LONG_PAGE_DELAY
+        inter_page_sleep_range=LONG_PAGE_DELAY,
+        num_workers=NUM_WORKERS,
+        rate_limit_per_minute=RATE_LIMIT_PER_MINUTE,
+        direct_download=DIRECT_DOWNLOAD,
+        cdp_download_events=CDP_DOWNLOAD_EVENTS,
+        lean_browser=LEAN_BROWSER,
+        browser_recycle_records=BROWSER_RECYCLE_RECORDS,
+        browser_recycle_rss_mb=BROWSER_RECYCLE_RSS_MB,
+        accounts_file=ACCOUNTS_FILE,
+        delta_crawl=DELTA_CRAWL,
+        frontier_mode=FRONTIER_MODE,
+        adaptive_pacing=ADAPTIVE_PACING,
+        captcha_corpus_dir=CAPTCHA_CORPUS_DIR,
+        prewarm_ocr=PREWARM_OCR,
+        chrome_profile_dir=CHROME_PROFILE_DIR,
+        campaign_keywords=CAMPAIGN_KEYWORDS,
+        metrics_dir=METRICS_DIR if args.metrics else None,
+        metrics_port=METRICS_PORT,
+        profile_output=PROFILE_OUTPUT,
+        fulltext_index_file=FULLTEXT_INDEX_FILE if UPDATE_INDEX_ON_EXIT else None,
+        **mode_options
     )
+    downloader = ThesisDownloaderWithReadme(SEARCH_KEYWORD, config)
     downloader.run()
 
 
 '''
 python download.py
+python download.py benchmark-captcha
+python download.py captcha-label
+python download.py benchmark-listing saved_pages/*.html
+python download.py campaign 台股 期貨 選擇權
+python download.py campaign 台股 期貨 --delta
+python download.py --metrics campaign 台股 期貨
+python download.py coordinator --store shared/work_queue.sqlite3 台股 期貨
+python download.py worker --store shared/work_queue.sqlite3 --worker-id pc2 --profile chrome_profile_pc2
+python download.py queue-status --store shared/work_queue.sqlite3
+python download.py harvest 台股 期貨 --output metadata.jsonl --concurrency 4
+python download.py retry-status
+python download.py catalog --scan --rebuild
+python download.py account-status --accounts accounts.json
+python download.py index --workers 4
+python download.py search-text 波動率
+python download.py benchmark-index --workers 1 2 4 8
+python download.py mock-server --records 200 --latency 0.1 0.5 --error-rate 0.02
+python download.py benchmark-e2e --records 50 --lean --report lean.json --baseline baseline.json
 
 '''
@@ -0,0 +1,204 @@
+"""
+已下載 PDF 的全文擷取與 SQLite FTS5 全文索引。
+"""
+import os
+import time
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ledger import DownloadLedger
+from thesis_utils import file_sha256, permanent_record_url, thesis_title_key
+
+
+def extract_pdf_text(file_path: str) -> Tuple[str, int]:
+    """擷取 PDF 全文，回傳 (文字, 頁數)。優先使用 PyMuPDF，沒有安裝時改用 pypdf。"""
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+    if fitz is not None:
+        with fitz.open(file_path) as document:
+            return "\n".join(page.get_text() for page in document), document.page_count
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("擷取全文需要 PyMuPDF 或 pypdf: pip install pymupdf")
+    reader = PdfReader(file_path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages), len(reader.pages)
+
+
+def require_pdf_text_backend():
+    """確認可以擷取 PDF 全文；兩個套件都沒有安裝時丟出 RuntimeError，不必等每個檔案各自失敗。"""
+    for module in ("fitz", "pypdf"):
+        try:
+            __import__(module)
+            return
+        except ImportError:
+            continue
+    raise RuntimeError("擷取全文需要 PyMuPDF 或 pypdf: pip install pymupdf")
+
+
+def _index_pdf_worker(job: Tuple[str, Optional[str]]) -> Tuple[str, str, Optional[str], int, Optional[str]]:
+    """
+    在子行程中計算雜湊並擷取全文，回傳 (路徑, 雜湊, 文字, 頁數, 錯誤)。
+    雜湊與索引中的紀錄相同時 (只有 mtime 變了) 不擷取文字，文字回傳 None。
+    """
+    file_path, known_hash = job
+    try:
+        digest = file_sha256(file_path)
+        if digest == known_hash:
+            return file_path, digest, None, 0, None
+        text, pages = extract_pdf_text(file_path)
+        return file_path, digest, text, pages, None
+    except Exception as e:
+        return file_path, "", None, 0, f"{type(e).__name__}: {e}"
+
+
+class FullTextIndex:
+    """
+    downloaded_theses 的全文索引 (SQLite FTS5，trigram 分詞以支援中文子字串搜尋)。
+    documents 表記錄每個檔案的 mtime、大小與雜湊，更新時只處理新增或變更的檔案。
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            path         TEXT PRIMARY KEY,
+            mtime        REAL NOT NULL,
+            size         INTEGER NOT NULL,
+            content_hash TEXT,
+            pages        INTEGER,
+            error        TEXT,
+            indexed_at   REAL NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS fulltext USING fts5(
+            title, keyword, body, source_url UNINDEXED, path UNINDEXED, tokenize = 'trigram'
+        );
+    """
+    COMMIT_EVERY = 20
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _changed_files(self, pdf_paths: List[str]) -> Tuple[List[Tuple[str, Optional[str]]], int]:
+        """回傳需要處理的 (路徑, 已知雜湊) 與 mtime/大小未變而略過的檔案數。"""
+        known = {row[0]: row[1:] for row in self._conn.execute(
+            "SELECT path, mtime, size, content_hash, error FROM documents")}
+        jobs, unchanged = [], 0
+        for path in pdf_paths:
+            stat = os.stat(path)
+            previous = known.get(path)
+            if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size and not previous[3]:
+                unchanged += 1
+                continue
+            jobs.append((path, previous[2] if previous else None))
+        return jobs, unchanged
+
+    def update(self, pdf_paths: List[str], metadata, workers: int = 4) -> Dict[str, float]:
+        """
+        以 workers 個子行程擷取新增或變更檔案的全文並寫入索引；已不存在的檔案從索引移除。
+        metadata(path) 回傳 (title, source_url, keyword)。回傳處理統計。
+        """
+        started = time.monotonic()
+        jobs, unchanged = self._changed_files(pdf_paths)
+        stats = {"files": len(pdf_paths), "unchanged": unchanged, "indexed": 0, "rehashed": 0, "errors": 0,
+                 "bytes": 0, "seconds": 0.0}
+        existing = set(pdf_paths)
+        removed = [path for (path,) in self._conn.execute("SELECT path FROM documents") if path not in existing]
+        for path in removed:
+            self._conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+            self._conn.execute("DELETE FROM fulltext WHERE path = ?", (path,))
+        stats["removed"] = len(removed)
+        if jobs:
+            require_pdf_text_backend()
+            pending = 0
+            self._conn.execute("BEGIN")
+            with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+                for path, digest, text, pages, error in pool.map(_index_pdf_worker, jobs, chunksize=1):
+                    stat = os.stat(path)
+                    now = time.time()
+                    if error:
+                        stats["errors"] += 1
+                        print(f"    - [索引錯誤] {os.path.basename(path)}: {error}")
+                    elif text is None:
+                        stats["rehashed"] += 1
+                    else:
+                        title, source_url, keyword = metadata(path)
+                        self._conn.execute("DELETE FROM fulltext WHERE path = ?", (path,))
+                        self._conn.execute(
+                            "INSERT INTO fulltext (title, keyword, body, source_url, path) VALUES (?, ?, ?, ?, ?)",
+                            (title, keyword, text, source_url, path))
+                        stats["indexed"] += 1
+                        stats["bytes"] += stat.st_size
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO documents (path, mtime, size, content_hash, pages, error, indexed_at) "
+                        "VALUES (?, ?, ?, ?, COALESCE(?, (SELECT pages FROM documents WHERE path = ?)), ?, ?)",
+                        (path, stat.st_mtime, stat.st_size, digest or None, pages or None, path, error, now))
+                    pending += 1
+                    if pending % self.COMMIT_EVERY == 0:
+                        self._conn.execute("COMMIT")
+                        self._conn.execute("BEGIN")
+            self._conn.execute("COMMIT")
+        stats["seconds"] = time.monotonic() - started
+        return stats
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str, Optional[str], Optional[str], str]]:
+        """
+        回傳 (標題, 摘錄, 關鍵字, 來源網址, 路徑)。trigram 分詞需要至少三個字，
+        較短的查詢 (例如兩個字的中文詞) 改為逐筆比對子字串。
+        """
+        if len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            return self._conn.execute(
+                "SELECT title, snippet(fulltext, 2, '【', '】', '…', 24), keyword, source_url, path "
+                "FROM fulltext WHERE fulltext MATCH ? ORDER BY rank LIMIT ?", (phrase, limit)).fetchall()
+        rows = self._conn.execute(
+            "SELECT title, body, keyword, source_url, path FROM fulltext "
+            "WHERE instr(body, ?) > 0 OR instr(title, ?) > 0 LIMIT ?", (query, query, limit)).fetchall()
+        results = []
+        for title, body, keyword, source_url, path in rows:
+            at = body.find(query)
+            snippet = f"…{body[max(0, at - 24):at]}【{query}】{body[at + len(query):at + len(query) + 24]}…" \
+                if at >= 0 else ""
+            results.append((title, snippet.replace("\n", " "), keyword, source_url, path))
+        return results
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM documents WHERE error IS NULL").fetchone()[0]
+
+
+def list_pdf_files(download_dir: str) -> List[str]:
+    try:
+        return sorted(os.path.join(download_dir, name) for name in os.listdir(download_dir)
+                      if name.lower().endswith('.pdf'))
+    except FileNotFoundError:
+        return []
+
+
+def update_fulltext_index(download_dir: str, index_path: str, ledger: Optional["DownloadLedger"] = None,
+                          workers: int = 4) -> Dict[str, float]:
+    """更新下載資料夾的全文索引，標題、來源網址與關鍵字取自下載帳本 (沒有紀錄時以檔名為標題)。"""
+    def metadata(path: str) -> Tuple[str, Optional[str], Optional[str]]:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        row = ledger.file_metadata(path, thesis_title_key(stem)) if ledger else None
+        if not row:
+            return stem, None, None
+        title, url, keyword, thesis_id = row
+        return title or stem, (permanent_record_url(thesis_id) if thesis_id else None) or url, keyword
+
+    index = FullTextIndex(index_path)
+    try:
+        return index.update(list_pdf_files(download_dir), metadata, workers)
+    finally:
+        index.close()
+
+
+def print_index_stats(stats: Dict[str, float]):
+    print(f"[*] 全文索引: 共 {stats['files']} 個 PDF，新增/更新 {stats['indexed']}、未變更 {stats['unchanged']}、"
+          f"僅 mtime 變更 {stats['rehashed']}、移除 {stats['removed']}、錯誤 {stats['errors']}，"
+          f"耗時 {stats['seconds']:.1f} 秒。")
@@ -0,0 +1,81 @@
+"""
+書目收割模式的串流輸出 (JSON Lines / Parquet)。
+"""
+import os
+import time
+import json
+import threading
+from typing import List
+
+
+class HarvestWriter:
+    """
+    以串流方式寫出書目資料：.jsonl 每筆寫一行並立即 flush；.parquet 每累積 batch_size 筆寫一個 row group
+    (需要 pyarrow)。可由多個執行緒同時呼叫 write()。
+    """
+
+    def __init__(self, output_path: str, batch_size: int = 500):
+        self.output_path = output_path
+        self.batch_size = batch_size
+        self.parquet = output_path.lower().endswith(".parquet")
+        self.count = 0
+        self._lock = threading.Lock()
+        self._batch: List[dict] = []
+        self._writer = None
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        if self.parquet:
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise RuntimeError("輸出 Parquet 需要 pyarrow: pip install pyarrow")
+            self._pa, self._pq = pyarrow, pyarrow.parquet
+            if os.path.exists(output_path):
+                # Parquet 無法附加，沿用舊檔名時改寫到帶時間戳記的新檔
+                base, ext = os.path.splitext(output_path)
+                self.output_path = f"{base}_{time.strftime('%Y%m%d_%H%M%S')}{ext}"
+        else:
+            self._file = open(output_path, 'a', encoding='utf-8')
+
+    PARQUET_FIELDS = ("record_id", "keyword", "url", "thesis_id", "title", "title_en", "author", "author_en",
+                      "advisor", "advisor_en", "school", "department", "degree", "year", "language", "pages",
+                      "keywords", "keywords_en", "abstract", "abstract_en", "harvested_at")
+
+    def write(self, record: dict):
+        with self._lock:
+            self.count += 1
+            if not self.parquet:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()
+                return
+            self._batch.append(record)
+            if len(self._batch) >= self.batch_size:
+                self._flush_parquet()
+
+    def _flush_parquet(self):
+        if not self._batch:
+            return
+        columns = {}
+        for field in self.PARQUET_FIELDS:
+            values = [row.get(field) for row in self._batch]
+            if field in ("keywords", "keywords_en"):
+                columns[field] = self._pa.array(values, type=self._pa.list_(self._pa.string()))
+            elif field == "harvested_at":
+                columns[field] = self._pa.array(values, type=self._pa.float64())
+            else:
+                columns[field] = self._pa.array([None if v is None else str(v) for v in values],
+                                                type=self._pa.string())
+        table = self._pa.table(columns)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.output_path, table.schema)
+        self._writer.write_table(table)
+        self._batch = []
+
+    def close(self):
+        with self._lock:
+            if self.parquet:
+                self._flush_parquet()
+                if self._writer is not None:
+                    self._writer.close()
+            else:
+                self._file.close()
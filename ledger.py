@@ -0,0 +1,771 @@
+"""
+下載帳本：以單一 WAL 模式 SQLite 檔案保存下載狀態、頁數進度、重試佇列與下載目錄索引。
+"""
+import time
+import random
+import sqlite3
+import threading
+from typing import Dict, List, Set, Optional, Tuple
+
+
+class DownloadLedger:
+    """
+    以單一 WAL 模式 SQLite 檔案保存的下載帳本，取代 download_log.txt 與 page_progress.txt。
+    每筆論文以正規化後的 ID 為主鍵，記錄標題、關鍵字、狀態 (pending/downloaded/failed/skipped)
+    與原因、檔案路徑、大小、內容雜湊及時間戳記；所有查詢皆走索引，啟動時不需載入全部歷史。
+    """
+    STATUSES = ("pending", "downloaded", "failed", "skipped")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS records (
+            record_id    TEXT PRIMARY KEY,
+            title        TEXT,
+            keyword      TEXT,
+            url          TEXT,
+            status       TEXT NOT NULL DEFAULT 'pending'
+                         CHECK (status IN ('pending', 'downloaded', 'failed', 'skipped')),
+            reason       TEXT,
+            file_path    TEXT,
+            file_size    INTEGER,
+            content_hash TEXT,
+            created_at   REAL NOT NULL,
+            updated_at   REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_records_status ON records (status);
+        CREATE INDEX IF NOT EXISTS idx_records_keyword ON records (keyword, status);
+        CREATE INDEX IF NOT EXISTS idx_records_hash ON records (content_hash);
+        CREATE INDEX IF NOT EXISTS idx_records_file ON records (file_path);
+        CREATE INDEX IF NOT EXISTS idx_records_unprocessed ON records (record_id)
+            WHERE status = 'downloaded' AND file_path IS NOT NULL AND content_hash IS NULL;
+        CREATE TABLE IF NOT EXISTS page_progress (
+            keyword    TEXT PRIMARY KEY,
+            page       INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key   TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS frontier (
+            record_id   TEXT PRIMARY KEY,
+            keyword     TEXT NOT NULL,
+            page        INTEGER NOT NULL,
+            position    INTEGER NOT NULL,
+            url         TEXT NOT NULL,
+            title       TEXT,
+            claimed_by  TEXT,
+            claimed_at  REAL,
+            enqueued_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_frontier_order ON frontier (keyword, claimed_by, page, position);
+        CREATE TABLE IF NOT EXISTS journal (
+            seq       INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_id TEXT NOT NULL,
+            keyword   TEXT,
+            page      INTEGER,
+            position  INTEGER,
+            state     TEXT NOT NULL,
+            detail    TEXT,
+            at        REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_journal_record ON journal (record_id, seq);
+        CREATE INDEX IF NOT EXISTS idx_journal_listed ON journal (keyword, page, position) WHERE state = 'listed';
+        CREATE TABLE IF NOT EXISTS retry_queue (
+            record_id       TEXT PRIMARY KEY,
+            keyword         TEXT,
+            url             TEXT NOT NULL,
+            title           TEXT,
+            failure_class   TEXT NOT NULL,
+            detail          TEXT,
+            attempts        INTEGER NOT NULL,
+            permanent       INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL,
+            updated_at      REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_retry_due ON retry_queue (keyword, next_attempt_at) WHERE permanent = 0;
+        CREATE TABLE IF NOT EXISTS account_usage (
+            account   TEXT NOT NULL,
+            day       TEXT NOT NULL,
+            downloads INTEGER NOT NULL DEFAULT 0,
+            troubles  INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (account, day)
+        );
+        CREATE TABLE IF NOT EXISTS account_state (
+            account        TEXT PRIMARY KEY,
+            cooldown_until REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS metadata_harvest (
+            record_id    TEXT PRIMARY KEY,
+            keyword      TEXT,
+            thesis_id    TEXT,
+            harvested_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS catalog (
+            record_id    TEXT PRIMARY KEY,
+            keyword      TEXT,
+            title        TEXT,
+            file_name    TEXT NOT NULL,
+            file_path    TEXT NOT NULL,
+            url          TEXT,
+            thesis_id    TEXT,
+            cataloged_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_catalog_keyword ON catalog (keyword, cataloged_at);
+        CREATE TABLE IF NOT EXISTS record_aliases (
+            alias     TEXT NOT NULL,
+            record_id TEXT NOT NULL,
+            PRIMARY KEY (alias, record_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_record_aliases_record ON record_aliases (record_id);
+    """
+
+    # 檢查點日誌中每筆論文的狀態依序為 listed → opened → captcha_solved → downloading → done/failed/skipped
+    JOURNAL_STATES = ("listed", "opened", "captcha_solved", "downloading", "done", "failed", "skipped")
+    JOURNAL_TERMINAL = ("done", "failed", "skipped")
+    # 判定後永遠不必再開啟的不可下載原因
+    UNAVAILABLE_REASONS = ("no_fulltext", "ip_restricted")
+    RECORD_COLUMNS = ("record_id", "title", "keyword", "url", "status", "reason", "file_path", "file_size",
+                      "content_hash", "created_at", "updated_at", "thesis_id", "listing_sig")
+    # 兩筆紀錄合併時保留進度較多的狀態
+    STATUS_RANK = {"pending": 0, "failed": 1, "skipped": 2, "downloaded": 3}
+    # 以 record_id 參照論文、改鍵時要一併改到新鍵的表。frontier 由領取者以領取時的鍵完成，不搬動。
+    KEYED_TABLES = ("retry_queue", "metadata_harvest", "catalog")
+    # 失敗原因對應到延後重試佇列中的失敗類別
+    RETRY_CLASSES = {"captcha": "captcha", "download_timeout": "timeout", "timeout": "timeout",
+                     "alert": "alert", "error": "unknown", "not_found": "not_found"}
+    # 不是下載本身失敗 (例如重新搜尋找不到論文)：照常延後重試，但不計入失敗次數
+    UNCOUNTED_REASONS = ("not_found",)
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(records)")}
+        if "thesis_id" not in columns:
+            self._conn.execute("ALTER TABLE records ADD COLUMN thesis_id TEXT")
+        if "listing_sig" not in columns:
+            self._conn.execute("ALTER TABLE records ADD COLUMN listing_sig TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_records_thesis ON records (thesis_id)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, statements: List[Tuple[str, tuple]]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query_one(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    # 讓帳本可以直接取代原本的 downloaded_urls 集合 (只判斷是否已下載)
+    def __contains__(self, record_id: object) -> bool:
+        return self.is_downloaded(record_id) if isinstance(record_id, str) else False
+
+    def __len__(self) -> int:
+        return self.count("downloaded")
+
+    def is_downloaded(self, record_id: str) -> bool:
+        return self._query_one(
+            "SELECT 1 FROM records WHERE record_id = ? AND status = 'downloaded'", (record_id,)) is not None
+
+    def get_status(self, record_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """回傳 (狀態, 原因)，帳本中沒有此筆則回傳 None。"""
+        return self._query_one("SELECT status, reason FROM records WHERE record_id = ?", (record_id,))
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status:
+            return self._query_one("SELECT COUNT(*) FROM records WHERE status = ?", (status,))[0]
+        return self._query_one("SELECT COUNT(*) FROM records")[0]
+
+    def add_pending(self, records: List[Tuple[str, str, str, str, Optional[str]]]):
+        """
+        批次登錄列表頁上出現的論文 (record_id, title, keyword, url, listing_sig)，已存在者不覆寫，
+        只補上先前沒有記錄的列表簽章 (作者/學校/學年度)。
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO records (record_id, title, keyword, url, listing_sig, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?) ON CONFLICT (record_id) DO UPDATE SET "
+                    "listing_sig = excluded.listing_sig WHERE records.listing_sig IS NULL",
+                    [(rid, title, keyword, url, sig, now, now) for rid, title, keyword, url, sig in records])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _upsert_sql(self, columns: Dict[str, object]) -> Tuple[str, tuple]:
+        now = time.time()
+        columns = dict(columns, updated_at=now)
+        names = list(columns)
+        updates = ", ".join(f"{name} = COALESCE(excluded.{name}, {name})" if name in ("title", "keyword", "url", "listing_sig")
+                            else f"{name} = excluded.{name}" for name in names if name != "record_id")
+        sql = (f"INSERT INTO records ({', '.join(names)}, created_at) VALUES ({', '.join('?' * len(names))}, ?) "
+               f"ON CONFLICT (record_id) DO UPDATE SET {updates}")
+        return sql, tuple(columns.values()) + (now,)
+
+    def mark_status(self, record_id: str, status: str, reason: Optional[str] = None,
+                    title: Optional[str] = None, keyword: Optional[str] = None, url: Optional[str] = None,
+                    listing_sig: Optional[str] = None):
+        if status not in self.STATUSES:
+            raise ValueError(f"未知的狀態: {status}")
+        self._transaction([self._upsert_sql({
+            "record_id": record_id, "title": title, "keyword": keyword, "url": url,
+            "status": status, "reason": reason, "listing_sig": listing_sig})])
+
+    def mark_downloaded(self, record_id: str, title: Optional[str], keyword: Optional[str], url: Optional[str],
+                        file_path: Optional[str], file_size: Optional[int], content_hash: Optional[str]):
+        self._transaction([self._upsert_sql({
+            "record_id": record_id, "title": title, "keyword": keyword, "url": url,
+            "status": "downloaded", "reason": None, "file_path": file_path,
+            "file_size": file_size, "content_hash": content_hash})])
+
+    def append_journal(self, entries: List[Tuple[str, Optional[str], Optional[int], Optional[int], str, Optional[str]]]):
+        """在檢查點日誌末端追加 (record_id, keyword, page, position, state, detail)，既有紀錄永不修改。"""
+        now = time.time()
+        for entry in entries:
+            if entry[4] not in self.JOURNAL_STATES:
+                raise ValueError(f"未知的日誌狀態: {entry[4]}")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO journal (record_id, keyword, page, position, state, detail, at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", [entry + (now,) for entry in entries])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    _UNFINISHED_LISTED_SQL = (
+        "FROM journal j WHERE j.keyword = ? AND j.state = 'listed' "
+        "AND j.seq = (SELECT MAX(seq) FROM journal WHERE record_id = j.record_id AND state = 'listed') "
+        "AND NOT EXISTS (SELECT 1 FROM journal t WHERE t.record_id = j.record_id AND t.seq > j.seq "
+        "AND t.state IN ('done', 'failed', 'skipped'))")
+
+    def journal_resume_point(self, keyword: str, min_page: int = 1) -> Optional[Tuple[int, int]]:
+        """回傳此關鍵字第一筆已列出但尚未走到終點狀態的論文 (頁碼, 頁內序號)。"""
+        return self._query_one(
+            f"SELECT j.page, j.position {self._UNFINISHED_LISTED_SQL} AND j.page >= ? "
+            "ORDER BY j.page, j.position LIMIT 1", (keyword, min_page))
+
+    def journal_finished(self, record_ids: List[str]) -> Set[str]:
+        """在給定的論文中，找出最後一次被列出之後已走到終點狀態 (done/failed/skipped) 的論文。"""
+        finished = set()
+        with self._lock:
+            for record_id in record_ids:
+                row = self._conn.execute(
+                    "SELECT state FROM journal WHERE record_id = ? ORDER BY seq DESC LIMIT 1", (record_id,)).fetchone()
+                if row and row[0] in self.JOURNAL_TERMINAL:
+                    finished.add(record_id)
+        return finished
+
+    def processed(self, record_ids: List[str]) -> Set[str]:
+        """找出已處理過 (已下載、跳過或失敗) 的論文；只登錄過但尚未處理的 pending 不算。"""
+        if not record_ids:
+            return set()
+        placeholders = ", ".join("?" * len(record_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT record_id FROM records WHERE record_id IN ({placeholders}) AND status != 'pending'",
+                tuple(record_ids)).fetchall()
+        return {row[0] for row in rows}
+
+    def unavailable(self, record_ids: List[str]) -> Set[str]:
+        """找出先前已判定為無法下載 (無電子全文或限校內 IP) 的論文。尚未公開的論文到期後即可下載，不列入。"""
+        if not record_ids:
+            return set()
+        placeholders = ", ".join("?" * len(record_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT record_id FROM records WHERE record_id IN ({placeholders}) AND status = 'skipped' "
+                f"AND reason IN ({', '.join('?' * len(self.UNAVAILABLE_REASONS))})",
+                tuple(record_ids) + self.UNAVAILABLE_REASONS).fetchall()
+        return {row[0] for row in rows}
+
+    def listing_signatures(self, record_ids: List[str]) -> Dict[str, Optional[str]]:
+        """回傳帳本中已存在之論文的列表簽章 {record_id: listing_sig}，舊紀錄沒有簽章時為 None。"""
+        if not record_ids:
+            return {}
+        placeholders = ", ".join("?" * len(record_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT record_id, listing_sig FROM records WHERE record_id IN ({placeholders})",
+                tuple(record_ids)).fetchall()
+        return dict(rows)
+
+    def resolve_aliases(self, aliases: List[str]) -> Dict[str, List[Tuple[str, Optional[str]]]]:
+        """標題提示鍵對應到的已確認論文 {別名: [(record_id, listing_sig), ...]}；同一標題可能對應多篇。"""
+        if not aliases:
+            return {}
+        placeholders = ", ".join("?" * len(aliases))
+        resolved: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT a.alias, r.record_id, r.listing_sig FROM record_aliases a "
+                f"JOIN records r ON r.record_id = a.record_id WHERE a.alias IN ({placeholders}) "
+                f"ORDER BY a.alias, r.record_id", tuple(aliases)).fetchall()
+        for alias, record_id, listing_sig in rows:
+            resolved.setdefault(alias, []).append((record_id, listing_sig))
+        return resolved
+
+    def adopt_key(self, old_key: str, thesis_id: str, aliases: List[str] = (),
+                  title: Optional[str] = None, listing_sig: Optional[str] = None):
+        """
+        取得永久識別碼後，把以標題 (或暫時鍵) 登錄的紀錄改以識別碼為鍵；識別碼已有紀錄時兩筆合併，
+        保留進度較多的狀態。重試佇列、書目收割、目錄與日誌中的鍵一併更新，aliases 記為識別碼的別名。
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._adopt_key(old_key, thesis_id, aliases, title, listing_sig, time.time())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _adopt_key(self, old_key: str, thesis_id: str, aliases, title: Optional[str],
+                   listing_sig: Optional[str], now: float):
+        columns = ", ".join(self.RECORD_COLUMNS)
+        rows = {row[0]: dict(zip(self.RECORD_COLUMNS, row)) for row in self._conn.execute(
+            f"SELECT {columns} FROM records WHERE record_id IN (?, ?)", (old_key, thesis_id)).fetchall()}
+        old, new = rows.get(old_key) if old_key != thesis_id else None, rows.get(thesis_id)
+        if new is None:
+            new = old or {"record_id": thesis_id, "status": "pending", "created_at": now}
+        elif old is not None:
+            winner = old if self.STATUS_RANK[old["status"]] > self.STATUS_RANK[new["status"]] else new
+            for field in ("status", "reason", "file_path", "file_size", "content_hash"):
+                new[field] = winner[field]
+            for field in ("title", "keyword", "url", "listing_sig"):
+                new[field] = new[field] or old[field]
+            new["created_at"] = min(new["created_at"], old["created_at"])
+        merged = dict(new, record_id=thesis_id, thesis_id=thesis_id, updated_at=now,
+                      title=new.get("title") or title, listing_sig=new.get("listing_sig") or listing_sig)
+        if old is not None:
+            self._conn.execute("DELETE FROM records WHERE record_id = ?", (old_key,))
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO records ({columns}) VALUES ({', '.join('?' * len(self.RECORD_COLUMNS))})",
+            tuple(merged.get(field) for field in self.RECORD_COLUMNS))
+        if old_key != thesis_id:
+            for table in self.KEYED_TABLES:
+                # 兩個鍵都有資料時保留識別碼那筆
+                self._conn.execute(f"UPDATE OR IGNORE {table} SET record_id = ? WHERE record_id = ?",
+                                   (thesis_id, old_key))
+                self._conn.execute(f"DELETE FROM {table} WHERE record_id = ?", (old_key,))
+            # 日誌內容不修改，只把同一篇論文的鍵統一，續接點與完成判斷才對得上
+            self._conn.execute("UPDATE journal SET record_id = ? WHERE record_id = ?", (thesis_id, old_key))
+            self._conn.execute("UPDATE OR IGNORE record_aliases SET record_id = ? WHERE record_id = ?",
+                               (thesis_id, old_key))
+            self._conn.execute("DELETE FROM record_aliases WHERE record_id = ?", (old_key,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO record_aliases (alias, record_id) VALUES (?, ?)",
+            [(alias, thesis_id) for alias in aliases if alias and alias != thesis_id])
+
+    def migrate_thesis_keys(self, is_provisional) -> Optional[int]:
+        """
+        一次性將已知永久識別碼、但仍以標題鍵登錄的紀錄改以識別碼為鍵，原本的鍵留作別名。
+        已遷移過則回傳 None，否則回傳改鍵的筆數。
+        """
+        if self.get_meta("thesis_keys_migrated"):
+            return None
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT record_id, thesis_id FROM records WHERE thesis_id IS NOT NULL "
+                    "AND record_id != thesis_id ORDER BY created_at").fetchall()
+                for record_id, thesis_id in rows:
+                    aliases = [] if is_provisional(record_id) else [record_id]
+                    self._adopt_key(record_id, thesis_id, aliases, None, None, now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('thesis_keys_migrated', ?)",
+                    (time.strftime('%Y-%m-%d %H:%M:%S'),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def purge_provisional(self, is_provisional) -> int:
+        """刪除上次執行中登錄、但始終沒有打開詳目頁的暫時鍵 (pending)；暫時鍵依列表網址而定，下次不會再用到。"""
+        with self._lock:
+            pending = [row[0] for row in self._conn.execute(
+                "SELECT record_id FROM records WHERE status = 'pending' AND record_id LIKE 'title:%'").fetchall()
+                if is_provisional(row[0])]
+            if pending:
+                self._conn.executemany("DELETE FROM records WHERE record_id = ?", [(key,) for key in pending])
+        return len(pending)
+
+    def get_thesis_id(self, record_id: str) -> Optional[str]:
+        row = self._query_one("SELECT thesis_id FROM records WHERE record_id = ?", (record_id,))
+        return row[0] if row else None
+
+    def schedule_retry(self, record_id: str, keyword: Optional[str], url: str, title: Optional[str],
+                       reason: str, max_attempts: int, base_delay: float,
+                       max_delay: float) -> Tuple[str, int, Optional[float]]:
+        """
+        把失敗的論文放進延後重試佇列，第 n 次失敗後等待 base_delay * 2^(n-1) 秒 (加上隨機抖動，最多 max_delay)。
+        失敗次數達 max_attempts 即標記為永久失敗。回傳 (失敗類別, 累計失敗次數, 下次重試時間或 None)。
+        UNCOUNTED_REASONS 中的原因不增加失敗次數，以目前的退避間隔延後。
+        """
+        failure_class = self.RETRY_CLASSES.get(reason, "unknown")
+        counted = reason not in self.UNCOUNTED_REASONS
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts FROM retry_queue WHERE record_id = ?", (record_id,)).fetchone()
+                attempts = (row[0] if row else 0) + int(counted)
+                permanent = counted and attempts >= max_attempts
+                next_attempt_at = None if permanent else \
+                    now + min(max_delay, base_delay * 2 ** max(attempts - 1, 0)) * random.uniform(1.0, 1.25)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO retry_queue (record_id, keyword, url, title, failure_class, detail, "
+                    "attempts, permanent, next_attempt_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record_id, keyword, url, title, failure_class, reason, attempts,
+                     int(permanent), next_attempt_at, now))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return failure_class, attempts, next_attempt_at
+
+    def claim_due_retry(self, keyword: Optional[str] = None, lease_seconds: float = 3600,
+                        identified_only: bool = False) -> Optional[Tuple[str, str, str, Optional[str], int]]:
+        """
+        取出一筆已到重試時間的論文 (可限定關鍵字)，回傳 (record_id, keyword, url, title, 先前失敗次數)。
+        取出時把下次重試時間往後延，避免其他執行緒重複取出；處理結果再以 schedule_retry/clear_retry 更新。
+        identified_only 為 True 時只取已知永久識別碼 (可以直接以永久網址重試) 的論文。
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT record_id, keyword, url, title, attempts FROM retry_queue "
+                    "WHERE permanent = 0 AND next_attempt_at <= ? AND (? IS NULL OR keyword = ?) "
+                    "AND (? = 0 OR EXISTS (SELECT 1 FROM records r WHERE r.record_id = retry_queue.record_id "
+                    "AND r.thesis_id IS NOT NULL)) "
+                    "ORDER BY next_attempt_at LIMIT 1", (now, keyword, keyword, int(identified_only))).fetchone()
+                if row:
+                    self._conn.execute("UPDATE retry_queue SET next_attempt_at = ? WHERE record_id = ?",
+                                       (now + lease_seconds, row[0]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def release_retry(self, record_id: str):
+        """把取出但未處理的重試交回佇列，不計入失敗次數。"""
+        with self._lock:
+            self._conn.execute("UPDATE retry_queue SET next_attempt_at = ? WHERE record_id = ? AND permanent = 0",
+                               (time.time(), record_id))
+
+    def clear_retry(self, record_id: str):
+        """論文已下載或判定不需下載時，從重試佇列移除。"""
+        with self._lock:
+            self._conn.execute("DELETE FROM retry_queue WHERE record_id = ?", (record_id,))
+
+    def retry_summary(self) -> List[Tuple[str, int, int, int, Optional[float]]]:
+        """依失敗類別統計 (類別, 可重試數, 永久失敗數, 已到重試時間數, 最早的下次重試時間)。"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT failure_class, SUM(permanent = 0), SUM(permanent = 1), "
+                "SUM(permanent = 0 AND next_attempt_at <= ?), MIN(next_attempt_at) "
+                "FROM retry_queue GROUP BY failure_class ORDER BY failure_class", (time.time(),)).fetchall()
+
+    def permanent_failures(self, limit: int = 20) -> List[Tuple[str, str, int, Optional[str]]]:
+        """最近的永久失敗 (title, 失敗類別, 失敗次數, keyword)。"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(title, record_id), failure_class, attempts, keyword FROM retry_queue "
+                "WHERE permanent = 1 ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+
+    def account_downloads(self, account: str, day: str) -> int:
+        row = self._query_one("SELECT downloads FROM account_usage WHERE account = ? AND day = ?", (account, day))
+        return row[0] if row else 0
+
+    def add_account_usage(self, account: str, day: str, downloads: int = 0, troubles: int = 0):
+        self._transaction([(
+            "INSERT INTO account_usage (account, day, downloads, troubles) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (account, day) DO UPDATE SET downloads = downloads + excluded.downloads, "
+            "troubles = troubles + excluded.troubles", (account, day, downloads, troubles))])
+
+    def get_account_cooldown(self, account: str) -> float:
+        row = self._query_one("SELECT cooldown_until FROM account_state WHERE account = ?", (account,))
+        return row[0] if row else 0.0
+
+    def set_account_cooldown(self, account: str, until: float):
+        self._transaction([(
+            "INSERT OR REPLACE INTO account_state (account, cooldown_until) VALUES (?, ?)", (account, until))])
+
+    def harvested(self, record_ids: List[str]) -> Set[str]:
+        """找出書目已收割過的論文 (書目收割模式不重複抓取)。"""
+        if not record_ids:
+            return set()
+        placeholders = ", ".join("?" * len(record_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT record_id FROM metadata_harvest WHERE record_id IN ({placeholders})",
+                tuple(record_ids)).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_harvested(self, record_id: str, keyword: str, thesis_id: Optional[str]):
+        self._transaction([(
+            "INSERT OR REPLACE INTO metadata_harvest (record_id, keyword, thesis_id, harvested_at) VALUES (?, ?, ?, ?)",
+            (record_id, keyword, thesis_id, time.time()))])
+
+    CATALOG_FIELDS = ("record_id", "keyword", "title", "file_name", "file_path", "url", "thesis_id", "cataloged_at")
+
+    def add_catalog_entry(self, entry: dict) -> bool:
+        """收錄一筆已下載的檔案到目錄索引，已收錄過的論文不重複加入；回傳是否為新收錄。"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"INSERT OR IGNORE INTO catalog ({', '.join(self.CATALOG_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(self.CATALOG_FIELDS))})",
+                tuple(entry.get(field) for field in self.CATALOG_FIELDS))
+            return cursor.rowcount == 1
+
+    def catalog_keywords(self) -> List[Optional[str]]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT keyword FROM catalog ORDER BY keyword").fetchall()]
+
+    def catalog_entries(self):
+        """依關鍵字與收錄時間逐筆讀出目錄索引 (重建檢視時使用)。"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self.CATALOG_FIELDS)} FROM catalog ORDER BY keyword, cataloged_at").fetchall()
+        for row in rows:
+            yield dict(zip(self.CATALOG_FIELDS, row))
+
+    def file_metadata(self, file_path: str, record_id: Optional[str]) -> Optional[Tuple[str, Optional[str], Optional[str], Optional[str]]]:
+        """依檔案路徑 (或由檔名推得的鍵) 找出論文的 (title, url, keyword, thesis_id)。"""
+        return self._query_one(
+            "SELECT title, url, keyword, thesis_id FROM records WHERE file_path = ? OR record_id = ? "
+            "ORDER BY file_path = ? DESC LIMIT 1", (file_path, record_id, file_path))
+
+    def set_thesis_id(self, record_id: str, thesis_id: str):
+        self._transaction([self._upsert_sql({"record_id": record_id, "thesis_id": thesis_id})])
+
+    def find_downloaded_thesis(self, thesis_id: str, exclude_record_id: Optional[str] = None) -> Optional[Tuple[str, Optional[str]]]:
+        """依永久識別碼找出已下載的同一篇論文，回傳 (record_id, title)。"""
+        row = self._query_one(
+            "SELECT record_id, title FROM records WHERE thesis_id = ? AND status = 'downloaded' "
+            "AND record_id IS NOT ? LIMIT 1", (thesis_id, exclude_record_id))
+        return (row[0], row[1]) if row else None
+
+    def update_file(self, record_id: str, file_path: str, file_size: Optional[int], content_hash: Optional[str]):
+        """背景後處理完成後，更新紀錄對應的最終檔案路徑與內容雜湊。"""
+        self._transaction([self._upsert_sql({
+            "record_id": record_id, "file_path": file_path,
+            "file_size": file_size, "content_hash": content_hash})])
+
+    def find_by_hash(self, content_hash: str, exclude_record_id: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """依內容雜湊找出已存在的同內容檔案，回傳 (record_id, file_path)。"""
+        row = self._query_one(
+            "SELECT record_id, file_path FROM records WHERE content_hash = ? AND record_id IS NOT ? "
+            "AND file_path IS NOT NULL LIMIT 1", (content_hash, exclude_record_id))
+        return (row[0], row[1]) if row else None
+
+    def unprocessed_downloads(self) -> List[Tuple[str, str, Optional[str]]]:
+        """列出已下載但尚未完成後處理 (沒有內容雜湊) 的紀錄，透過部分索引查詢。"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT record_id, file_path, title FROM records "
+                "WHERE status = 'downloaded' AND file_path IS NOT NULL AND content_hash IS NULL").fetchall()
+
+    def get_page_progress(self, keyword: str) -> Optional[int]:
+        row = self._query_one(
+            "SELECT page FROM page_progress WHERE keyword = ?", (keyword,))
+        return row[0] if row else None
+
+    def set_page_progress(self, keyword: str, page: int):
+        self._transaction([(
+            "INSERT INTO page_progress (keyword, page, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (keyword) DO UPDATE SET page = excluded.page, updated_at = excluded.updated_at",
+            (keyword, page, time.time()))])
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._query_one("SELECT value FROM meta WHERE key = ?", (key,))
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self._transaction(
+            [("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))])
+
+    # ------------------------------------------------------------------
+    # Crawl frontier：列舉階段寫入、下載階段取出的持久化待下載佇列
+    # ------------------------------------------------------------------
+    def enqueue_frontier(self, keyword: str, page: int, records: List[Tuple[str, str, str]]) -> int:
+        """將一頁的 (record_id, url, title) 依列表順序加入佇列，回傳新加入的筆數。"""
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO frontier (record_id, keyword, page, position, url, title, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(record_id, keyword, page, position, url, title, now)
+                     for position, (record_id, url, title) in enumerate(records)])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def claim_frontier(self, keyword: str, worker: str) -> Optional[Tuple[str, str, str, int]]:
+        """原子性地取出佇列中最前面、尚未被領取的一筆，回傳 (record_id, url, title, page)。"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT record_id, url, title, page FROM frontier "
+                    "WHERE keyword = ? AND claimed_by IS NULL ORDER BY page, position LIMIT 1",
+                    (keyword,)).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE frontier SET claimed_by = ?, claimed_at = ? WHERE record_id = ?",
+                        (worker, time.time(), row[0]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def complete_frontier(self, record_id: str):
+        self._transaction(
+            [("DELETE FROM frontier WHERE record_id = ?", (record_id,))])
+
+    def release_frontier(self, record_id: str):
+        """放回佇列 (例如達到下載上限而未處理)，下次執行會再被領取。"""
+        self._transaction([("UPDATE frontier SET claimed_by = NULL, claimed_at = NULL WHERE record_id = ?",
+                            (record_id,))])
+
+    def reset_frontier_claims(self, keyword: str) -> int:
+        """程式啟動時，將上次中斷而未完成的領取全部放回佇列。"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE frontier SET claimed_by = NULL, claimed_at = NULL "
+                "WHERE keyword = ? AND claimed_by IS NOT NULL", (keyword,))
+            return cursor.rowcount
+
+    def frontier_size(self, keyword: str) -> int:
+        return self._query_one("SELECT COUNT(*) FROM frontier WHERE keyword = ?", (keyword,))[0]
+
+    def import_text_log(self, log_file: str, page_progress_file: str, keyword: str,
+                        normalize) -> Optional[int]:
+        """
+        一次性匯入舊的 download_log.txt 與 page_progress.txt。已匯入過則回傳 None。
+        舊進度檔沒有記錄關鍵字，因此歸到目前的關鍵字底下。
+        """
+        if self.get_meta("imported_text_log"):
+            return None
+        now = time.time()
+        rows = {}
+        try:
+            with open(log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    record_id = normalize(line.strip())
+                    if record_id:
+                        rows[record_id] = (record_id, keyword, "imported from download_log.txt", now, now)
+        except FileNotFoundError:
+            pass
+        page = None
+        try:
+            with open(page_progress_file, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+                page = int(content) if content.isdigit() else None
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO records (record_id, keyword, status, reason, created_at, updated_at) "
+                    "VALUES (?, ?, 'downloaded', ?, ?, ?)", list(rows.values()))
+                if page is not None:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO page_progress (keyword, page, updated_at) VALUES (?, ?, ?)",
+                        (keyword, page, now))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('imported_text_log', ?)",
+                    (time.strftime('%Y-%m-%d %H:%M:%S'),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def migrate_identity(self, key_for_title, pdf_files: List[Tuple[str, str, int]]) -> Optional[Tuple[int, int, int]]:
+        """
+        一次性將舊的 `/record?r1=..` 鍵 (搜尋結果中的名次) 換成由標題推得的鍵，並依下載資料夾中
+        現有的 PDF (標題, 路徑, 大小) 重建已下載紀錄。已遷移過則回傳 None，否則回傳 (改鍵, 作廢, PDF) 筆數。
+        """
+        if self.get_meta("identity_migrated"):
+            return None
+        now = time.time()
+        rekeyed = retired = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                legacy = self._conn.execute(
+                    "SELECT record_id, title, keyword, url, status, reason, file_path, file_size, content_hash, "
+                    "created_at FROM records WHERE record_id LIKE '/record?%'").fetchall()
+                for row in legacy:
+                    new_key = key_for_title(row[1]) if row[1] else None
+                    if not new_key:
+                        # 沒有標題就無從得知是哪一篇論文，名次鍵不再拿來判斷是否已下載
+                        self._conn.execute(
+                            "UPDATE records SET status = 'skipped', reason = 'legacy_rank_key', updated_at = ? "
+                            "WHERE record_id = ?", (now, row[0]))
+                        retired += 1
+                        continue
+                    self._conn.execute(
+                        "INSERT INTO records (record_id, title, keyword, url, status, reason, file_path, file_size, "
+                        "content_hash, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (record_id) DO UPDATE SET status = excluded.status, reason = excluded.reason, "
+                        "file_path = excluded.file_path, file_size = excluded.file_size, "
+                        "content_hash = excluded.content_hash, updated_at = excluded.updated_at "
+                        "WHERE records.status != 'downloaded'", (new_key,) + tuple(row[1:]) + (now,))
+                    self._conn.execute("DELETE FROM records WHERE record_id = ?", (row[0],))
+                    rekeyed += 1
+                self._conn.execute("DELETE FROM frontier WHERE record_id LIKE '/record?%'")
+                for title, file_path, file_size in pdf_files:
+                    key = key_for_title(title)
+                    if not key:
+                        continue
+                    self._conn.execute(
+                        "INSERT INTO records (record_id, title, status, reason, file_path, file_size, created_at, "
+                        "updated_at) VALUES (?, ?, 'downloaded', 'rebuilt from existing PDF', ?, ?, ?, ?) "
+                        "ON CONFLICT (record_id) DO UPDATE SET status = 'downloaded', "
+                        "file_path = COALESCE(records.file_path, excluded.file_path), "
+                        "file_size = COALESCE(records.file_size, excluded.file_size), updated_at = excluded.updated_at",
+                        (key, title, file_path, file_size, now, now))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('identity_migrated', ?)",
+                    (time.strftime('%Y-%m-%d %H:%M:%S'),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rekeyed, retired, len(pdf_files)
@@ -0,0 +1,204 @@
+"""
+各階段耗時與計數的統計、JSON Lines 事件紀錄與報表。
+"""
+import os
+import time
+import json
+import functools
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class StageMetrics:
+    """
+    各階段 (搜尋、解析列表、開啟論文、驗證碼、下載、解壓縮、刻意的休息) 的耗時與計數。
+    每個 span 結束時寫一行 JSONL 事件，並累積成 Prometheus 格式的 counter 與 histogram，
+    可寫成 node_exporter textfile，也可透過 HTTP 端點提供給 Prometheus 抓取。
+    """
+    BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+    PREFIX = "thesis_downloader"
+
+    def __init__(self, events_file: Optional[str] = None, textfile: Optional[str] = None,
+                 textfile_interval: float = 15.0):
+        self.events_file = events_file
+        self.textfile = textfile
+        self.textfile_interval = textfile_interval
+        self._lock = threading.Lock()
+        self._events = None
+        if events_file:
+            os.makedirs(os.path.dirname(events_file) or ".", exist_ok=True)
+            self._events = open(events_file, 'a', encoding='utf-8', buffering=1)
+        self._durations: Dict[str, List[float]] = {}
+        self._bucket_counts: Dict[str, List[int]] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._last_textfile = 0.0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @contextmanager
+    def span(self, stage: str, **fields):
+        """量測一個階段；例外照常往外拋出，事件中以 ok=false 記錄。"""
+        started = time.monotonic()
+        ok = True
+        try:
+            yield fields
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.observe(stage, time.monotonic() - started, ok=ok, **fields)
+
+    def observe(self, stage: str, seconds: float, **fields):
+        with self._lock:
+            self._durations.setdefault(stage, []).append(seconds)
+            counts = self._bucket_counts.setdefault(stage, [0] * len(self.BUCKETS))
+            for index, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    counts[index] += 1
+            if self._events:
+                event = {"ts": round(time.time(), 3), "stage": stage, "seconds": round(seconds, 4),
+                         "thread": threading.current_thread().name}
+                event.update(fields)
+                self._events.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        self._maybe_write_textfile()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if self._events:
+                self._events.write(json.dumps({"ts": round(time.time(), 3), "counter": name, "amount": amount,
+                                               **labels}, ensure_ascii=False) + "\n")
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """記錄目前值 (例如瀏覽器記憶體)，只保留最新一筆。"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+            if self._events:
+                self._events.write(json.dumps({"ts": round(time.time(), 3), "gauge": name, "value": value,
+                                               **labels}, ensure_ascii=False) + "\n")
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            declared = set()
+            for (name, labels), value in sorted(self._gauges.items()):
+                metric = f"{self.PREFIX}_{name}"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} gauge")
+                    declared.add(metric)
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value:g}" if labels else f"{metric} {value:g}")
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{self.PREFIX}_{name}_total"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} counter")
+                    declared.add(metric)
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value:g}" if labels else f"{metric} {value:g}")
+            metric = f"{self.PREFIX}_stage_duration_seconds"
+            if self._durations:
+                lines.append(f"# TYPE {metric} histogram")
+            for stage, durations in sorted(self._durations.items()):
+                for bound, count in zip(self.BUCKETS, self._bucket_counts[stage]):
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound:g}"}} {count}')
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {len(durations)}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {sum(durations):.4f}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {len(durations)}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self):
+        if not self.textfile:
+            return
+        os.makedirs(os.path.dirname(self.textfile) or ".", exist_ok=True)
+        temp_path = f"{self.textfile}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, self.textfile)
+        self._last_textfile = time.monotonic()
+
+    def _maybe_write_textfile(self):
+        if self.textfile and time.monotonic() - self._last_textfile >= self.textfile_interval:
+            self.write_textfile()
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """在背景執行緒提供 /metrics 端點。"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200 if self.path.startswith("/metrics") else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def summary_rows(self) -> List[Tuple[str, int, float, float, float, float]]:
+        """每個階段的 (名稱, 次數, 總秒數, 平均, p50, p95)，依總秒數由大到小排序。"""
+        with self._lock:
+            rows = [(stage, len(values), sum(values), sum(values) / len(values),
+                     percentile(values, 50), percentile(values, 95))
+                    for stage, values in self._durations.items() if values]
+        return sorted(rows, key=lambda row: -row[2])
+
+    def print_summary(self):
+        rows = self.summary_rows()
+        if not rows:
+            return
+        print("\n[*] 各階段耗時統計:")
+        # 中文字佔兩格寬，標題欄位寬度依此調整以便與數字欄對齊
+        print(f"    {'階段':<18}{'次數':>4}{'總秒數':>7}{'平均':>7}{'p50':>9}{'p95':>9}")
+        for stage, count, total, mean, p50, p95 in rows:
+            print(f"    {stage:<20}{count:>6}{total:>10.1f}{mean:>9.2f}{p50:>9.2f}{p95:>9.2f}")
+        with self._lock:
+            counters = sorted(self._counters.items())
+        if counters:
+            print("[*] 計數:")
+            for (name, labels), value in counters:
+                label_text = ", ".join(f"{k}={v}" for k, v in labels)
+                print(f"    {name}{f' ({label_text})' if label_text else ''}: {value:g}")
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+        if gauges:
+            print("[*] 量測值:")
+            for (name, labels), value in gauges:
+                label_text = ", ".join(f"{k}={v}" for k, v in labels)
+                print(f"    {name}{f' ({label_text})' if label_text else ''}: {value:g}")
+
+    def close(self):
+        self.write_textfile()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        with self._lock:
+            if self._events:
+                self._events.close()
+                self._events = None
+
+
+def timed_stage(stage: str):
+    """以 self.metrics 量測整個方法的執行時間。"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.span(stage):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,298 @@
+"""
+離線評測用的臺灣博碩士論文網模擬伺服器。
+"""
+import time
+import random
+import zipfile
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlparse
+
+from PIL import Image, ImageDraw, ImageFont
+from io import BytesIO
+
+
+class MockNdltdServer:
+    """
+    離線的臺灣博碩士論文網替身，重現爬蟲依賴的流程：登入標記、ysearchinput0 搜尋、
+    tablefmt1 結果頁 (gonext / jmpage)、尚未公開與限校內 IP 標記、「電子全文」連結、
+    random_validation 驗證碼與錯誤時的 alert，以及 PDF / ZIP 下載。
+    延遲、錯誤率 (HTML 頁面回傳 503) 與檔案大小皆可設定，供端對端效能評測使用。
+    """
+    ITEMS_PER_PAGE = 10
+    CGI = "/cgi-bin/gs32/gsweb.cgi"
+
+    def __init__(self, records: int = 100, latency: Tuple[float, float] = (0.05, 0.2), error_rate: float = 0.0,
+                 file_kb: int = 256, zip_ratio: float = 0.2, embargo_ratio: float = 0.1,
+                 ip_restricted_ratio: float = 0.05, no_fulltext_ratio: float = 0.1,
+                 captcha_reject_rate: float = 0.1, strict_captcha: bool = False,
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        self.records = records
+        self.latency = latency
+        self.error_rate = error_rate
+        self.file_kb = file_kb
+        self.zip_ratio = zip_ratio
+        self.embargo_ratio = embargo_ratio
+        self.ip_restricted_ratio = ip_restricted_ratio
+        self.no_fulltext_ratio = no_fulltext_ratio
+        self.captcha_reject_rate = captcha_reject_rate
+        # 非嚴格模式下任何非空答案都會被接受 (依 captcha_reject_rate 隨機拒絕)，不受 OCR 對合成字型的辨識率影響
+        self.strict_captcha = strict_captcha
+        self.host = host
+        self.port = port
+        self.seed = seed
+        self.requests: Dict[str, int] = {}
+        self._captchas: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def record(self, index: int) -> dict:
+        """第 index 篇模擬論文的屬性，由 seed 決定，每次啟動都相同。"""
+        rng = random.Random(f"{self.seed}:{index}")
+        roll = rng.random()
+        return {
+            "index": index,
+            "author": f"作者{index:04d}",
+            "school": rng.choice(["國立臺灣大學", "國立政治大學", "國立清華大學", "國立成功大學"]),
+            "year": str(rng.randint(95, 113)),
+            "embargoed": roll < self.embargo_ratio,
+            "ip_restricted": self.embargo_ratio <= roll < self.embargo_ratio + self.ip_restricted_ratio,
+            "fulltext": rng.random() >= self.no_fulltext_ratio,
+            "zip": rng.random() < self.zip_ratio,
+        }
+
+    def title(self, keyword: str, index: int) -> str:
+        return f"{keyword}之實證研究 第{index:04d}篇"
+
+    def start(self) -> "MockNdltdServer":
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                mock._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="mock-ndltd", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # ------------------------------------------------------------------
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        parsed = urlparse(handler.path)
+        query = dict(parse_qsl(parsed.query))
+        route = parsed.path.rsplit("/", 1)[-1]
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            delay = self._random.uniform(*self.latency)
+            failing = self._random.random() < self.error_rate
+        time.sleep(delay)
+        pages = {"login": self._home_page, "search": self._search_page, "result": self._result_page,
+                 "record": self._record_page, "declare": self._declare_page, "agree": self._agree_page}
+        if route in pages:
+            if failing:
+                self._send(handler, 503, "text/html; charset=utf-8", "<html><body>系統忙碌中</body></html>".encode())
+                return
+            self._send(handler, 200, "text/html; charset=utf-8", pages[route](query).encode("utf-8"))
+        elif route == "random_validation":
+            self._send(handler, 200, "image/png", self._captcha_image(query.get("t", "")))
+        elif route == "download":
+            self._send_file(handler, int(query.get("id", 0)), query.get("q", ""))
+        elif route.endswith((".gif", ".png", ".css")):
+            # 一般頁面資源，精簡瀏覽器模式會擋下這些請求
+            self._send(handler, 200, "text/css" if route.endswith(".css") else "image/gif", b"")
+        else:
+            self._send(handler, 404, "text/html; charset=utf-8", b"<html><body>Not Found</body></html>")
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, content_type: str, body: bytes,
+              headers: Optional[Dict[str, str]] = None):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _layout(self, body: str, title: str = "臺灣博碩士論文知識加值系統") -> str:
+        return (f"<html><head><meta charset='utf-8'><title>{title}</title>"
+                f"<link rel='stylesheet' href='{self.CGI}/style.css'></head><body>"
+                f"<div class='user_area'><a href='#'>登出</a></div>{body}</body></html>")
+
+    def _home_page(self, query: dict) -> str:
+        return self._layout(f"<a href='{self.CGI}/ccd=mock/search?mode=basic'>簡易查詢</a>")
+
+    def _search_page(self, query: dict) -> str:
+        return self._layout(
+            f"<form action='{self.CGI}/ccd=mock/result' method='get'>"
+            "<input type='text' id='ysearchinput0' name='q'>"
+            "<input type='hidden' name='page' value='1'>"
+            "<input type='submit' id='gs32search' value='查詢'></form>")
+
+    def _result_page(self, query: dict) -> str:
+        keyword = query.get("q", "")
+        sort = query.get("sortby", "")
+        order = self._order(sort)
+        total_pages = max(1, math.ceil(self.records / self.ITEMS_PER_PAGE))
+        try:
+            page = int(query.get("jmpage") or query.get("page") or 1)
+        except ValueError:
+            page = 1
+        page = min(max(page, 1), total_pages)
+        rows = []
+        for index in order[(page - 1) * self.ITEMS_PER_PAGE:page * self.ITEMS_PER_PAGE]:
+            record = self.record(index)
+            markers = []
+            if record["embargoed"]:
+                markers.append("網際網路公開日期：2099/12/31")
+            elif record["ip_restricted"]:
+                markers.append("校內系統及IP範圍內開放")
+            elif record["fulltext"]:
+                markers.append("<img src='/img/ft.gif' alt=''>電子全文")
+            rows.append(
+                f"<tr><td class='tdfmt1-content'><a class='slink' href='{self.CGI}/ccd=mock/record?id={index}"
+                f"&q={quote(keyword)}'><span class='etd_d'>{self.title(keyword, index)}</span></a><br>"
+                f"{record['author']} / {record['school']} / {record['year']} 學年度 / 碩士<br>"
+                f"{' '.join(markers)}</td></tr>")
+        hidden = (f"<input type='hidden' name='q' value='{keyword}'>"
+                  f"<input type='hidden' name='sortby' value='{sort}'>")
+        sort_options = "".join(f"<option value='{value}'{' selected' if value == sort else ''}>{label}</option>"
+                               for value, label in (("", "相關度"), ("yr_desc", "學年度 (新→舊)"),
+                                                    ("yr_asc", "學年度 (舊→新)")))
+        navigation = (
+            f"<form action='{self.CGI}/ccd=mock/result' method='get'><input type='hidden' name='q' value='{keyword}'>"
+            f"<select name='sortby' onchange='this.form.submit()'>{sort_options}</select></form>"
+            f"<form action='{self.CGI}/ccd=mock/result' method='get'>{hidden}"
+            f"<input type='hidden' name='page' value='{page + 1}'>"
+            + (f"<input type='image' name='gonext' src='/img/next.gif'>" if page < total_pages
+               else "<input type='image' name='gonext' src='/img/next_d.gif'>")
+            + "</form>"
+            f"<form action='{self.CGI}/ccd=mock/result' method='get'>{hidden}"
+            "<input type='text' id='jmpage' name='jmpage' value=''>"
+            "<input type='submit' name='jumpfmt1page' value='跳頁'></form>")
+        return self._layout(
+            f"<table><tr><td headers='start'>檢索結果共 {self.records} 筆資料，第 {page}/{total_pages} 頁</td></tr></table>"
+            f"<table id='tablefmt1'>{''.join(rows)}</table>{navigation}")
+
+    def _order(self, sort: str) -> List[int]:
+        """結果頁的論文順序：預設依編號，可依學年度排序 (同學年度時編號大的排前面)。"""
+        indexes = list(range(self.records))
+        if sort in ("yr_desc", "yr_asc"):
+            indexes.sort(key=lambda index: (int(self.record(index)["year"]), index), reverse=sort == "yr_desc")
+        return indexes
+
+    def _record_page(self, query: dict) -> str:
+        index = int(query.get("id", 0))
+        keyword = query.get("q", "")
+        record = self.record(index)
+        fields = [("研究生", record["author"]), ("論文名稱", self.title(keyword, index)),
+                  ("論文名稱(外文)", f"An Empirical Study of {index:04d}"), ("指導教授", "指導教授甲"),
+                  ("校院名稱", record["school"]), ("學年度", record["year"]), ("學位類別", "碩士"),
+                  ("中文關鍵詞", f"{keyword}、實證研究"), ("系統識別號", f"MOCK{index:06d}")]
+        rows = "".join(f"<tr><th class='std1'>{label}:</th><td class='std2'>{value}</td></tr>" for label, value in fields)
+        fulltext = ""
+        if record["fulltext"] and not record["embargoed"] and not record["ip_restricted"]:
+            fulltext = (
+                "<a href='javascript:void(0)' onclick=\"document.getElementById('ft').style.display='block'\">"
+                "<em>電子全文</em></a>"
+                "<div id='ft' style='display:none'><img alt='電子全文' src='/img/ft.gif'>"
+                f"<a title='電子全文' target='_blank' href='{self.CGI}/ccd=mock/declare?id={index}&q={quote(keyword)}'>"
+                "電子全文</a></div>")
+        return self._layout(f"<table>{rows}</table>{fulltext}<div>摘要 本論文為離線評測用的模擬資料。</div>")
+
+    def _new_captcha(self) -> str:
+        token = "%016x" % self._random.getrandbits(64)
+        with self._lock:
+            self._captchas[token] = "".join(self._random.choice("0123456789") for _ in range(4))
+        return token
+
+    def _declare_page(self, query: dict) -> str:
+        token = self._new_captcha()
+        return self._layout(
+            f"<p>下載宣言：本論文僅供學術研究使用。</p>"
+            f"<form action='{self.CGI}/ccd=mock/agree' method='get'>"
+            f"<input type='hidden' name='id' value='{query.get('id', 0)}'>"
+            f"<input type='hidden' name='q' value='{query.get('q', '')}'>"
+            f"<input type='hidden' name='t' value='{token}'>"
+            f"<img src='{self.CGI}/random_validation?t={token}'>"
+            "<input type='text' id='validinput' name='code'>"
+            "<input type='submit' value='我同意'></form>")
+
+    def _agree_page(self, query: dict) -> str:
+        with self._lock:
+            answer = self._captchas.pop(query.get("t", ""), None)
+            rejected = self._random.random() < self.captcha_reject_rate
+        code = query.get("code", "").strip()
+        accepted = bool(code) and answer is not None and not rejected and (
+            code == answer or not self.strict_captcha)
+        if not accepted:
+            # 與正式網站相同：跳出 alert，關閉後回到下載宣言頁並換一張驗證碼
+            declare_url = f"{self.CGI}/ccd=mock/declare?id={query.get('id', 0)}&q={quote(query.get('q', ''))}"
+            return self._layout(f"<script>alert('驗證碼錯誤，請重新輸入'); location.replace('{declare_url}');</script>")
+        return self._layout(
+            f"<a href='{self.CGI}/ccd=mock/download?id={query.get('id', 0)}&q={quote(query.get('q', ''))}'>下載</a>")
+
+    def _captcha_image(self, token: str) -> bytes:
+        with self._lock:
+            answer = self._captchas.get(token, "0000")
+        image = Image.new("RGB", (120, 40), "white")
+        try:
+            font = ImageFont.load_default(size=28)
+        except TypeError:
+            font = ImageFont.load_default()
+        ImageDraw.Draw(image).text((12, 4), answer, fill="black", font=font)
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def _pdf_bytes(self, index: int) -> bytes:
+        """最小的合法 PDF，以註解補足到設定的檔案大小。"""
+        content = f"BT /F1 12 Tf 72 720 Td (Mock thesis {index}) Tj ET".encode()
+        objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+                   b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+                   b"/Resources << /Font << /F1 5 0 R >> >> >>",
+                   b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+                   b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+        body, offsets = b"%PDF-1.4\n", []
+        for number, obj in enumerate(objects, 1):
+            offsets.append(len(body))
+            body += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+        padding = max(0, self.file_kb * 1024 - len(body) - 200)
+        body += b"%" + b"0" * padding + b"\n"
+        xref = len(body)
+        body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+        body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+        return body
+
+    def _send_file(self, handler: BaseHTTPRequestHandler, index: int, keyword: str):
+        pdf = self._pdf_bytes(index)
+        name = f"mock_{index:04d}"
+        if self.record(index)["zip"]:
+            buffer = BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+                archive.writestr(f"{name}.pdf", pdf)
+            body, content_type, filename = buffer.getvalue(), "application/zip", f"{name}.zip"
+        else:
+            body, content_type, filename = pdf, "application/pdf", f"{name}.pdf"
+        self._send(handler, 200, content_type, body,
+                   {"Content-Disposition": f'attachment; filename="{filename}"'})
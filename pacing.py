@@ -0,0 +1,94 @@
+"""
+全體 worker 共用的請求限速器與依回應狀況調整間隔的節奏控制器。
+"""
+import time
+import random
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucketRateLimiter:
+    """
+    執行緒安全的令牌桶限速器。
+    所有 worker 共用同一個實例，確保對 NDLTD 的整體請求速率維持在設定的預算內。
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0  # 每秒補充的令牌數
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """取得令牌，不足時阻塞等待。回傳實際等待的秒數。"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                deficit = (tokens - self._tokens) / self.rate
+            time.sleep(deficit)
+            waited += deficit
+
+
+class AdaptivePacer:
+    """
+    AIMD (加法遞減、乘法遞增) 節奏控制器，取代固定範圍的隨機休息。
+    伺服器回應正常時，每次成功都把各項延遲減少一小段；出現驗證碼被拒、警告視窗、
+    逾時或回應過慢時，則把延遲乘上倍數退避。延遲永遠限制在設定的下限與上限之間，
+    每一次調整都會印出來。所有 worker 共用同一個實例。
+    """
+    # 各種異常訊號的退避倍數：驗證碼被拒多半是辨識問題，只輕微退避
+    BACKOFF_FACTORS = {"captcha_rejected": 1.25,
+                       "slow": 1.5, "alert": 2.0, "timeout": 2.0}
+
+    def __init__(self, bounds: Dict[str, Tuple[float, float]], initial: Dict[str, float],
+                 decrease_fraction: float = 0.05, slow_latency: float = 8.0, jitter: float = 0.2):
+        self.bounds = bounds
+        self.delays = {name: min(max(initial[name], low), high)
+                       for name, (low, high) in bounds.items()}
+        self.decrease_fraction = decrease_fraction
+        self.slow_latency = slow_latency
+        self.jitter = jitter
+        self._lock = threading.Lock()
+
+    def _log(self, event: str, before: Dict[str, float]):
+        changes = ", ".join(f"{name} {before[name]:.1f}->{self.delays[name]:.1f}s"
+                            for name in self.delays)
+        print(f"      - [節奏] {event}: {changes}")
+
+    def record_success(self, latency: Optional[float] = None):
+        """一次正常的請求：回應夠快就加法遞減，過慢則視為異常。"""
+        if latency is not None and latency > self.slow_latency:
+            self.record_trouble("slow", f"回應 {latency:.1f} 秒")
+            return
+        with self._lock:
+            before = dict(self.delays)
+            for name, (low, high) in self.bounds.items():
+                self.delays[name] = max(
+                    low, self.delays[name] - (high - low) * self.decrease_fraction)
+            latency_note = f" (回應 {latency:.1f} 秒)" if latency is not None else ""
+            self._log(f"狀況良好{latency_note}，縮短延遲", before)
+
+    def record_trouble(self, kind: str, detail: str = ""):
+        factor = self.BACKOFF_FACTORS.get(kind, 2.0)
+        with self._lock:
+            before = dict(self.delays)
+            for name, (low, high) in self.bounds.items():
+                self.delays[name] = min(high, max(low, self.delays[name] * factor))
+            self._log(f"偵測到 {kind}{' ' + detail if detail else ''}，延遲 x{factor}", before)
+
+    def next_delay(self, name: str) -> float:
+        """取得下一次休息秒數 (目前延遲加上少量隨機抖動，仍不超出上下限)。"""
+        low, high = self.bounds[name]
+        with self._lock:
+            delay = self.delays[name]
+        return min(high, max(low, delay * random.uniform(1 - self.jitter, 1 + self.jitter)))
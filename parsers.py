@@ -0,0 +1,266 @@
+"""
+搜尋結果列表頁與論文詳目頁的 HTML 解析。
+"""
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+from thesis_utils import extract_thesis_id
+
+
+LISTING_METADATA_PATTERNS = {
+    "author": [r'研究生\s*[:：]?\s*([^\s|｜,，/]+)', r'([^\s|｜,，/]+)\s*[/|｜]\s*[^\s/|｜]*(?:大學|學院)'],
+    "year": [r'學年度\s*[:：]?\s*(\d{2,3})', r'(\d{2,3})\s*學年度'],
+    "school": [r'(?:校院名稱|學校名稱)\s*[:：]?\s*([^\s|｜,，]+)', r'([^\s|｜,，:：]*(?:大學|學院))'],
+    "degree": [r'(碩士|博士)'],
+}
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def build_listing_record(cell_text: str, url: Optional[str], title: Optional[str]) -> dict:
+    """
+    由列表頁一個 td.tdfmt1-content 儲存格的文字、連結與標題組出一筆紀錄。
+    快速解析器與 WebDriver 解析器共用此函式，確保兩者輸出一致。
+    """
+    cell_text = _normalize_text(cell_text)
+    record = {
+        "url": url or None,
+        "title": _normalize_text(title) if title else None,
+        "embargoed": "網際網路公開日期" in cell_text,
+        "ip_restricted": "校內系統及IP範圍內開放" in cell_text,
+        "fulltext_marked": "電子全文" in cell_text,
+    }
+    for field, patterns in LISTING_METADATA_PATTERNS.items():
+        record[field] = None
+        for pattern in patterns:
+            match = re.search(pattern, cell_text)
+            if match:
+                record[field] = match.group(1)
+                break
+    return record
+
+
+class ListingPageParser(HTMLParser):
+    """
+    從搜尋結果頁的 page_source 一次解析出所有 td.tdfmt1-content 儲存格，
+    取代逐一透過 chromedriver 讀取元素文字與屬性的做法。
+    """
+
+    def __init__(self, base_url: str = ""):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.records: List[dict] = []
+        self._cell_depth = 0  # 目前在目標儲存格內的 <td> 巢狀層數，0 表示不在儲存格內
+        self._skip_depth = 0  # <script>/<style> 內的文字不算可見文字
+        self._title_depth = 0  # span.etd_d 的巢狀層數
+        self._in_slink = False
+        self._reset_cell()
+
+    def _reset_cell(self):
+        self._text: List[str] = []
+        self._url: Optional[str] = None
+        self._spans: List[Tuple[bool, List[str]]] = []  # 每個 span.etd_d: (是否在 a.slink 內, 文字)
+
+    @staticmethod
+    def _classes(attrs: List[Tuple[str, Optional[str]]]) -> List[str]:
+        return (dict(attrs).get("class") or "").split()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "td" and "tdfmt1-content" in self._classes(attrs):
+            if self._cell_depth:
+                self._finish_cell()
+            self._cell_depth = 1
+            return
+        if not self._cell_depth:
+            return
+        if tag == "td":
+            self._cell_depth += 1
+        elif tag in ("script", "style"):
+            self._skip_depth += 1
+        elif tag == "br":
+            self._text.append("\n")
+        elif tag == "a" and "slink" in self._classes(attrs):
+            if self._url is None:
+                href = dict(attrs).get("href")
+                self._url = urljoin(self.base_url, href) if href else None
+            self._in_slink = True
+        elif tag == "span":
+            if self._title_depth:
+                self._title_depth += 1
+            elif "etd_d" in self._classes(attrs):
+                self._title_depth = 1
+                self._spans.append((self._in_slink, []))
+
+    def handle_endtag(self, tag):
+        if not self._cell_depth:
+            return
+        if tag == "td":
+            self._cell_depth -= 1
+            if not self._cell_depth:
+                self._finish_cell()
+        elif tag in ("script", "style") and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "a":
+            self._in_slink = False
+        elif tag == "span" and self._title_depth:
+            self._title_depth -= 1
+
+    def handle_data(self, data):
+        if not self._cell_depth or self._skip_depth:
+            return
+        self._text.append(data)
+        if self._title_depth:
+            self._spans[-1][1].append(data)
+
+    def _finish_cell(self):
+        # 與 WebDriver 版本相同：有 a.slink 時取其中第一個 span.etd_d，否則取儲存格內第一個
+        candidates = [text for in_slink, text in self._spans if in_slink or not self._url]
+        title = "".join(candidates[0]) if candidates else None
+        self.records.append(build_listing_record(
+            "".join(self._text), self._url, title))
+        self._reset_cell()
+        self._cell_depth = self._title_depth = self._skip_depth = 0
+        self._in_slink = False
+
+    def close(self):
+        super().close()
+        if self._cell_depth:
+            self._finish_cell()
+
+
+def classify_listing_availability(record: dict, page_has_fulltext_markers: bool) -> Optional[str]:
+    """
+    依列表頁上的標記判斷論文能否下載，回傳不可下載的原因 (embargoed/ip_restricted/no_fulltext)，可下載則回傳 None。
+    只有當同一頁有其他論文標示「電子全文」時，沒有標示的論文才判定為無電子全文。
+    """
+    if record["embargoed"]:
+        return "embargoed"
+    if record["ip_restricted"]:
+        return "ip_restricted"
+    if page_has_fulltext_markers and not record["fulltext_marked"]:
+        return "no_fulltext"
+    return None
+
+
+def parse_listing_html(html: str, base_url: str = "") -> List[dict]:
+    parser = ListingPageParser(base_url)
+    parser.feed(html)
+    parser.close()
+    return parser.records
+
+
+def parse_listing_webdriver(driver: webdriver.Chrome) -> List[dict]:
+    """逐一透過 WebDriver 讀取每個儲存格 (每個元素呼叫都是一次 chromedriver 往返)。"""
+    records = []
+    for elem in driver.find_elements(By.CSS_SELECTOR, "td.tdfmt1-content"):
+        url = title = None
+        links = elem.find_elements(By.CSS_SELECTOR, "a.slink")
+        if links:
+            url = links[0].get_attribute('href')
+            title_spans = links[0].find_elements(By.CSS_SELECTOR, "span.etd_d")
+        else:
+            title_spans = elem.find_elements(By.CSS_SELECTOR, "span.etd_d")
+        title = title_spans[0].text if title_spans else None
+        records.append(build_listing_record(elem.text, url, title))
+    return records
+
+
+RECORD_FIELD_LABELS = {
+    "論文名稱": "title",
+    "論文名稱(外文)": "title_en",
+    "研究生": "author",
+    "研究生(外文)": "author_en",
+    "指導教授": "advisor",
+    "指導教授(外文)": "advisor_en",
+    "校院名稱": "school",
+    "系所名稱": "department",
+    "學位類別": "degree",
+    "學年度": "year",
+    "畢業學年度": "year",
+    "語文別": "language",
+    "論文頁數": "pages",
+    "中文關鍵詞": "keywords",
+    "外文關鍵詞": "keywords_en",
+    "摘要": "abstract",
+    "中文摘要": "abstract",
+    "外文摘要": "abstract_en",
+}
+
+
+class ThesisRecordParser(HTMLParser):
+    """
+    解析論文詳目頁中「標籤: 內容」形式的表格列 (th 為標籤、緊接的 td 為內容)，
+    以及摘要區塊，一次取出所有書目欄位。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields: Dict[str, str] = {}
+        self._capture: Optional[str] = None  # 目前收集文字的儲存格種類: "label" 或 "value"
+        self._depth = 0
+        self._buffer: List[str] = []
+        self._label: Optional[str] = None
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip_depth += 1
+        elif tag in ("th", "td"):
+            if self._capture:
+                self._depth += 1
+                return
+            classes = (dict(attrs).get("class") or "").split()
+            # 標籤儲存格為 th (或 class 為 std1 的 td)，其後的 td 為內容
+            if tag == "th" or "std1" in classes:
+                self._capture, self._depth, self._buffer = "label", 1, []
+            elif self._label is not None:
+                self._capture, self._depth, self._buffer = "value", 1, []
+        elif tag == "br" and self._capture:
+            self._buffer.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in ("th", "td") and self._capture:
+            self._depth -= 1
+            if self._depth:
+                return
+            text = "".join(self._buffer).strip()
+            if self._capture == "label":
+                self._label = re.sub(r'[\s:：]+$', '', text).replace(" ", "")
+            else:
+                field = RECORD_FIELD_LABELS.get(self._label or "")
+                if field and text and field not in self.fields:
+                    self.fields[field] = re.sub(r'[ \t]+', ' ', text)
+                self._label = None
+            self._capture = None
+
+    def handle_data(self, data):
+        if self._capture and not self._skip_depth:
+            self._buffer.append(data)
+
+
+def parse_record_html(html: str) -> dict:
+    """解析詳目頁，回傳書目欄位；關鍵詞拆成清單，並附上永久識別碼。"""
+    parser = ThesisRecordParser()
+    parser.feed(html)
+    parser.close()
+    record = dict(parser.fields)
+    for field in ("keywords", "keywords_en"):
+        if field in record:
+            record[field] = [word.strip() for word in re.split(r'[、;；,，\n]+', record[field]) if word.strip()]
+    if "abstract" not in record:
+        # 部分頁面的摘要不在標籤表格中，改從可見文字中「摘要」之後擷取
+        text = _normalize_text(re.sub(r'<[^>]+>', ' ', re.sub(r'(?is)<(script|style).*?</\1>', ' ', html)))
+        match = re.search(r'(?:中文)?摘要\s*[:：]?\s*(.+?)\s*(?:外文摘要|英文摘要|目次|參考文獻|$)', text)
+        if match:
+            record["abstract"] = match.group(1)[:5000]
+    record["thesis_id"] = extract_thesis_id(html)
+    return record
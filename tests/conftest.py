@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from download import BaseThesisDownloader, DownloaderConfig  # noqa: E402
+from ledger import DownloadLedger  # noqa: E402
+from mock_server import MockNdltdServer  # noqa: E402
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = DownloadLedger(str(tmp_path / "ledger.sqlite3"))
+    yield ledger
+    ledger.close()
+
+
+@pytest.fixture
+def mock_server():
+    server = MockNdltdServer(records=25, latency=(0.0, 0.0)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    """不開瀏覽器的下載器，帳本與資料夾都在暫存目錄。"""
+    config = DownloaderConfig(
+        download_dir=str(tmp_path / "downloads"), log_file=str(tmp_path / "download_log.txt"),
+        page_progress_file=str(tmp_path / "page_progress.txt"), ledger_file=str(tmp_path / "ledger.sqlite3"),
+        metrics_dir=None, captcha_corpus_dir=None, prewarm_ocr=False, background_postprocess=False,
+        delta_crawl=True, max_downloads_per_session=5)
+    downloader = BaseThesisDownloader("台股", config)
+    yield downloader
+    downloader.ledger.close()
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from accounts import AccountPool
+
+
+@pytest.fixture
+def accounts():
+    return [{"name": "a1", "daily_quota": 3, "cooldown_minutes": 10},
+            {"name": "a2", "daily_quota": 5, "session_quota": 2}]
+
+
+def test_pick_prefers_largest_remaining_budget(ledger, accounts):
+    pool = AccountPool(accounts, ledger)
+    # a2 受每次執行額度限制只剩 2 篇，a1 還有 3 篇
+    assert pool.pick() == "a1"
+    # a1 扣掉排隊中的 1 篇只剩 2 篇，與 a2 相同；再排一篇後 a2 較多
+    pool.pick(exclude={"a2"})
+    assert pool.pick() == "a2"
+    # a1 排隊已滿 (預設 2 篇)，只剩 a2
+    assert pool.pick() == "a2"
+    assert pool.pick() is None
+    pool.task_done("a1")
+    assert pool.pick() == "a1"
+
+
+def test_daily_quota_persists_across_pools(ledger, accounts):
+    pool = AccountPool(accounts, ledger)
+    for _ in range(3):
+        pool.record_download("a1")
+    assert pool.remaining("a1") == 0
+    assert not pool.available("a1")
+    assert AccountPool(accounts, ledger).remaining("a1") == 0
+
+
+def test_session_quota_resets_with_new_pool(ledger, accounts):
+    pool = AccountPool(accounts, ledger)
+    pool.record_download("a2")
+    pool.record_download("a2")
+    assert pool.remaining("a2") == 0
+    assert AccountPool(accounts, ledger).remaining("a2") == 2
+
+
+def test_trouble_threshold_triggers_cooldown(ledger, accounts):
+    pool = AccountPool(accounts, ledger, trouble_threshold=2)
+    pool.record_trouble("a1", "captcha")  # 驗證碼被拒不計入
+    pool.record_trouble("a1", "alert")
+    assert pool.available("a1")
+    pool.record_trouble("a1", "timeout")
+    assert pool.cooling_until("a1") == pytest.approx(time.time() + 600, abs=5)
+    assert not pool.available("a1")
+    assert pool.pick() == "a2"
+    # 冷卻中的帳號稍後仍可使用，不算用完額度
+    assert not pool.exhausted()
+
+
+def test_success_resets_trouble_count(ledger, accounts):
+    pool = AccountPool(accounts, ledger, trouble_threshold=2)
+    pool.record_trouble("a1", "alert")
+    pool.record_success("a1")
+    pool.record_trouble("a1", "alert")
+    assert pool.available("a1")
+
+
+def test_exhausted_when_all_quotas_used_or_disabled(ledger, accounts):
+    pool = AccountPool(accounts, ledger)
+    for _ in range(3):
+        pool.record_download("a1")
+    assert not pool.exhausted()
+    pool.disable("a2")
+    assert pool.exhausted()
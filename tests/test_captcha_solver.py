@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from captcha import CaptchaCorpus, CaptchaSolver
+
+
+class FakeOcr:
+    """以影像內容決定答案的假 OCR；模擬推論耗時並記錄同時執行的呼叫數。"""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.calls = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def classification(self, image_bytes, probability=False):
+        with self._lock:
+            self.calls += 1
+            self._active += 1
+            self.max_concurrent = max(self.max_concurrent, self._active)
+        try:
+            time.sleep(self.delay)
+            return {"text": "Ab12", "confidence": 0.9}
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+def _captcha_png(value: int = None) -> bytes:
+    pixels = np.full((30, 80), value, dtype=np.uint8) if value is not None else \
+        np.random.default_rng(0).integers(0, 256, size=(30, 80), dtype=np.uint8)
+    buffered = BytesIO()
+    Image.fromarray(pixels).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def test_concurrent_submits_do_not_deadlock():
+    ocr = FakeOcr()
+    solver = CaptchaSolver(ocr, max_workers=2)
+    try:
+        futures = [solver.submit(_captcha_png()) for _ in range(8)]
+        results = [future.result(timeout=10) for future in futures]
+    finally:
+        solver.shutdown()
+    assert all(answer == "ab12" for answer, _, _ in results)
+    assert all(abs(confidence - 0.9) < 1e-9 for _, confidence, _ in results)
+    assert ocr.calls == 8 * len(CaptchaSolver.DEFAULT_THRESHOLDS)
+    assert ocr.max_concurrent <= 2
+
+
+def test_solve_from_many_worker_threads():
+    solver = CaptchaSolver(FakeOcr(delay=0.005), max_workers=2)
+    try:
+        with ThreadPoolExecutor(max_workers=6) as workers:
+            results = list(workers.map(lambda _: solver.solve(_captcha_png()), range(12)))
+    finally:
+        solver.shutdown()
+    assert [answer for answer, _, _ in results] == ["ab12"] * 12
+
+
+def test_failing_variant_does_not_block_the_others():
+    class FlakyOcr(FakeOcr):
+        def classification(self, image_bytes, probability=False):
+            with self._lock:
+                fail = self.calls == 0
+            result = super().classification(image_bytes, probability)
+            if fail:
+                raise RuntimeError("模型推論失敗")
+            return result
+
+    solver = CaptchaSolver(FlakyOcr(), max_workers=2)
+    try:
+        answer, confidence, candidates = solver.submit(_captcha_png()).result(timeout=10)
+    finally:
+        solver.shutdown()
+    assert answer == "ab12"
+    assert len(candidates) == len(CaptchaSolver.DEFAULT_THRESHOLDS) - 1
+    assert confidence < 0.9
+
+
+def test_otsu_on_blank_image_uses_fallback_threshold():
+    gray = np.full((30, 80), 255, dtype=np.uint8)
+    assert CaptchaSolver._otsu_threshold(gray) == CaptchaSolver.FALLBACK_THRESHOLD
+    assert CaptchaSolver.binarize(_captcha_png(255), "otsu")
+
+
+def test_corpus_prunes_oldest_unlabeled_samples(tmp_path):
+    corpus = CaptchaCorpus(str(tmp_path / "corpus"), max_samples=10)
+    corpus.record(b"labeled-0", "abcd", True, 0.9)
+    for i in range(10):
+        corpus.record(f"rejected-{i}".encode(), "zzzz", False, 0.1)
+    entries = corpus.load()
+    assert len(entries) == 9
+    # 已標註的樣本最後才刪，較新的未標註樣本保留下來
+    assert entries[0]["accepted"] and entries[0]["label"] == "abcd"
+    assert len(os.listdir(tmp_path / "corpus")) == 9 + 1  # 圖片加上 labels.jsonl
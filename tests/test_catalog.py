@@ -0,0 +1,73 @@
+import os
+
+from catalog import DownloadCatalog
+from download import DownloaderConfig, ThesisDownloaderWithReadme
+from ledger import DownloadLedger
+from thesis_utils import thesis_title_key
+
+
+def _config(tmp_path, **options):
+    return DownloaderConfig(
+        download_dir=str(tmp_path / "downloads"), log_file=str(tmp_path / "download_log.txt"),
+        page_progress_file=str(tmp_path / "page_progress.txt"), ledger_file=str(tmp_path / "ledger.sqlite3"),
+        catalog_output_dir=str(tmp_path / "catalog"), metrics_dir=None, captcha_corpus_dir=None,
+        prewarm_ocr=False, background_postprocess=False, **options)
+
+
+def test_unfinished_postprocess_is_cataloged_at_startup(tmp_path):
+    os.makedirs(tmp_path / "downloads")
+    raw_path = tmp_path / "downloads" / "raw.pdf"
+    raw_path.write_bytes(b"%PDF-1.4 unfinished")
+    ledger = DownloadLedger(str(tmp_path / "ledger.sqlite3"))
+    key = thesis_title_key("中斷的論文")
+    ledger.mark_downloaded(key, "中斷的論文", "台股", "http://x/record?r1=1", str(raw_path), 19, None)
+    ledger.close()
+
+    downloader = ThesisDownloaderWithReadme("台股", _config(tmp_path))
+    try:
+        # 後處理在基礎類別初始化時執行，目錄此時必須已經開啟
+        assert downloader.catalog.added == 1
+        assert downloader.catalog_dir == str(tmp_path / "catalog")
+        entries = list(downloader.ledger.catalog_entries())
+        assert len(entries) == 1
+        assert os.path.exists(tmp_path / "catalog" / "keywords" / "台股.md")
+    finally:
+        downloader.ledger.close()
+
+
+def test_add_appends_views_and_rebuild_restores_them(tmp_path, ledger):
+    catalog = DownloadCatalog(ledger, str(tmp_path / "catalog"))
+    pdf = tmp_path / "downloads" / "期貨之研究.pdf"
+    os.makedirs(pdf.parent)
+    pdf.write_bytes(b"%PDF-1.4")
+    assert catalog.add("hdl:11296/abc", "期貨", str(pdf), "期貨之研究", "http://x/record", "hdl:11296/abc")
+    assert not catalog.add("hdl:11296/abc", "期貨", str(pdf), "期貨之研究")
+    assert catalog.add("title:b", None, str(pdf), "另一篇")
+    readme = (tmp_path / "catalog" / "README.md").read_text(encoding="utf-8")
+    assert "keywords/%E6%9C%9F%E8%B2%A8.md" in readme and "未分類" in readme
+    shard = (tmp_path / "catalog" / "keywords" / "期貨.md").read_text(encoding="utf-8")
+    assert shard.startswith("# 期貨") and "期貨之研究 ([Source](http://x/record))" in shard
+    assert len((tmp_path / "catalog" / "catalog.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+    os.remove(tmp_path / "catalog" / "catalog.csv")
+    (tmp_path / "catalog" / "keywords" / "期貨.md").write_text("手動修改", encoding="utf-8")
+    assert catalog.rebuild() == 2
+    assert (tmp_path / "catalog" / "keywords" / "期貨.md").read_text(encoding="utf-8") == shard
+    assert len((tmp_path / "catalog" / "catalog.csv").read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_scan_catalogs_untracked_pdfs_with_ledger_metadata(tmp_path, ledger):
+    downloads = tmp_path / "downloads"
+    os.makedirs(downloads)
+    (downloads / "期貨之研究.pdf").write_bytes(b"%PDF-1.4")
+    (downloads / "手動放入.pdf").write_bytes(b"%PDF-1.4")
+    (downloads / "說明.txt").write_text("x", encoding="utf-8")
+    ledger.mark_downloaded("hdl:11296/abc", "期貨之研究", "期貨", "http://x/record?r1=1",
+                           str(downloads / "期貨之研究.pdf"), 8, None)
+    ledger.set_thesis_id("hdl:11296/abc", "hdl:11296/abc")
+    catalog = DownloadCatalog(ledger, str(tmp_path / "catalog"))
+    assert catalog.scan(str(downloads)) == 2
+    assert catalog.scan(str(downloads)) == 0
+    entries = {entry["record_id"]: entry for entry in ledger.catalog_entries()}
+    assert entries["hdl:11296/abc"]["keyword"] == "期貨"
+    assert entries[thesis_title_key("手動放入")]["title"] == "手動放入"
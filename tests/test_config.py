@@ -0,0 +1,39 @@
+import pytest
+
+from download import BaseThesisDownloader, DownloaderConfig
+
+
+def _paths(tmp_path):
+    return dict(ledger_file=str(tmp_path / "ledger.sqlite3"), metrics_dir=None, captcha_corpus_dir=None,
+                prewarm_ocr=False, background_postprocess=False)
+
+
+def test_legacy_positional_arguments_map_to_config(tmp_path):
+    downloader = BaseThesisDownloader(
+        "台股", str(tmp_path / "downloads"), str(tmp_path / "log.txt"), str(tmp_path / "progress.txt"), 12,
+        **_paths(tmp_path))
+    try:
+        assert downloader.config.download_dir == str(tmp_path / "downloads")
+        assert downloader.config.page_progress_file == str(tmp_path / "progress.txt")
+        assert downloader.max_downloads_per_session == 12
+    finally:
+        downloader.ledger.close()
+
+
+def test_config_with_keyword_overrides(tmp_path):
+    config = DownloaderConfig(download_dir=str(tmp_path / "downloads"), max_downloads_per_session=3)
+    downloader = BaseThesisDownloader("台股", config, items_per_page=20, **_paths(tmp_path))
+    try:
+        assert (downloader.config.max_downloads_per_session, downloader.config.items_per_page) == (3, 20)
+        assert config.items_per_page == 10  # 傳入的 config 不會被修改
+    finally:
+        downloader.ledger.close()
+
+
+def test_conflicting_arguments_are_rejected(tmp_path):
+    with pytest.raises(TypeError):
+        BaseThesisDownloader("台股", str(tmp_path / "downloads"), download_dir="other", **_paths(tmp_path))
+    with pytest.raises(TypeError):
+        BaseThesisDownloader("台股", DownloaderConfig(), "downloads", **_paths(tmp_path))
+    with pytest.raises(TypeError):
+        BaseThesisDownloader("台股", no_such_option=True, **_paths(tmp_path))
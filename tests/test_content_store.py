@@ -0,0 +1,63 @@
+import os
+
+from content_store import ContentStore
+from download import BaseThesisDownloader, DownloaderConfig
+
+
+def test_store_lives_outside_download_dir(downloader):
+    assert downloader.content_store.root == os.path.normpath(downloader.download_dir) + "_store"
+    assert not os.path.exists(os.path.join(downloader.download_dir, ".store"))
+
+
+def test_legacy_store_is_moved_out_of_download_dir(tmp_path):
+    legacy = tmp_path / "downloads" / ".store" / "ab"
+    legacy.mkdir(parents=True)
+    (legacy / "abcdef.pdf").write_bytes(b"%PDF")
+    config = DownloaderConfig(
+        download_dir=str(tmp_path / "downloads"), ledger_file=str(tmp_path / "ledger.sqlite3"),
+        log_file=str(tmp_path / "log.txt"), page_progress_file=str(tmp_path / "progress.txt"),
+        background_postprocess=False)
+    downloader = BaseThesisDownloader("台股", config)
+    try:
+        assert os.path.exists(tmp_path / "downloads_store" / "ab" / "abcdef.pdf")
+        assert not os.path.exists(tmp_path / "downloads" / ".store")
+    finally:
+        downloader.ledger.close()
+
+
+def test_postprocess_names_are_bounded(downloader):
+    for i in range(downloader.POSTPROCESS_NAMES_LIMIT + 10):
+        downloader._remember_postprocess_name(f"{i}.pdf")
+    assert len(downloader._postprocess_names) == downloader.POSTPROCESS_NAMES_LIMIT
+    assert "0.pdf" not in downloader._postprocess_names
+    assert f"{downloader.POSTPROCESS_NAMES_LIMIT + 9}.pdf" in downloader._postprocess_names
+
+
+def test_add_deduplicates_and_link_reuses_object(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    source = tmp_path / "a.pdf"
+    source.write_bytes(b"%PDF same")
+    object_path, is_new = store.add(str(source), "ab" + "0" * 62, ".PDF")
+    assert is_new and object_path.endswith(os.path.join("ab", "ab" + "0" * 62 + ".pdf"))
+    assert store.add(str(source), "ab" + "0" * 62, ".pdf") == (object_path, False)
+    first = store.link(object_path, str(tmp_path / "論文.pdf"))
+    assert store.link(object_path, first) == first  # 已經指向同一個物件時不再建立
+    other = tmp_path / "b.pdf"
+    other.write_bytes(b"%PDF other")
+    second = store.link(str(other), first)
+    assert second == str(tmp_path / "論文 (1).pdf")
+
+
+def test_copy_fallback_is_logged(tmp_path, monkeypatch, capsys):
+    store = ContentStore(str(tmp_path / "store"))
+    source = tmp_path / "a.pdf"
+    source.write_bytes(b"%PDF")
+
+    def cross_device(*args):
+        raise OSError(18, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", cross_device)
+    object_path, is_new = store.add(str(source), "cd" + "0" * 62, ".pdf")
+    dest = store.link(object_path, str(tmp_path / "論文.pdf"))
+    assert is_new and open(dest, "rb").read() == b"%PDF"
+    assert capsys.readouterr().out.count("改為複製") == 2
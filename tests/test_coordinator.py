@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from coordinator import WorkCoordinator
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    coordinator = WorkCoordinator(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    coordinator.enqueue([("title:a", "台股", "http://x/record?id=1", "A", None)])
+    yield coordinator
+    coordinator.close()
+
+
+def test_enqueue_ignores_known_records(coordinator):
+    assert coordinator.enqueue([("title:a", "台股", "http://x/record?id=1", "A", None),
+                                ("title:b", "台股", "http://x/record?id=2", "B", None)]) == 1
+    assert coordinator.stats()["pending"] == 2
+
+
+def test_active_lease_is_not_reassigned(coordinator):
+    assert coordinator.claim("pc1", lease_seconds=60)[0] == "title:a"
+    assert coordinator.claim("pc2", lease_seconds=60) is None
+    assert coordinator.heartbeat("pc1", "title:a", lease_seconds=60)
+
+
+def test_expired_lease_is_reclaimed(coordinator):
+    coordinator.claim("pc1", lease_seconds=0.05)
+    time.sleep(0.1)
+    assert coordinator.stats()["expired_leases"] == 1
+    record_id, _, _, _, attempts = coordinator.claim("pc2", lease_seconds=60)
+    assert (record_id, attempts) == ("title:a", 2)
+    # 原 worker 已失去租約：續約失敗，回報失敗也不影響新的租約
+    assert not coordinator.heartbeat("pc1", "title:a", lease_seconds=60)
+    coordinator.fail("pc1", "title:a", "timeout")
+    assert coordinator.stats()["leased"] == 1
+    assert coordinator.complete("pc2", "title:a")
+    assert not coordinator.complete("pc1", "title:a")
+
+
+def test_failures_requeue_until_max_attempts(coordinator):
+    coordinator.claim("pc1", lease_seconds=60)
+    coordinator.fail("pc1", "title:a", "timeout")
+    assert coordinator.stats().get("pending") == 1
+    coordinator.claim("pc1", lease_seconds=60)
+    coordinator.fail("pc1", "title:a", "timeout")
+    assert coordinator.stats().get("failed") == 1
+    assert coordinator.claim("pc1", lease_seconds=60) is None
+
+
+def test_expired_lease_at_max_attempts_is_failed(coordinator):
+    coordinator.claim("pc1", lease_seconds=60)
+    coordinator.fail("pc1", "title:a", "timeout")
+    coordinator.claim("pc1", lease_seconds=0.05)
+    time.sleep(0.1)
+    # 第 max_attempts 次的租約逾時：不再交給其他 worker，與 fail() 一樣標記為失敗
+    assert coordinator.claim("pc2", lease_seconds=60) is None
+    assert coordinator.stats().get("failed") == 1
+    assert not coordinator.heartbeat("pc1", "title:a", lease_seconds=60)
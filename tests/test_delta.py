@@ -0,0 +1,52 @@
+import json
+
+from thesis_utils import thesis_title_key
+
+
+def _listing(title, year, index):
+    return {"title": title, "url": f"http://x/record?r1={index}", "year": str(year),
+            "author": f"作者{index}", "school": "國立臺灣大學"}
+
+
+def test_page_of_known_records_counts_zero_new(downloader):
+    downloader.ledger.mark_status(thesis_title_key("舊論文一"), "downloaded", title="舊論文一")
+    downloader.ledger.mark_status(thesis_title_key("舊論文二"), "skipped", "no_fulltext", title="舊論文二")
+    downloader._start_delta("台股")
+    page = [_listing("舊論文一", 112, 1), _listing("舊論文二", 111, 2)]
+    assert downloader._count_new_listing_records(page) == 0
+
+
+def test_records_older_than_high_water_are_not_new(downloader):
+    downloader.ledger.set_meta("delta_high_water:台股", json.dumps({"year": 110, "at": "2026-01-01 00:00:00"}))
+    downloader._start_delta("台股")
+    assert downloader._delta_hwm_year == 110
+    page = [_listing("新論文", 112, 1), _listing("更早的論文", 108, 2)]
+    assert downloader._count_new_listing_records(page) == 1
+    downloader._finish_delta("台股")
+    high_water = json.loads(downloader.ledger.get_meta("delta_high_water:台股"))
+    assert (high_water["year"], high_water["new_records"]) == (112, 1)
+
+
+def test_high_water_never_moves_backwards(downloader):
+    downloader.ledger.set_meta("delta_high_water:台股", json.dumps({"year": 113}))
+    downloader._start_delta("台股")
+    downloader._count_new_listing_records([_listing("新論文", 113, 1)])
+    downloader._finish_delta("台股")
+    assert json.loads(downloader.ledger.get_meta("delta_high_water:台股"))["year"] == 113
+
+
+def test_high_water_kept_when_download_limit_reached(downloader):
+    before = json.dumps({"year": 110, "at": "2026-01-01 00:00:00"})
+    downloader.ledger.set_meta("delta_high_water:台股", before)
+    downloader._start_delta("台股")
+    downloader._count_new_listing_records([_listing("新論文", 112, 1)])
+    downloader.session_download_count = downloader.max_downloads_per_session
+    downloader._finish_delta("台股")
+    assert downloader.ledger.get_meta("delta_high_water:台股") == before
+
+
+def test_delta_does_not_overwrite_page_progress(downloader):
+    downloader.ledger.set_page_progress("台股", 42)
+    downloader._start_delta("台股")
+    downloader._log_progress(3)
+    assert downloader.ledger.get_page_progress("台股") == 42
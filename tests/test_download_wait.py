@@ -0,0 +1,40 @@
+import os
+import time
+
+
+def _write(directory, name, data=b"%PDF-1.4 test"):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "wb") as f:
+        f.write(data)
+
+
+def test_fallback_picks_guid_file_written_after_click(downloader):
+    watch_dir = downloader.browser_download_dir
+    _write(watch_dir, "old.pdf")
+    os.utime(os.path.join(watch_dir, "old.pdf"), (0, 0))
+    clicked_at = time.time()
+    guid = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    _write(watch_dir, guid)
+    _write(watch_dir, "stray.pdf")
+    path = downloader._wait_for_download_complete(timeout=3, clicked_at=clicked_at)
+    # 以 GUID 命名的檔案才是這次的下載，依檔頭補上副檔名
+    assert path == os.path.join(watch_dir, guid + ".pdf")
+
+
+def test_ambiguous_new_files_fail_instead_of_guessing(downloader):
+    watch_dir = downloader.browser_download_dir
+    _write(watch_dir, "before.pdf")
+    initial_files = set(os.listdir(watch_dir))
+    _write(watch_dir, "a.pdf")
+    _write(watch_dir, "b.pdf")
+    assert downloader._wait_for_download_complete(timeout=2, initial_files=initial_files) is None
+
+
+def test_single_new_file_is_returned(downloader):
+    watch_dir = downloader.browser_download_dir
+    _write(watch_dir, "before.pdf")
+    initial_files = set(os.listdir(watch_dir))
+    _write(watch_dir, "論文.pdf")
+    _write(watch_dir, "進行中.pdf.crdownload")
+    assert downloader._wait_for_download_complete(timeout=2, initial_files=initial_files) == \
+        os.path.join(watch_dir, "論文.pdf")
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from fulltext_index import FullTextIndex
+from mock_server import MockNdltdServer
+
+
+def test_missing_pdf_backend_fails_before_extraction(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "a.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4")
+    real_import = __import__
+
+    def no_pdf_libraries(name, *args, **kwargs):
+        if name in ("fitz", "pypdf"):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.__import__", no_pdf_libraries)
+    index = FullTextIndex(str(tmp_path / "index.sqlite3"))
+    try:
+        with pytest.raises(RuntimeError):
+            index.update([str(pdf_path)], lambda path: ("a", None, None), workers=1)
+    finally:
+        index.close()
+
+
+def test_index_errors_do_not_break_close(downloader, monkeypatch, capsys):
+    def broken_update(*args, **kwargs):
+        raise ImportError("No module named 'fitz'")
+
+    monkeypatch.setattr("download.update_fulltext_index", broken_update)
+    downloader.fulltext_index_file = os.path.join(downloader.download_dir, "index.sqlite3")
+    downloader._update_fulltext_index()
+    assert "無法更新全文索引" in capsys.readouterr().out
+
+
+def test_update_indexes_changed_files_and_searches(tmp_path):
+    server = MockNdltdServer(records=3, file_kb=4)
+    paths = []
+    for index in (1, 2):
+        path = tmp_path / f"論文{index}.pdf"
+        path.write_bytes(server._pdf_bytes(index))
+        paths.append(str(path))
+    broken = tmp_path / "壞檔.pdf"
+    broken.write_bytes(b"not a pdf")
+
+    def metadata(path):
+        return os.path.splitext(os.path.basename(path))[0], None, "台股"
+
+    index = FullTextIndex(str(tmp_path / "index.sqlite3"))
+    try:
+        stats = index.update(paths + [str(broken)], metadata, workers=1)
+        assert (stats["indexed"], stats["errors"]) == (2, 1)
+        assert index.count() == 2
+        results = index.search("Mock thesis 2")
+        assert [(title, keyword) for title, _, keyword, _, _ in results] == [("論文2", "台股")]
+        assert "【" in results[0][1]
+        # 兩個字的查詢改以子字串比對
+        assert len(index.search("論文")) == 2
+        # 沒有變更的檔案不重新擷取；刪除的檔案從索引移除
+        os.remove(paths[1])
+        stats = index.update(paths[:1], metadata, workers=1)
+        assert (stats["unchanged"], stats["indexed"], stats["removed"]) == (1, 0, 2)
+        assert index.search("Mock thesis 2") == []
+    finally:
+        index.close()
@@ -0,0 +1,60 @@
+from thesis_utils import is_provisional_key, thesis_title_key
+
+
+def _listing(title, index):
+    return {"title": title, "url": f"http://x/record?r1={index}", "year": "112",
+            "author": f"作者{index}", "school": "國立臺灣大學"}
+
+
+def _key(downloader, record):
+    return downloader._record_key(record["title"], record["url"])
+
+
+def test_unknown_title_uses_title_hint(downloader):
+    record = _listing("新論文", 1)
+    downloader._assign_listing_keys([record])
+    assert _key(downloader, record) == thesis_title_key("新論文")
+
+
+def test_confirmed_thesis_is_keyed_by_thesis_id(downloader):
+    record = _listing("期貨之研究", 1)
+    downloader._assign_listing_keys([record])
+    assert downloader._adopt_thesis_id(_key(downloader, record), "hdl:11296/abc",
+                                       record["title"], record["url"]) == "hdl:11296/abc"
+    downloader.ledger.mark_downloaded("hdl:11296/abc", record["title"], "台股", record["url"], None, None, None)
+    # 換了關鍵字後名次不同，列表上的同一篇論文直接對應到識別碼
+    again = dict(record, url="http://x/record?r1=9")
+    downloader._listing_identity.clear()
+    downloader._assign_listing_keys([again])
+    assert _key(downloader, again) == "hdl:11296/abc"
+    assert downloader.ledger.processed(["hdl:11296/abc"]) == {"hdl:11296/abc"}
+
+
+def test_same_title_without_signature_does_not_collide(downloader):
+    first, second = _listing("同名論文", 1), _listing("同名論文", 2)
+    for record in (first, second):
+        record.update(author="", year="", school="")
+    downloader._assign_listing_keys([first, second])
+    assert _key(downloader, first) == thesis_title_key("同名論文")
+    assert is_provisional_key(_key(downloader, second))
+    downloader._adopt_thesis_id(_key(downloader, first), "hdl:11296/one", first["title"], first["url"])
+    downloader._adopt_thesis_id(_key(downloader, second), "hdl:11296/two", second["title"], second["url"])
+    assert {"hdl:11296/one", "hdl:11296/two"} <= {row[0] for row in downloader.ledger._conn.execute(
+        "SELECT record_id FROM records")}
+    # 兩篇都無法由列表區分，下次都用暫時鍵，打開後才確認
+    downloader._listing_identity.clear()
+    downloader._assign_listing_keys([first, second])
+    assert is_provisional_key(_key(downloader, first)) and is_provisional_key(_key(downloader, second))
+    assert _key(downloader, first) != _key(downloader, second)
+
+
+def test_confirmed_key_not_merged_with_different_thesis(downloader):
+    record = _listing("同名論文", 1)
+    downloader._assign_listing_keys([record])
+    downloader._adopt_thesis_id(_key(downloader, record), "hdl:11296/one", record["title"], record["url"])
+    downloader.ledger.mark_downloaded("hdl:11296/one", record["title"], "台股", record["url"], None, None, None)
+    # 列表簽章相同，但詳目頁的識別碼不同：另立一筆，不覆寫已下載那篇
+    assert downloader._adopt_thesis_id("hdl:11296/one", "hdl:11296/two",
+                                       record["title"], record["url"]) == "hdl:11296/two"
+    assert downloader.ledger.is_downloaded("hdl:11296/one")
+    assert not downloader.ledger.is_downloaded("hdl:11296/two")
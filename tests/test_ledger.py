@@ -0,0 +1,178 @@
+import sqlite3
+import time
+
+from ledger import DownloadLedger
+from thesis_utils import thesis_title_key
+
+
+def _columns(ledger, table):
+    return {row[1] for row in ledger._conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_schema_creates_all_tables(ledger):
+    tables = {row[0] for row in ledger._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"records", "page_progress", "meta", "frontier", "journal", "retry_queue",
+            "account_usage", "account_state", "metadata_harvest", "catalog"} <= tables
+    assert {"thesis_id", "listing_sig"} <= _columns(ledger, "records")
+    assert ledger._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_old_records_table_is_migrated_in_place(tmp_path):
+    db_path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE records (record_id TEXT PRIMARY KEY, title TEXT, keyword TEXT, url TEXT, "
+        "status TEXT NOT NULL DEFAULT 'pending', reason TEXT, file_path TEXT, file_size INTEGER, "
+        "content_hash TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)")
+    conn.execute("INSERT INTO records (record_id, title, status, created_at, updated_at) "
+                 "VALUES ('title:舊論文', '舊論文', 'downloaded', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    ledger = DownloadLedger(db_path)
+    assert {"thesis_id", "listing_sig"} <= _columns(ledger, "records")
+    assert ledger.is_downloaded("title:舊論文")
+    indexes = {row[1] for row in ledger._conn.execute("PRAGMA index_list(records)")}
+    assert "idx_records_thesis" in indexes
+    ledger.close()
+    # 再次開啟不應重複遷移
+    DownloadLedger(db_path).close()
+
+
+def test_import_text_log_runs_once(tmp_path, ledger):
+    log_file, progress_file = tmp_path / "download_log.txt", tmp_path / "page_progress.txt"
+    log_file.write_text("a\nb\n\n", encoding="utf-8")
+    progress_file.write_text("7", encoding="utf-8")
+    assert ledger.import_text_log(str(log_file), str(progress_file), "台股", str.strip) == 2
+    assert ledger.get_page_progress("台股") == 7
+    assert ledger.import_text_log(str(log_file), str(progress_file), "台股", str.strip) is None
+
+
+def test_migrate_identity_rekeys_rank_keys(ledger):
+    now = time.time()
+    ledger._conn.executemany(
+        "INSERT INTO records (record_id, title, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+        [("/record?r1=1", "期貨 之研究", "downloaded", now, now),
+         ("/record?r1=2", None, "downloaded", now, now)])
+    rekeyed, retired, pdfs = ledger.migrate_identity(thesis_title_key, [("選擇權研究", "/x/選擇權研究.pdf", 10)])
+    assert (rekeyed, retired, pdfs) == (1, 1, 1)
+    assert ledger.is_downloaded(thesis_title_key("期貨之研究"))
+    assert ledger.get_status("/record?r1=2") == ("skipped", "legacy_rank_key")
+    assert ledger.is_downloaded(thesis_title_key("選擇權研究"))
+    assert ledger.migrate_identity(thesis_title_key, []) is None
+
+
+def test_add_pending_fills_missing_listing_signature(ledger):
+    ledger.add_pending([("title:a", "A", "台股", "u1", None)])
+    ledger.add_pending([("title:a", "A", "台股", "u1", "王|台大|110")])
+    assert ledger.listing_signatures(["title:a"]) == {"title:a": "王|台大|110"}
+
+
+def test_retry_backoff_doubles_and_caps(ledger):
+    delays = []
+    for _ in range(4):
+        before = time.time()
+        _, attempts, next_at = ledger.schedule_retry("title:a", "台股", "u", "A", "timeout",
+                                                     max_attempts=10, base_delay=100, max_delay=500)
+        delays.append((attempts, next_at - before))
+    for attempts, delay in delays:
+        expected = min(500, 100 * 2 ** (attempts - 1))
+        assert expected <= delay <= expected * 1.25 + 1
+
+
+def test_retry_becomes_permanent_at_max_attempts(ledger):
+    for attempt in range(1, 4):
+        failure_class, attempts, next_at = ledger.schedule_retry(
+            "title:a", "台股", "u", "A", "captcha", max_attempts=3, base_delay=0, max_delay=0)
+        assert (failure_class, attempts) == ("captcha", attempt)
+    assert next_at is None
+    assert ledger.claim_due_retry("台股") is None
+    assert ledger.permanent_failures() == [("A", "captcha", 3, "台股")]
+
+
+def test_not_found_is_deferred_without_counting(ledger):
+    ledger.schedule_retry("title:a", "台股", "u", "A", "timeout", max_attempts=2, base_delay=100, max_delay=500)
+    for _ in range(3):
+        before = time.time()
+        failure_class, attempts, next_at = ledger.schedule_retry(
+            "title:a", "台股", "u", "A", "not_found", max_attempts=2, base_delay=100, max_delay=500)
+        # 找不到論文不是下載失敗，不會累積到永久失敗，延後的間隔停在目前的退避等級
+        assert (failure_class, attempts) == ("not_found", 1)
+        assert 100 <= next_at - before <= 126
+    assert ledger.permanent_failures() == []
+
+
+def test_claim_due_retry_leases_and_filters(ledger):
+    ledger.schedule_retry("title:a", "台股", "u", "A", "timeout", max_attempts=5, base_delay=0, max_delay=0)
+    assert ledger.claim_due_retry("期貨") is None
+    # 沒有永久識別碼的論文不能直接以永久網址重試
+    assert ledger.claim_due_retry("台股", identified_only=True) is None
+    ledger.mark_status("title:a", "failed", "timeout", title="A", keyword="台股", url="u")
+    ledger.set_thesis_id("title:a", "hdl:11296/abc")
+    claimed = ledger.claim_due_retry("台股", lease_seconds=60, identified_only=True)
+    assert claimed == ("title:a", "台股", "u", "A", 1)
+    # 租約期間不會被其他執行緒重複取出，交回後立即可再取出
+    assert ledger.claim_due_retry("台股") is None
+    ledger.release_retry("title:a")
+    assert ledger.claim_due_retry("台股")[0] == "title:a"
+    ledger.clear_retry("title:a")
+    assert ledger.retry_summary() == []
+
+
+def test_adopt_key_renames_title_row_and_keeps_alias(ledger):
+    key = thesis_title_key("期貨之研究")
+    ledger.mark_status(key, "failed", "timeout", title="期貨之研究", keyword="台股", listing_sig="sig-a")
+    ledger.schedule_retry(key, "台股", "http://x/record?r1=1", "期貨之研究", "timeout", 3, 60, 600)
+    ledger.append_journal([(key, "台股", 1, 0, "listed", None)])
+    ledger.adopt_key(key, "hdl:11296/abc", [key], title="期貨之研究")
+    assert key not in ledger
+    assert ledger.get_status("hdl:11296/abc") == ("failed", "timeout")
+    assert ledger.get_thesis_id("hdl:11296/abc") == "hdl:11296/abc"
+    assert ledger.resolve_aliases([key]) == {key: [("hdl:11296/abc", "sig-a")]}
+    assert ledger._query_one("SELECT record_id FROM retry_queue")[0] == "hdl:11296/abc"
+    assert ledger.journal_finished(["hdl:11296/abc"]) == set()
+    assert ledger._query_one("SELECT COUNT(*) FROM journal WHERE record_id = ?", (key,))[0] == 0
+
+
+def test_adopt_key_merges_into_downloaded_row(ledger):
+    ledger.mark_downloaded("hdl:11296/abc", "期貨之研究", "台股", "http://x", "/d/a.pdf", 10, None)
+    renamed = thesis_title_key("期貨之研究（修訂）")
+    ledger.mark_status(renamed, "pending", title="期貨之研究（修訂）", keyword="期貨")
+    ledger.adopt_key(renamed, "hdl:11296/abc", [renamed])
+    # 標題改過不會產生新紀錄，已下載狀態也不會被待處理覆蓋
+    assert renamed not in ledger
+    assert ledger.is_downloaded("hdl:11296/abc")
+    assert ledger.count() == 1
+    assert ledger.resolve_aliases([renamed])[renamed][0][0] == "hdl:11296/abc"
+
+
+def test_same_title_theses_get_separate_rows(ledger):
+    key = thesis_title_key("同名論文")
+    ledger.adopt_key(f"{key}~1", "hdl:11296/one", [key])
+    ledger.adopt_key(f"{key}~2", "hdl:11296/two", [key])
+    assert sorted(record_id for record_id, _ in ledger.resolve_aliases([key])[key]) == [
+        "hdl:11296/one", "hdl:11296/two"]
+    # 暫時鍵不留作別名
+    assert ledger.resolve_aliases([f"{key}~1"]) == {}
+
+
+def test_migrate_thesis_keys_runs_once(ledger):
+    key = thesis_title_key("舊論文")
+    ledger.mark_downloaded(key, "舊論文", "台股", "http://x", "/d/舊論文.pdf", 10, None)
+    ledger.set_thesis_id(key, "hdl:11296/old")
+    ledger.mark_status(f"{key}~abc", "pending", title="舊論文")
+    ledger.set_thesis_id(f"{key}~abc", "hdl:11296/other")
+    assert ledger.migrate_thesis_keys(lambda record_id: "~" in record_id) == 2
+    assert ledger.is_downloaded("hdl:11296/old")
+    assert ledger.resolve_aliases([key]) == {key: [("hdl:11296/old", None)]}
+    assert ledger.get_status("hdl:11296/other") == ("pending", None)
+    assert ledger.migrate_thesis_keys(lambda record_id: "~" in record_id) is None
+
+
+def test_purge_provisional_keeps_failed_rows(ledger):
+    key = thesis_title_key("同名論文")
+    ledger.mark_status(f"{key}~1", "pending")
+    ledger.mark_status(f"{key}~2", "failed", "timeout")
+    assert ledger.purge_provisional(lambda record_id: "~" in record_id) == 1
+    assert ledger.get_status(f"{key}~1") is None
+    assert ledger.get_status(f"{key}~2") == ("failed", "timeout")
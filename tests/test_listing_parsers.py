@@ -0,0 +1,171 @@
+import re
+import shutil
+from html.parser import HTMLParser
+from urllib.parse import quote, urljoin
+
+import pytest
+import requests
+
+from parsers import classify_listing_availability, parse_listing_html, parse_listing_webdriver
+
+VOID_TAGS = {"br", "img", "input", "meta", "link", "hr"}
+
+# 標題中有巢狀 span、儲存格中有 script、沒有 a.slink 的儲存格與各種不可下載標記
+TRICKY_LISTING = """
+<html><body><table id='tablefmt1'>
+<tr><td class='tdfmt1-content'><a class='slink' href='/cgi-bin/gs32/gsweb.cgi/ccd=x/record?r1=1'>
+  <span class='etd_d'>波動率<span class='hl'>預測</span>模型</span></a><br>
+  研究生: 王小明 / 國立臺灣大學 / 110 學年度 / 碩士<br><img src='ft.gif'>電子全文
+  <script>var s = '網際網路公開日期';</script></td></tr>
+<tr><td class='tdfmt1-content'><span class='etd_d'>沒有連結的論文</span><br>
+  李大華 / 國立政治大學 / 109 學年度 / 博士</td></tr>
+<tr><td class='tdfmt1-content'><a class='slink' href='record?r1=3'><span class='etd_d'>限閱論文</span></a><br>
+  網際網路公開日期：2099/12/31</td></tr>
+<tr><td class='tdfmt1-content'><a class='slink' href='record?r1=4'><span class='etd_d'>校內論文</span></a><br>
+  校內系統及IP範圍內開放 <table><tr><td>巢狀儲存格</td></tr></table></td></tr>
+</table></body></html>
+"""
+
+
+class _Node:
+    def __init__(self, tag, attrs, parent=None):
+        self.tag, self.attrs, self.parent, self.children = tag, dict(attrs), parent, []
+
+    @property
+    def classes(self):
+        return (self.attrs.get("class") or "").split()
+
+    def descendants(self):
+        for child in self.children:
+            if isinstance(child, _Node):
+                yield child
+                yield from child.descendants()
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = self.current = _Node("#root", [])
+
+    def handle_starttag(self, tag, attrs):
+        node = _Node(tag, attrs, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+class FakeElement:
+    """以 html.parser 建出的 DOM 模擬 WebElement：支援 tag.class 子孫選擇器、href 屬性與可見文字。"""
+
+    def __init__(self, node, base_url):
+        self.node, self.base_url = node, base_url
+
+    def find_elements(self, by, selector):
+        tag, _, cls = selector.partition(".")
+        return [FakeElement(node, self.base_url) for node in self.node.descendants()
+                if node.tag == tag and (not cls or cls in node.classes)]
+
+    def get_attribute(self, name):
+        value = self.node.attrs.get(name)
+        # 瀏覽器回傳的 href 是絕對網址
+        return urljoin(self.base_url, value) if name == "href" and value else value
+
+    @property
+    def text(self):
+        parts = []
+
+        def walk(node):
+            for child in node.children:
+                if isinstance(child, str):
+                    parts.append(child)
+                elif child.tag == "br":
+                    parts.append("\n")
+                elif child.tag not in ("script", "style"):
+                    walk(child)
+
+        walk(self.node)
+        return re.sub(r"[ \t]+", " ", "".join(parts)).strip()
+
+
+class FakeDriver(FakeElement):
+    def __init__(self, html, base_url):
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        super().__init__(builder.root, base_url)
+
+
+def _saved_mock_listing(mock_server, keyword="台股", page=1):
+    url = f"{mock_server.url}{mock_server.CGI}/ccd=mock/result"
+    response = requests.get(url, params={"q": keyword, "page": page}, timeout=10)
+    response.raise_for_status()
+    return response.text, response.url
+
+
+def test_fast_parser_reads_mock_listing(mock_server):
+    html, base_url = _saved_mock_listing(mock_server)
+    records = parse_listing_html(html, base_url)
+    assert len(records) == mock_server.ITEMS_PER_PAGE
+    page_has_markers = any(record["fulltext_marked"] for record in records)
+    for index, record in enumerate(records):
+        expected = mock_server.record(index)
+        assert record["title"] == mock_server.title("台股", index)
+        assert record["url"].startswith(f"{mock_server.url}{mock_server.CGI}/ccd=mock/record?id={index}&")
+        assert (record["author"], record["school"], record["year"], record["degree"]) == \
+            (expected["author"], expected["school"], expected["year"], "碩士")
+        availability = classify_listing_availability(record, page_has_markers)
+        if expected["embargoed"]:
+            assert availability == "embargoed"
+        elif expected["ip_restricted"]:
+            assert availability == "ip_restricted"
+        else:
+            assert availability == (None if expected["fulltext"] else "no_fulltext")
+
+
+@pytest.mark.parametrize("source", ["mock", "tricky"])
+def test_fast_parser_matches_webdriver_parser(mock_server, source):
+    if source == "mock":
+        html, base_url = _saved_mock_listing(mock_server, page=2)
+    else:
+        html, base_url = TRICKY_LISTING, "https://ndltd.ncl.edu.tw/cgi-bin/gs32/gsweb.cgi/ccd=x/result"
+    assert parse_listing_html(html, base_url) == parse_listing_webdriver(FakeDriver(html, base_url))
+
+
+def test_tricky_listing_fields():
+    base_url = "https://ndltd.ncl.edu.tw/cgi-bin/gs32/gsweb.cgi/ccd=x/result"
+    first, second, third, fourth = parse_listing_html(TRICKY_LISTING, base_url)
+    assert first["title"] == "波動率預測模型"
+    assert first["url"] == "https://ndltd.ncl.edu.tw/cgi-bin/gs32/gsweb.cgi/ccd=x/record?r1=1"
+    assert (first["author"], first["year"], first["embargoed"]) == ("王小明", "110", False)
+    assert (second["url"], second["title"], second["degree"]) == (None, "沒有連結的論文", "博士")
+    assert third["embargoed"] and fourth["ip_restricted"]
+
+
+def _chrome_binary():
+    return next(filter(None, (shutil.which(name) for name in
+                              ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser"))), None)
+
+
+@pytest.mark.skipif(_chrome_binary() is None, reason="需要 Chrome 才能以真正的 WebDriver 解析")
+def test_fast_parser_matches_real_webdriver(mock_server):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless=new")
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get(f"{mock_server.url}{mock_server.CGI}/ccd=mock/result?q={quote('台股')}")
+        assert parse_listing_webdriver(driver) == parse_listing_html(driver.page_source, driver.current_url)
+    finally:
+        driver.quit()
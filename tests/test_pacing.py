@@ -0,0 +1,69 @@
+import threading
+import time
+
+from pacing import AdaptivePacer, TokenBucketRateLimiter
+
+
+def test_rate_limiter_allows_burst_then_waits():
+    limiter = TokenBucketRateLimiter(rate_per_minute=600, burst=2)
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == 0.0
+    started = time.monotonic()
+    waited = limiter.acquire()
+    # 每秒補充 10 個令牌，桶空之後約需等待 0.1 秒
+    assert 0.05 <= waited <= 0.2
+    assert time.monotonic() - started >= 0.05
+
+
+def test_rate_limiter_is_shared_across_threads():
+    limiter = TokenBucketRateLimiter(rate_per_minute=1200, burst=1)
+    started = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 第一個令牌免費，其餘四個依每秒 20 個的速率補充
+    assert time.monotonic() - started >= 0.15
+
+
+def test_zero_rate_never_blocks():
+    assert TokenBucketRateLimiter(rate_per_minute=0).acquire() == 0.0
+
+
+def _pacer():
+    return AdaptivePacer({"article": (2.0, 12.0), "page": (5.0, 25.0)}, {"article": 10.0, "page": 20.0},
+                         decrease_fraction=0.1, slow_latency=5.0, jitter=0.0)
+
+
+def test_pacer_decreases_additively_and_stops_at_lower_bound(capsys):
+    pacer = _pacer()
+    pacer.record_success(1.0)
+    assert pacer.delays == {"article": 9.0, "page": 18.0}
+    for _ in range(20):
+        pacer.record_success()
+    assert pacer.delays == {"article": 2.0, "page": 5.0}
+    assert "縮短延遲" in capsys.readouterr().out
+
+
+def test_pacer_backs_off_multiplicatively_and_caps():
+    pacer = _pacer()
+    pacer.record_trouble("timeout")
+    assert pacer.delays == {"article": 12.0, "page": 25.0}
+    pacer = _pacer()
+    pacer.record_trouble("captcha_rejected")
+    assert pacer.delays == {"article": 12.0, "page": 25.0}
+    pacer = AdaptivePacer({"article": (2.0, 12.0)}, {"article": 4.0}, jitter=0.0)
+    pacer.record_trouble("captcha_rejected")
+    assert pacer.delays["article"] == 5.0
+
+
+def test_slow_success_counts_as_trouble():
+    pacer = AdaptivePacer({"article": (2.0, 12.0)}, {"article": 4.0}, slow_latency=5.0, jitter=0.0)
+    pacer.record_success(6.0)
+    assert pacer.delays["article"] == 6.0
+
+
+def test_next_delay_stays_within_bounds():
+    pacer = AdaptivePacer({"article": (2.0, 12.0)}, {"article": 11.5}, jitter=0.5)
+    assert all(2.0 <= pacer.next_delay("article") <= 12.0 for _ in range(50))
@@ -0,0 +1,53 @@
+import pytest
+
+from coordinator import WorkCoordinator
+from thesis_utils import permanent_record_url
+
+
+@pytest.mark.parametrize("mode", [{}, {"harvest_output": "harvest.jsonl"}])
+def test_campaign_drains_retry_queue_in_every_local_mode(downloader, monkeypatch, tmp_path, mode):
+    for name, value in mode.items():
+        setattr(downloader, name, str(tmp_path / value))
+    drained = []
+    monkeypatch.setattr(downloader, "_run_keywords", lambda: None)
+    monkeypatch.setattr(downloader, "_drain_retry_queue", lambda: drained.append(True))
+    downloader.run_campaign()
+    assert drained == [True]
+
+
+def test_distributed_retries_are_handed_to_coordinator(downloader, tmp_path):
+    downloader.distributed_role = "coordinator"
+    downloader.coordinator = WorkCoordinator(str(tmp_path / "coordinator.sqlite3"))
+    downloader.main_window_handle = "main"
+    downloader.retry_lease_seconds = 120
+    ledger = downloader.ledger
+    ledger.mark_status("hdl:11296/abc", "failed", "timeout", title="期貨之研究", keyword="期貨", url="u")
+    ledger.set_thesis_id("hdl:11296/abc", "hdl:11296/abc")
+    ledger.schedule_retry("hdl:11296/abc", "期貨", "u", "期貨之研究", "timeout", 5, 0, 0)
+    downloader._hand_retries_to_coordinator()
+    item = downloader.coordinator.claim("w1", 60)
+    assert item[:4] == ("hdl:11296/abc", "期貨", permanent_record_url("hdl:11296/abc"), "期貨之研究")
+    assert ledger.retry_summary() == []
+    assert downloader.keyword == "台股"
+    downloader.coordinator.close()
+
+
+def test_retry_keeps_keyword_with_the_task(downloader, monkeypatch):
+    ledger = downloader.ledger
+    ledger.mark_status("hdl:11296/abc", "failed", "timeout", title="期貨之研究", keyword="期貨", url="u")
+    ledger.set_thesis_id("hdl:11296/abc", "hdl:11296/abc")
+    ledger.schedule_retry("hdl:11296/abc", "期貨", "u", "期貨之研究", "timeout", 5, 0, 0)
+    seen = []
+
+    def process(url, title, keyword=None):
+        # 其他執行緒同時讀取的 self.keyword 不會被改成重試論文的關鍵字
+        seen.append((keyword, downloader.keyword))
+        downloader._log_record_status(url, title, "failed", "captcha", keyword)
+        return None, None, None
+
+    monkeypatch.setattr(downloader, "_process_article_in_new_tab", process)
+    assert downloader._retry_failed_record(ledger.claim_due_retry())
+    assert seen == [("期貨", "台股")]
+    assert ledger._conn.execute(
+        "SELECT keyword, attempts FROM retry_queue WHERE record_id = 'hdl:11296/abc'").fetchone() == ("期貨", 2)
+    assert {row[0] for row in ledger._conn.execute("SELECT keyword FROM journal")} == {"期貨"}
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from mock_server import MockNdltdServer
+
+
+class _Driver:
+    """_stream_download 只需要目前網址 (Referer)、User-Agent 與瀏覽器 cookie。"""
+
+    def __init__(self, current_url):
+        self.current_url = current_url
+
+    def execute_script(self, script):
+        return "Mozilla/5.0 (test)"
+
+    def get_cookies(self):
+        return [{"name": "session", "value": "mock", "domain": "127.0.0.1", "path": "/"}]
+
+
+@pytest.fixture
+def file_server():
+    server = MockNdltdServer(records=5, latency=(0.0, 0.0), file_kb=96, zip_ratio=0.0).start()
+    yield server
+    server.stop()
+
+
+def test_stream_download_writes_complete_file(downloader, file_server):
+    downloader.driver = _Driver(file_server.url)
+    os.makedirs(downloader.download_dir, exist_ok=True)
+    path = downloader._stream_download(f"{file_server.url}{file_server.CGI}/ccd=mock/download?id=3&q=台股")
+    assert path == os.path.join(downloader.download_dir, "mock_0003.pdf")
+    data = open(path, "rb").read()
+    assert data.startswith(b"%PDF") and len(data) == len(file_server._pdf_bytes(3))
+    assert downloader._precomputed_hashes[path]
+    assert [name for name in os.listdir(downloader.download_dir) if name.endswith(".part")] == []
+    # 同名檔案已存在時不覆寫
+    again = downloader._stream_download(f"{file_server.url}{file_server.CGI}/ccd=mock/download?id=3&q=台股")
+    assert again == os.path.join(downloader.download_dir, "mock_0003 (1).pdf")
+
+
+def test_stream_download_rejects_html(downloader, file_server):
+    downloader.driver = _Driver(file_server.url)
+    os.makedirs(downloader.download_dir, exist_ok=True)
+    assert downloader._stream_download(f"{file_server.url}{file_server.CGI}/ccd=mock/record?id=1") is None
+    assert os.listdir(downloader.download_dir) == []
+
+
+def test_stream_download_removes_partial_file(downloader, file_server, monkeypatch):
+    downloader.driver = _Driver(file_server.url)
+    os.makedirs(downloader.download_dir, exist_ok=True)
+    # 期限到期時中止下載，不留下 .part 暫存檔
+    monkeypatch.setattr(downloader, "DIRECT_DOWNLOAD_MIN_DEADLINE", -1.0)
+    monkeypatch.setattr(downloader, "DIRECT_DOWNLOAD_MIN_THROUGHPUT", float("inf"))
+    assert downloader._stream_download(f"{file_server.url}{file_server.CGI}/ccd=mock/download?id=2") is None
+    assert os.listdir(downloader.download_dir) == []
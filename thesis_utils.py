@@ -0,0 +1,93 @@
+"""
+論文識別與檔名的共用小工具：永久網址、標題鍵、列表簽章、識別碼擷取與檔案雜湊。
+"""
+import re
+import hashlib
+import unicodedata
+from typing import Optional
+
+
+def permanent_record_url(thesis_id: str) -> Optional[str]:
+    """由永久識別碼組出不依賴搜尋 session 的論文網址，讓其他機器上的 worker 也能開啟。"""
+    prefix, _, value = thesis_id.partition(":")
+    if prefix == "hdl":
+        return f"https://hdl.handle.net/{value}"
+    if prefix == "sid":
+        return f"https://ndltd.ncl.edu.tw/cgi-bin/gs32/gsweb.cgi?o=dnclcdr&s=id=%22{value}%22.&searchmode=basic"
+    return None
+
+
+def sanitize_filename(name: str) -> str:
+    sanitized_name = re.sub(r'[\\/*?:"<>|]', "", name)
+    sanitized_name = re.sub(r'[\n\t\r]', " ", sanitized_name)
+    sanitized_name = re.sub(r'\s+', " ", sanitized_name).strip()
+    max_len = 150
+    return sanitized_name[:max_len].strip() if len(sanitized_name) > max_len else sanitized_name
+
+
+def thesis_title_key(title: Optional[str]) -> Optional[str]:
+    """
+    由標題推得的提示鍵：先套用與檔名相同的清理與截斷，再統一全半形、大小寫並去掉標點與空白，
+    讓同一篇論文不論從哪個關鍵字、哪個名次找到，或是由既有 PDF 檔名回推，都得到相同的鍵。
+    打開詳目頁取得永久識別碼後，帳本改以識別碼為鍵，標題鍵只留作別名 (見 DownloadLedger.adopt_key)。
+    """
+    if not title:
+        return None
+    text = unicodedata.normalize("NFKC", sanitize_filename(title)).casefold()
+    text = re.sub(r'[\W_]+', '', text)
+    return f"title:{text}" if text else None
+
+
+def listing_signature(record: dict) -> Optional[str]:
+    """
+    由列表頁的作者、學校與學年度組出簽章，用來分辨標題相同的不同論文。三者都沒有時回傳 None。
+    """
+    parts = [unicodedata.normalize("NFKC", record.get(field) or "").casefold().strip()
+             for field in ("author", "school", "year")]
+    return "|".join(parts) if any(parts) else None
+
+
+def disambiguated_key(title_key: str, discriminator: str) -> str:
+    """標題相同但確定是另一篇論文時使用的鍵：標題鍵加上簽章或永久識別碼的雜湊。"""
+    return f"{title_key}#{hashlib.sha1(discriminator.encode('utf-8')).hexdigest()[:10]}"
+
+
+def provisional_key(title_key: str, url: str) -> str:
+    """
+    標題相同的論文已以永久識別碼確認過、但無法由列表判斷是哪一篇時使用的暫時鍵，
+    打開詳目頁取得識別碼後即改為識別碼。"~" 不會出現在標題鍵與識別碼中。
+    """
+    return f"{title_key}~{hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]}"
+
+
+def is_provisional_key(record_id: str) -> bool:
+    return "~" in record_id
+
+
+def provisional_base(record_id: str) -> str:
+    """暫時鍵所依據的標題鍵。"""
+    return record_id.split("~", 1)[0]
+
+
+THESIS_ID_PATTERNS = [
+    ("hdl", r'hdl\.handle\.net/(11296/[0-9A-Za-z]+)'),
+    ("sid", r'系統識別號\s*[:：]?\s*([0-9A-Za-z][0-9A-Za-z-]{5,})'),
+]
+
+
+def extract_thesis_id(html: str) -> Optional[str]:
+    """從論文詳目頁取出永久識別碼：優先使用論文永久網址 (handle)，其次是系統識別號。"""
+    text = re.sub(r'<[^>]+>', ' ', html)
+    for prefix, pattern in THESIS_ID_PATTERNS:
+        match = re.search(pattern, html) or re.search(pattern, text)
+        if match:
+            return f"{prefix}:{match.group(1)}"
+    return None
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()